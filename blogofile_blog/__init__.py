@@ -58,23 +58,27 @@ config = HC(
     timezone="US/Eastern",
     ## blog_posts_per_page -- Blog posts per page
     posts_per_page=5,
+    ## blog_posts_per_feed -- Blog posts in each RSS and Atom feed
+    posts_per_feed=10,
     # Automatic Permalink
     # (If permalink is not defined in post article, it's generated
     #  automatically based on the following format:)
     # Available string replacements:
     # :year, :month, :day -> post's date
+    # :hour, :minute, :second -> post's time
+    # :blog_path          -> blog.path
     # :title              -> post's title
     # :uuid               -> sha hash based on title
     # :filename           -> article's filename without suffix
-    # path is relative to site_url
+    # path is relative to site_url; any other :placeholder is an error
     auto_permalink=HC(enabled=True,
                       path=":blog_path/:year/:month/:day/:title"),
     # Automatic Post filenames
     # Post can be created automatically with:
     #   blogofile blog post create "Post Title"
     # auto_post_filename defines the filename format for posts
-    # created this way.
-    auto_post_filename=":year-:month-:day - :title.markdown",
+    # created this way; :markup is blog.post.default_markup.
+    auto_post_filename=":year-:month-:day - :title.:markup",
     #### Disqus.com comment integration ####
     disqus=HC(enabled=False,
               name="your_disqus_name"),
@@ -92,6 +96,10 @@ config = HC(
     post_excerpts=HC(enabled=False,
                      word_length=25,
                      method=None),
+    #### Reading time ####
+    # post.reading_time is the number of words in the post divided
+    # by this, in whole minutes:
+    reading_words_per_minute=200,
     #### Blog pagination directory ####
     # blogofile places extra pages of your blog in a secondary directory
     # like:
@@ -104,6 +112,116 @@ config = HC(
     # http://www.yourblog.com/blog_root/category/your-topic/4
     # You can rename the "category" part here:
     category_dir="category",
+    #### Blog archives ####
+    # Published posts are listed by month in pages like:
+    #   http://www.yourblog.com/blog_root/archive/2012/11/1
+    # and by year (archive/2012/1) and day (archive/2012/11/20/1) if
+    # yearly and daily are on. The pages after the first of a year or
+    # day go below pagination_dir (archive/2012/page/2), as do those of
+    # a month if daily is on, so that they don't clash with the
+    # archives of its months or days. Each archive links to the ones
+    # before and after it. The archive index lists every post by month, or
+    # with index_by_year, just the years and months, with an index of
+    # each year's posts at archive/2012/.
+    archives=HC(yearly=True,
+                daily=False,
+                index_by_year=True),
+    #### Blog tag directory ####
+    # Posts with tags are also listed in pages and feeds by tag:
+    # http://www.yourblog.com/blog_root/tag/your-tag/4
+    # You can rename the "tag" part here, or set it to None to not
+    # write tag pages at all (blog.tagged_posts and blog.all_tags are
+    # then left empty):
+    tag_dir="tag",
+    #### Sitemap ####
+    # When enabled, write the URLs of the blog's pages (permapages, and
+    # the chronological, archive, category and tag pages) to filename
+    # in _site for search engines, with the time the newest post on
+    # each page was last updated. Past max_urls URLs or max_bytes
+    # bytes (the limits of the sitemap protocol) the URLs go on in
+    # sitemap-1.xml, sitemap-2.xml, ... and filename is a sitemap index
+    # of those.
+    sitemap=HC(
+        enabled=False,
+        filename="sitemap.xml",
+        max_urls=50000,
+        max_bytes=50 * 1024 * 1024
+        ),
+    #### Search index ####
+    # Write an index of the words of the published posts (and their
+    # titles, categories and tags) to the path below the blog, with
+    # search.js to search the blog in the browser. The index is
+    # split into shards by the first prefix_length characters of each
+    # word, so a search only loads the shards of the words it looks
+    # for. The words of each post are kept in directory, so that only
+    # new and changed posts are read again.
+    search=HC(
+        enabled=False,
+        path="search",
+        prefix_length=2,
+        directory="_cache/blog/search"
+        ),
+    #### Incremental builds ####
+    # Remember what each blog page was made from (posts, templates and
+    # configuration), and keep a copy of it in directory, so that the
+    # next build only renders the pages whose inputs changed.
+    # `blogofile blog build` turns this on for a single build, and
+    # `blogofile blog build --dry-run` lists the pages it would render.
+    # `blogofile blog watch` also sets in_place, to rebuild into the
+    # _site left by its last build rather than an emptied one.
+    incremental=HC(
+        enabled=False,
+        dry_run=False,
+        in_place=False,
+        directory="_cache/blog/pages"
+        ),
+    #### Site manifest ####
+    # After each build, compare every file in _site with the last
+    # build: files whose contents are unchanged get their previous
+    # modification time back (Blogofile rewrites them all), so rsync
+    # and HTTP caches only see the real changes. The manifest (path ->
+    # sha1, size, mtime) and the URLs of the added, changed and removed
+    # files are written as JSON to directory, as manifest.json and
+    # changes.json. With hard_links, files with the same contents,
+    # like the first page of a category and its index.html, are hard
+    # linked together.
+    manifest=HC(
+        enabled=False,
+        directory="_cache/blog",
+        hard_links=True
+        ),
+    #### Pre-compressed files ####
+    # After each build, write a gzip compressed copy (page.html.gz)
+    # next to each text file in _site of at least min_size bytes, and
+    # a brotli one (page.html.br) if the brotli module is installed,
+    # for the web server to send instead of compressing the file on
+    # every request; the _htaccess file has the rules for Apache.
+    # Compressed files are kept in directory, so files that didn't
+    # change aren't compressed again. Set workers to a number greater
+    # than 1 to compress with several processes (needs os.fork).
+    compress=HC(
+        enabled=False,
+        extensions=[".html", ".xml", ".css", ".js", ".json", ".txt",
+                    ".svg"],
+        min_size=1024,
+        encodings=[".gz", ".br"],
+        workers=None,
+        directory="_cache/blog/compressed"
+        ),
+    #### Parallel page rendering ####
+    # Set to a number of worker processes greater than 1 to render the
+    # blog's pages on several CPU cores at once, e.g.:
+    #   blog.render_workers = multiprocessing.cpu_count()
+    # The pages come out the same as when they are rendered one at a
+    # time. This needs a platform with os.fork.
+    render_workers=None,
+    #### Post fragment cache ####
+    # The most bytes of rendered post HTML (bf.config.blog.fragments)
+    # kept in memory to be reused on other pages; the least recently
+    # used fragments are rendered again past that. With
+    # blog.post.content_store enabled the fragments are kept in the
+    # content store instead.
+    fragment_cache_size=16 * 1024 * 1024,
     priority=90.0,
     base_template="site.mako",
     #Alternative template engine content blocks:
@@ -136,6 +254,21 @@ config = HC(
            "rst": "syntax_highlight, rst",
            "html": "syntax_highlight"
            },
+        #### Block filters ####
+        # Filter chains to run on the blocks of a post before its own
+        # filter chain, by block name. A block looks like:
+        #   $$name(arguments)
+        #   ...
+        #   $$/name
+        # For example, to highlight $$code blocks one at a time:
+        #   blog.post.block_filters = {"code": "syntax_highlight"}
+        block_filters={},
+        #### Parallel post parsing ####
+        # Set to a number of worker processes greater than 1 to parse
+        # and filter posts on several CPU cores at once, e.g.:
+        #   blog.post.parse_workers = multiprocessing.cpu_count()
+        # This needs a platform with os.fork.
+        parse_workers=None,
         #An optional callback to run after all the posts are parsed
         #but before anything else is done with them.
         post_process=None,
@@ -145,7 +278,34 @@ config = HC(
         slugify=None,
         categories=HC(
             case_sensitive=False
-            )
+            ),
+        #### Parsed post cache ####
+        # Keep parsed and filtered posts on disk between builds so
+        # that only new or changed posts are run through their filter
+        # chain. Entries are keyed by the post source, the filter
+        # configuration, and the blog settings that affect parsing.
+        # The least recently used entries are evicted once the cache
+        # grows beyond max_size bytes.
+        cache=HC(
+            enabled=False,
+            directory="_cache/blog/posts",
+            max_size=256 * 1024 * 1024
+            ),
+        #### Content store ####
+        # Keep the rendered content and excerpts of posts in a file
+        # that is read through a memory map, rather than in memory, so
+        # that very large blogs can be built without holding all of
+        # their posts' HTML at once. The file is created in directory
+        # and removed once the build is done.
+        content_store=HC(
+            enabled=False,
+            directory="_cache/blog"
+            ),
+        #### Keep parsed posts ####
+        # Keep the parsed posts in memory between the builds of one
+        # process, and only parse the post files whose modification
+        # time or size changed. `blogofile blog watch` turns this on.
+        keep_parsed=False
         )
     )
 
@@ -153,4 +313,6 @@ tools = blogofile.plugin.PluginTools(sys.modules[__name__])
 
 
 def init():
+    from . import postbuild
     tools.initialize_controllers()
+    postbuild.install()
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the blog plugin, run with ``blogofile blog bench``.
+"""
+from __future__ import print_function
+import collections
+import datetime
+import math
+import os
+import random
+import shutil
+import timeit
+from blogofile.cache import bf
+
+
+# Short posts, so that the time per post is mostly the per-post
+# overhead of the filter rather than the work of converting the text:
+filter_samples = {
+    "markdown": "A *short* post with a [link](http://example.com).\n",
+    "rst": "A *short* post with a `link <http://example.com>`_.\n",
+    }
+
+
+def time_per_call(func, number, repeat=3):
+    """Return the best time in seconds taken by one call of func(), out
+    of `repeat` runs of `number` calls each.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_filters(post_module, number=200):
+    """Time the per-post overhead of the markup filters and of running a
+    filter chain, as they were (a new renderer per post, the chain
+    parsed for every post) and as they are now.
+
+    Returns a list of (name, seconds per post before, seconds per post
+    now) tuples.
+    """
+    cases = []
+    filters = bf.config.filters
+    if "markdown" in filters and "mod" in filters.markdown:
+        import markdown
+        md = filters.markdown.mod
+        md_src = filter_samples["markdown"]
+        chain = "syntax_highlight, markdown"
+        cases.append((
+            "markdown",
+            lambda: markdown.markdown(md_src, md.extensions),
+            lambda: md.run(md_src)))
+        cases.append((
+            "chain: " + chain,
+            lambda: bf.filter.run_chain(chain, md_src),
+            lambda: post_module.run_filter_chain(chain, md_src)))
+    if "rst" in filters and "mod" in filters.rst:
+        import docutils.core
+        rst = filters.rst.mod
+        rst_src = filter_samples["rst"]
+        cases.append((
+            "rst",
+            lambda: docutils.core.publish_parts(
+                rst_src, writer_name='html')['html_body'],
+            lambda: rst.run(rst_src)))
+    results = []
+    for name, before, now in cases:
+        results.append((name, time_per_call(before, number),
+                        time_per_call(now, number)))
+    return results
+
+
+def print_filter_bench(results):
+    print("{0:<36} {1:>12} {2:>12} {3:>8}".format(
+        "Per post", "before (ms)", "now (ms)", "speedup"))
+    for name, before, now in results:
+        print("{0:<36} {1:>12.3f} {2:>12.3f} {3:>7.1f}x".format(
+            name, before * 1000, now * 1000, before / now))
+
+
+front_matter_sample = (
+    "title: A post about something\n"
+    "date: 2012/11/12 10:51:42\n"
+    "updated: 2012/11/13 08:00:00\n"
+    "categories: Category 1, Category 2\n"
+    "tags: tag1, tag2, tag3\n"
+    "author: Someone\n")
+
+
+def bench_front_matter(post_module, number=2000):
+    """Time the steps of parsing a post's YAML header, as they were
+    (the pure Python YAML loader, strptime, a pytz lookup per date and
+    the separator regular expression compiled for every post) and as
+    they are now.
+
+    Returns a list of (name, seconds per post before, seconds per post
+    now) tuples.
+    """
+    import re
+    import pytz
+    import yaml
+    date_format = post_module.config.date_format
+    timezone = post_module.blog_config.timezone
+    date = "2012/11/12 10:51:42"
+    source = "---\n" + front_matter_sample + "---\nThe body.\n"
+    cases = [
+        ("YAML header",
+         lambda: yaml.load(front_matter_sample, Loader=yaml.Loader),
+         lambda: post_module.load_front_matter(front_matter_sample)),
+        ("date ({0})".format(date_format),
+         lambda: datetime.datetime.strptime(date, date_format),
+         lambda: post_module.parse_date(date, date_format)),
+        ("timezone",
+         lambda: pytz.timezone(timezone),
+         lambda: post_module.get_timezone(timezone)),
+        ("header separator",
+         lambda: re.compile("^---$", re.MULTILINE).split(source, maxsplit=2),
+         lambda: post_module.yaml_separator.split(source, maxsplit=2)),
+        ]
+    results = []
+    for name, before, now in cases:
+        results.append((name, time_per_call(before, number),
+                        time_per_call(now, number)))
+    return results
+
+
+# Words to make up the text of synthetic posts:
+corpus_words = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim "
+    "veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea "
+    "commodo consequat duis aute irure in reprehenderit voluptate velit "
+    "esse cillum fugiat nulla pariatur excepteur sint occaecat cupidatat "
+    "non proident sunt culpa qui officia deserunt mollit anim id est "
+    "laborum").split()
+
+corpus_code = (
+    "def fib(n):\n"
+    "    a, b = 0, 1\n"
+    "    for i in range(n):\n"
+    "        a, b = b, a + b\n"
+    "    return a\n")
+
+
+def _paragraph(rand, markup):
+    words = [rand.choice(corpus_words) for n in range(rand.randint(20, 80))]
+    emphasis = rand.randrange(len(words))
+    if markup == "markdown":
+        words[emphasis] = "*{0}*".format(words[emphasis])
+    elif markup == "rst":
+        words[emphasis] = "**{0}**".format(words[emphasis])
+    elif markup == "html":
+        words[emphasis] = "<em>{0}</em>".format(words[emphasis])
+    text = " ".join(words).capitalize() + "."
+    if markup == "html":
+        return "<p>{0}</p>".format(text)
+    return text
+
+
+def generate_corpus(directory, posts=100, categories=10, tags=20,
+                    code_blocks=1, markups=("markdown", "rst", "html"),
+                    seed=0):
+    """Write `posts` synthetic posts to `directory`.
+
+    The posts are an hour apart, and each has 1 to 3 of `categories`
+    categories, up to 3 of `tags` tags, a few paragraphs of text and
+    `code_blocks` $$code blocks. Their markup cycles through `markups`,
+    which are post file extensions. The same arguments always produce
+    the same posts.
+    """
+    rand = random.Random(seed)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    start = datetime.datetime(2005, 1, 1)
+    category_names = ["Category {0}".format(n) for n in range(categories)]
+    tag_names = ["tag{0}".format(n) for n in range(tags)]
+    for n in range(posts):
+        markup = markups[n % len(markups)]
+        date = start + datetime.timedelta(hours=n)
+        post_categories = rand.sample(
+            category_names, min(len(category_names), rand.randint(1, 3)))
+        post_tags = rand.sample(
+            tag_names, min(len(tag_names), rand.randint(0, 3)))
+        body = [_paragraph(rand, markup) for p in range(rand.randint(2, 6))]
+        for b in range(code_blocks):
+            body.insert(rand.randint(1, len(body)),
+                        "$$code(lang=python)\n{0}$$/code".format(corpus_code))
+        header = [
+            "---",
+            "title: Synthetic post {0}".format(n),
+            "date: {0:%Y/%m/%d %H:%M:%S}".format(date),
+            "categories: {0}".format(", ".join(post_categories)),
+            ]
+        if post_tags:
+            header.append("tags: {0}".format(", ".join(post_tags)))
+        header.append("---")
+        path = os.path.join(
+            directory, "{0:06d} - synthetic post.{1}".format(n, markup))
+        with open(path, "w") as f:
+            f.write("\n".join(header) + "\n" + "\n\n".join(body) + "\n")
+
+
+def bench_build(site_dir, sizes, **corpus_args):
+    """Build a blog with a synthetic corpus of each of `sizes` posts,
+    timing the whole build and each of its phases.
+
+    `site_dir` must not exist yet; a new blog site is made there. The
+    remaining arguments are passed on to generate_corpus.
+
+    Every build is a cold one, with the site's caches emptied first. An
+    untimed build of the smallest corpus is done before the others so
+    that they don't include the time taken to import the filters.
+
+    Returns a dictionary of the results that can be saved as JSON.
+    """
+    from blogofile import main
+    from . import timings
+    main.main(["blogofile", "init", site_dir, "blog"])
+    posts_dir = os.path.join(site_dir, "_posts")
+    cache_dir = os.path.join(site_dir, "_cache")
+    runs = None
+    cwd = os.getcwd()
+    try:
+        for size in [min(sizes)] + list(sizes):
+            shutil.rmtree(posts_dir)
+            if os.path.isdir(cache_dir):
+                shutil.rmtree(cache_dir)
+            generate_corpus(posts_dir, posts=size, **corpus_args)
+            if runs is None:
+                # The warm up build
+                main.main(["blogofile", "build", "-s", site_dir])
+                os.chdir(cwd)
+                runs = collections.OrderedDict()
+                continue
+            timings.start()
+            try:
+                start = timeit.default_timer()
+                main.main(["blogofile", "build", "-s", site_dir])
+                build = timeit.default_timer() - start
+            finally:
+                report = timings.stop().report()
+                os.chdir(cwd)
+            run = runs[str(size)] = collections.OrderedDict()
+            run["build"] = build
+            for phase in report["phases"]:
+                run[phase["phase"]] = phase["wall"]
+    finally:
+        os.chdir(cwd)
+    return {"sizes": list(sizes), "corpus": corpus_args, "runs": runs,
+            "scaling": scaling(runs)}
+
+
+def scaling(runs):
+    """Work out how each step of the build scales with the number of
+    posts, between each pair of consecutive sizes in `runs`.
+
+    The result maps each step to a list of exponents k, where the time
+    taken grew like size ** k: about 1 for a step that scales linearly,
+    about 2 for one that's quadratic.
+    """
+    sizes = [int(size) for size in runs]
+    result = collections.OrderedDict()
+    for smaller, larger in zip(sizes, sizes[1:]):
+        before = runs[str(smaller)]
+        after = runs[str(larger)]
+        for step, seconds in after.items():
+            if before.get(step) and seconds:
+                exponent = (math.log(seconds / before[step])
+                            / math.log(float(larger) / smaller))
+            else:
+                exponent = None
+            result.setdefault(step, []).append(exponent)
+    return result
+
+
+def compare_to_baseline(results, baseline, tolerance=1.25):
+    """Return a list of (size, step, baseline seconds, seconds) for each
+    step that took more than `tolerance` times as long as in the
+    baseline results.
+    """
+    slower = []
+    for size, run in results["runs"].items():
+        baseline_run = baseline.get("runs", {}).get(size, {})
+        for step, seconds in run.items():
+            baseline_seconds = baseline_run.get(step)
+            if baseline_seconds and seconds > baseline_seconds * tolerance:
+                slower.append((int(size), step, baseline_seconds, seconds))
+    return slower
+
+
+def print_build_bench(results, superlinear=1.5):
+    """Print the times of each step at each size, and how they scale.
+    """
+    sizes = [str(size) for size in results["sizes"]]
+    runs = results["runs"]
+    steps = list(runs[sizes[-1]])
+    print("{0:<24}".format("Step (s) / posts") +
+          "".join("{0:>10}".format(size) for size in sizes) +
+          "   scaling")
+    for step in steps:
+        exponents = results["scaling"].get(step, [])
+        flag = ""
+        if any(k is not None and k > superlinear for k in exponents):
+            flag = "  <- superlinear"
+        print("{0:<24}".format(step) +
+              "".join("{0:>10.3f}".format(runs[size].get(step, 0.0))
+                      for size in sizes) + "   " +
+              " ".join("n^{0:.2f}".format(k) if k is not None else "-"
+                       for k in exponents) + flag)
+
+
+def bench_memory(post_module, posts_dir, content_store=False):
+    """Measure the memory held by the posts parsed from `posts_dir`,
+    once parsed and again once they are all rendered, with or without
+    the content store.
+
+    Returns a list of (stage, bytes, bytes per post) tuples, or None if
+    tracemalloc isn't available (it's new in Python 3.4).
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    config = post_module.config
+    saved = (config.cache.enabled, config.parse_workers,
+             config.content_store.enabled)
+    # Parse in this process, without the cache, so that everything
+    # the posts hold is allocated while tracing:
+    config.cache.enabled = False
+    config.parse_workers = None
+    config.content_store.enabled = content_store
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        posts = post_module.parse_posts(posts_dir)
+        parsed = tracemalloc.get_traced_memory()[0] - before
+        for post in posts:
+            post.render()
+        rendered = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+        post_module.close_content_store()
+        (config.cache.enabled, config.parse_workers,
+         config.content_store.enabled) = saved
+    count = max(len(posts), 1)
+    return [("parsed", parsed, parsed // count),
+            ("rendered", rendered, rendered // count)]
+
+
+def print_memory_bench(results, posts, title="In memory"):
+    print("{0:<28} {1:>12} {2:>14}".format(
+        "{0}, {1} posts".format(title, posts), "total (KiB)",
+        "per post (B)"))
+    for stage, total, per_post in results:
+        print("{0:<28} {1:>12.0f} {2:>14}".format(
+            stage, total / 1024.0, per_post))
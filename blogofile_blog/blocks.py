@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Find the blocks in a post, such as::
+
+    $$code(lang=python)
+    import this
+    $$/code
+
+A block starts with ``$$name`` at the beginning of a word, optionally
+followed by arguments in brackets, and ends at the first ``$$/name``
+that follows whitespace. Everything else on the opening line is
+ignored.
+
+The blocks are found in a single pass over the post, so a post with an
+unclosed block takes no longer to scan than one without.
+"""
+import collections
+
+
+#: A block found in a post. start and end are the offsets of the whole
+#: block, including the whitespace character in front of it; args is the
+#: bracketed text after the opening ``$$name``, or None; body is the text
+#: from the line after the opening ``$$name`` up to the whitespace before
+#: the closing ``$$/name``.
+Block = collections.namedtuple("Block", "start end args body")
+
+
+def find_blocks(src, name):
+    """Return a list of the `name` blocks in `src`, in order.
+    """
+    opening = "$$" + name
+    closing = "$$/" + name
+    blocks = []
+    pos = prev_end = 0
+    while True:
+        i = src.find(opening, pos)
+        if i < 0:
+            break
+        pos = i + len(opening)
+        # The opening must follow whitespace that isn't part of the
+        # previous block, unless it's at the very start:
+        if i > 0 and (i - 1 < prev_end or not src[i - 1].isspace()):
+            continue
+        line_end = src.find("\n", pos)
+        if line_end < 0:
+            # No later opening line can end either
+            break
+        line = src[pos:line_end]
+        if line.endswith("\r"):
+            line = line[:-1]
+        if "\r" in line:
+            continue
+        args = None
+        if line.startswith("("):
+            args_end = line.rfind(")")
+            if args_end > 0:
+                args = line[:args_end + 1]
+        body_start = line_end + 1
+        close = src.find(closing, body_start + 1)
+        while close >= 0 and not src[close - 1].isspace():
+            close = src.find(closing, close + 1)
+        if close < 0:
+            # Unclosed, and so is any block that opens after this one
+            break
+        pos = prev_end = close + len(closing)
+        blocks.append(Block(max(i - 1, 0), pos, args,
+                            src[body_start:close - 1]))
+    return blocks
+
+
+def replace_blocks(src, name, replace):
+    """Return `src` with each of its `name` blocks replaced by
+    ``replace(block)``.
+    """
+    blocks = find_blocks(src, name)
+    if not blocks:
+        return src
+    parts = []
+    pos = 0
+    for block in blocks:
+        parts.append(src[pos:block.start])
+        parts.append(replace(block))
+        pos = block.end
+    parts.append(src[pos:])
+    return "".join(parts)
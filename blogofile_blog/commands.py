@@ -8,10 +8,11 @@ import blogofile.main
 
 def load_env():
     # TODO: Get rid of globals and move imports to top of file, if possible.
-    global tools, post
+    global tools, post, render
     from . import tools
     sys.path.insert(0, os.path.join(tools.get_src_dir(), "_controllers"))
     from blog import post
+    from blog import render
     sys.path.pop(0)
 
 
@@ -43,6 +44,117 @@ def setup_parser(parent_parser, parser_template):
         "list", help="List blog posts", parents=[parser_template])
     blog_post_list.set_defaults(func=list_posts)
 
+    #Incremental build
+    blog_build = blog_subparsers.add_parser(
+        "build", help="Build the site, only rendering the blog pages "
+        "whose posts, templates or configuration changed",
+        parents=[parser_template])
+    blog_build_mode = blog_build.add_mutually_exclusive_group()
+    blog_build_mode.add_argument(
+        "--dry-run", action="store_true",
+        help="List the blog pages that would be rendered or removed "
+        "without building anything")
+    blog_build_mode.add_argument(
+        "--full", action="store_true",
+        help="Render every blog page, as `blogofile build` does, such as "
+        "to time a whole build with --timings")
+    blog_build.add_argument(
+        "--timings", nargs="?", const="_blog_timings.json", metavar="FILE",
+        help="Time the phases of the blog build, print a summary and save "
+        "the details as JSON to FILE (default: _blog_timings.json)")
+    blog_build.set_defaults(func=build)
+
+    #Watch mode
+    blog_watch = blog_subparsers.add_parser(
+        "watch", help="Build the site, then rebuild it whenever its "
+        "posts, templates or configuration change",
+        parents=[parser_template])
+    blog_watch.add_argument(
+        "--interval", type=float, default=1.0,
+        help="Seconds between checks for changed files (default: 1)")
+    blog_watch.set_defaults(func=watch)
+
+    #Benchmarks
+    blog_bench = blog_subparsers.add_parser(
+        "bench", help="Benchmark the blog plugin", parents=[parser_template])
+    blog_bench_subparsers = blog_bench.add_subparsers()
+    blog_bench_filters = blog_bench_subparsers.add_parser(
+        "filters", help="Time the per-post overhead of the markup filters",
+        parents=[parser_template])
+    blog_bench_filters.add_argument(
+        "-n", "--number", type=int, default=200,
+        help="Number of posts to time each filter with (default: 200)")
+    blog_bench_filters.set_defaults(func=bench_filters)
+    blog_bench_front_matter = blog_bench_subparsers.add_parser(
+        "frontmatter", help="Time parsing the YAML headers of posts",
+        parents=[parser_template])
+    blog_bench_front_matter.add_argument(
+        "-n", "--number", type=int, default=2000,
+        help="Number of headers to time each step with (default: 2000)")
+    blog_bench_front_matter.set_defaults(func=bench_front_matter)
+    blog_bench_generate = blog_bench_subparsers.add_parser(
+        "generate", help="Write a synthetic corpus of posts to DEST",
+        parents=[parser_template])
+    blog_bench_generate.add_argument(
+        "DEST", help="Directory to write the posts to")
+    blog_bench_generate.add_argument(
+        "--posts", type=int, default=100,
+        help="Number of posts (default: 100)")
+    add_corpus_arguments(blog_bench_generate)
+    blog_bench_generate.set_defaults(func=bench_generate)
+    blog_bench_build = blog_bench_subparsers.add_parser(
+        "build", help="Time full builds of synthetic corpora of "
+        "increasing size, and how each step scales",
+        parents=[parser_template])
+    blog_bench_build.add_argument(
+        "--sizes", default="100,1000,10000",
+        help="Comma separated numbers of posts to build "
+        "(default: 100,1000,10000)")
+    add_corpus_arguments(blog_bench_build)
+    blog_bench_build.add_argument(
+        "--baseline", metavar="FILE",
+        help="Compare the times with those saved in FILE by --save")
+    blog_bench_build.add_argument(
+        "--tolerance", type=float, default=1.25,
+        help="Report steps that took more than this many times as long "
+        "as in the baseline (default: 1.25)")
+    blog_bench_build.add_argument(
+        "--save", metavar="FILE", help="Save the results as JSON to FILE")
+    blog_bench_build.set_defaults(func=bench_build)
+    blog_bench_memory = blog_bench_subparsers.add_parser(
+        "memory", help="Measure the memory held by the parsed and "
+        "rendered posts of a synthetic corpus", parents=[parser_template])
+    blog_bench_memory.add_argument(
+        "--posts", type=int, default=5000,
+        help="Number of posts (default: 5000)")
+    add_corpus_arguments(blog_bench_memory)
+    blog_bench_memory.set_defaults(func=bench_memory)
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument(
+        "--categories", type=int, default=10,
+        help="Number of categories to choose from (default: 10)")
+    parser.add_argument(
+        "--tags", type=int, default=20,
+        help="Number of tags to choose from (default: 20)")
+    parser.add_argument(
+        "--code-blocks", type=int, default=1,
+        help="Number of $$code blocks per post (default: 1)")
+    parser.add_argument(
+        "--markups", default="markdown,rst,html",
+        help="Comma separated post markups to cycle through "
+        "(default: markdown,rst,html)")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Random seed of the corpus (default: 0)")
+
+
+def corpus_args(args):
+    return dict(categories=args.categories, tags=args.tags,
+                code_blocks=args.code_blocks,
+                markups=tuple(args.markups.split(",")), seed=args.seed)
+
 
 def copy_templates(args):
     """Copy the blog templates to the given directory.
@@ -83,3 +195,132 @@ def list_posts(args):
             "{0:>4} | {1:%Y/%m/%d} | {2} | {3}"
             .format(p_num, p.date, p.title, p.filename))
         p_num -= 1
+
+
+def build(args):
+    blogofile.config.init_interactive(args)
+    from blogofile.cache import bf
+    from . import timings
+    blog = bf.config.plugins.blog
+    blog.incremental.enabled = not args.full
+    if args.timings:
+        timings.start()
+    if args.dry_run:
+        build_dry_run(args)
+    else:
+        blogofile.main.do_build(args, load_config=False)
+    if args.timings:
+        report = timings.stop().report()
+        print("\n".join(timings.format_report(report)))
+        timings.write_report(report, args.timings)
+        print("\nTimings written to {0}".format(args.timings))
+
+
+def build_dry_run(args):
+    from blogofile.cache import bf
+    from blogofile import plugin, filter, util
+    from blogofile.writer import Writer
+    blog = bf.config.plugins.blog
+    blog.incremental.dry_run = True
+    bf.writer = Writer(
+        output_dir=util.path_join("_site", util.fs_site_path_helper()))
+    plugin.init_plugins()
+    filter.init_filters()
+    load_env()
+    blog.controllers.blog.mod.run()
+    for action, location, reason in render.graph.plan:
+        if action == "render":
+            print("render  {0} ({1})".format(location, reason))
+        elif action == "remove":
+            print("remove  {0}".format(location))
+    print("{render} to render, {reuse} to reuse, {remove} to remove"
+          .format(**render.graph.counts()))
+
+
+def watch(args):
+    from . import watch
+    try:
+        watch.watch(args, args.interval)
+    except KeyboardInterrupt:
+        print()
+
+
+def bench_filters(args):
+    blogofile.config.init_interactive(args)
+    from blogofile import plugin, filter
+    from . import bench
+    plugin.init_plugins()
+    filter.init_filters()
+    load_env()
+    bench.print_filter_bench(bench.bench_filters(post, args.number))
+
+
+def bench_front_matter(args):
+    blogofile.config.init_interactive(args)
+    from blogofile import plugin, filter
+    from . import bench
+    plugin.init_plugins()
+    filter.init_filters()
+    load_env()
+    bench.print_filter_bench(bench.bench_front_matter(post, args.number))
+
+
+def bench_generate(args):
+    from . import bench
+    bench.generate_corpus(args.DEST, posts=args.posts, **corpus_args(args))
+    print("Wrote {0} posts to {1}".format(args.posts, args.DEST))
+
+
+def bench_build(args):
+    import json
+    import tempfile
+    from . import bench
+    sizes = [int(size) for size in args.sizes.split(",")]
+    temp_dir = tempfile.mkdtemp()
+    try:
+        results = bench.bench_build(
+            os.path.join(temp_dir, "site"), sizes, **corpus_args(args))
+    finally:
+        shutil.rmtree(temp_dir)
+    print()
+    bench.print_build_bench(results)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = bench.compare_to_baseline(
+            results, baseline, args.tolerance)
+        print()
+        if not slower:
+            print("No step is more than {0}x slower than in {1}".format(
+                args.tolerance, args.baseline))
+        for size, step, before, now in slower:
+            print("{0} posts: {1} took {2:.3f}s, {3:.1f}x the baseline"
+                  .format(size, step, now, now / before))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print("\nResults written to {0}".format(args.save))
+
+
+def bench_memory(args):
+    import tempfile
+    blogofile.config.init_interactive(args)
+    from blogofile import plugin, filter
+    from . import bench
+    plugin.init_plugins()
+    filter.init_filters()
+    load_env()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        bench.generate_corpus(temp_dir, posts=args.posts, **corpus_args(args))
+        results = bench.bench_memory(post, temp_dir)
+        stored_results = bench.bench_memory(
+            post, temp_dir, content_store=True)
+    finally:
+        shutil.rmtree(temp_dir)
+    if results is None:
+        print("Measuring memory needs tracemalloc (Python 3.4 or later)")
+    else:
+        bench.print_memory_bench(results, args.posts)
+        print()
+        bench.print_memory_bench(stored_results, args.posts, "Content store")
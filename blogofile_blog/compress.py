@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Write pre-compressed siblings of the text files of the built site.
+
+Next to each text file of at least a minimum size, ``page.html.gz``
+(and ``page.html.br``, if the brotli module is installed) is written,
+for a web server to send instead of compressing the file itself on
+every request. The compressed files are kept in a cache directory by
+the sha1 of the original, so a file whose contents didn't change since
+the last build isn't compressed again.
+"""
+import errno
+import gzip
+import io
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from .manifest import scan
+
+
+logger = logging.getLogger("blogofile.blog.compress")
+
+
+def gzip_bytes(data):
+    out = io.BytesIO()
+    # A fixed mtime, so that the same input gives the same output:
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9,
+                       mtime=0) as f:
+        f.write(data)
+    return out.getvalue()
+
+
+def brotli_bytes(data):
+    return brotli.compress(data)
+
+
+#: Compressors by the extension of the files they write.
+compressors = {".gz": gzip_bytes}
+if brotli is not None:
+    compressors[".br"] = brotli_bytes
+
+#: The extensions of the compressed siblings of a file.
+sibling_extensions = (".gz", ".br")
+
+
+def remove_siblings(path):
+    """Remove the compressed siblings of the file at `path`, if it has
+    any.
+    """
+    for extension in sibling_extensions:
+        try:
+            os.remove(path + extension)
+        except OSError:
+            pass
+
+
+def _compress_job(job):
+    """Compress the file at `path` into the cache, for each of the
+    `encodings` (extensions in compressors).
+
+    Returns the encodings whose compressed file is smaller than the
+    original, and so is worth serving.
+    """
+    path, cache_path, encodings = job
+    with open(path, "rb") as f:
+        data = f.read()
+    smaller = []
+    for encoding in encodings:
+        compressed = compressors[encoding](data)
+        if len(compressed) >= len(data):
+            continue
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), prefix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+        try:
+            os.rename(temp_path, cache_path + encoding)
+        except OSError:
+            # Windows won't rename over an existing file.
+            os.remove(cache_path + encoding)
+            os.rename(temp_path, cache_path + encoding)
+        smaller.append(encoding)
+    if len(smaller) < len(encodings):
+        # Remember that the other encodings don't pay off:
+        open(cache_path + ".none", "w").close()
+    return smaller
+
+
+def compress_site(output_dir, directory, extensions, min_size=1024,
+                  encodings=(".gz", ".br"), workers=None, files=None):
+    """Write the compressed siblings of the files in `output_dir` whose
+    names end with one of `extensions` and that are at least `min_size`
+    bytes.
+
+    :arg directory: The cache of compressed files.
+    :arg encodings: The compressed files to write, by extension; those
+                    without a compressor (.br without brotli) are left
+                    out.
+    :arg workers: Number of processes to compress with, if more than 1.
+    :arg files: The files of the site with their (sha1, size), as from
+                manifest.scan, if the caller already has them.
+
+    The siblings of the selected files that no longer get one, such as
+    those of a file that has shrunk below `min_size` since an earlier
+    build into the same `output_dir`, are removed.
+
+    Returns the number of files compressed, and the number of siblings
+    written.
+    """
+    encodings = [e for e in encodings if e in compressors]
+    if not encodings:
+        return 0, 0
+    if files is None:
+        files = scan(output_dir)
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    selected = [(path, sha1) for path, (sha1, size) in sorted(files.items())
+                if size >= min_size and path.endswith(tuple(extensions))]
+    jobs = []
+    queued = set()
+    for path, sha1 in selected:
+        cache_path = os.path.join(directory, sha1)
+        if sha1 in queued or os.path.exists(cache_path + ".none") or \
+                all(os.path.exists(cache_path + e) for e in encodings):
+            continue
+        queued.add(sha1)
+        jobs.append((os.path.join(output_dir, path), cache_path, encodings))
+    workers = min(workers or 1, len(jobs))
+    if workers > 1 and hasattr(os, "fork"):
+        try:
+            context = multiprocessing.get_context("fork")
+        except AttributeError:
+            # Python 2 forks on every platform that has os.fork
+            context = multiprocessing
+        pool = context.Pool(workers)
+        try:
+            pool.map(_compress_job, jobs)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for job in jobs:
+            _compress_job(job)
+    siblings = 0
+    used = set()
+    written = set()
+    for path, sha1 in selected:
+        full_path = os.path.join(output_dir, path)
+        mtime = os.path.getmtime(full_path)
+        for encoding in encodings:
+            cache_path = os.path.join(directory, sha1 + encoding)
+            if not os.path.exists(cache_path):
+                continue
+            used.add(sha1 + encoding)
+            sibling = full_path + encoding
+            shutil.copyfile(cache_path, sibling)
+            os.utime(sibling, (mtime, mtime))
+            written.add(path + encoding)
+            siblings += 1
+        used.add(sha1 + ".none")
+    # Siblings left by an earlier build in place (blogofile blog watch)
+    # for files that don't get them any more:
+    for path in files:
+        for encoding in sibling_extensions:
+            original = path[:-len(encoding)]
+            if path.endswith(encoding) and path not in written and \
+                    original in files and \
+                    original.endswith(tuple(extensions)):
+                os.remove(os.path.join(output_dir, path))
+    # Forget the files no longer in the site:
+    for name in os.listdir(directory):
+        if name not in used:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    logger.info("Compressed {0} of {1} files, wrote {2} compressed files"
+                .format(len(jobs), len(selected), siblings))
+    return len(jobs), siblings
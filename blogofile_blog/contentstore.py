@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Keep rendered post text out of memory for the length of a build.
+
+Text added to a :class:`ContentStore` is appended, utf-8 encoded, to a
+single file, and read back through a memory map when it's needed.
+Holding a :class:`StoredText` reference instead of the text itself
+means that the memory a build needs depends on how many pages are
+being rendered at once, not on how many posts there are; the
+operating system pages the mapped text in and out as it likes.
+"""
+import collections
+import errno
+import mmap
+import os
+import tempfile
+
+
+class StoredText(collections.namedtuple("StoredText", "store offset length")):
+    """Where a piece of text is in a ContentStore.
+    """
+    __slots__ = ()
+
+    def read(self):
+        return self.store.get(self.offset, self.length)
+
+
+class ContentStore(object):
+    """An append-only file of text, read through an mmap.
+
+    :arg directory: Directory to create the store file in; it is
+                    removed again by :meth:`close`.
+    """
+    def __init__(self, directory):
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, self.path = tempfile.mkstemp(
+            prefix="content-", suffix=".store", dir=directory)
+        self._file = os.fdopen(fd, "w+b")
+        self._map = None
+        self.size = 0
+
+    def add(self, text):
+        """Append `text` to the store, and return its StoredText.
+        """
+        data = text.encode("utf-8")
+        offset = self.size
+        self._file.write(data)
+        self.size += len(data)
+        return StoredText(self, offset, len(data))
+
+    def get(self, offset, length):
+        """Return the text stored at `offset`.
+        """
+        if self._file is None:
+            raise ValueError("Content store is closed: {0}".format(self.path))
+        if not length:
+            return u""
+        end = offset + length
+        if self._map is None or len(self._map) < end:
+            # Map the text appended since the file was last mapped:
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map[offset:end].decode("utf-8")
+
+    def flush(self):
+        """Write out the text added so far; needed before forking, so
+        that a child process doesn't write it a second time.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Close and remove the store file.
+        """
+        if self._file is None:
+            return
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""A small persistent, content-addressed cache.
+
+Entries are pickled into individual files below a cache directory,
+named by a key that is usually a hash of everything the cached value
+was computed from. Reading an entry touches its file, so the
+modification time records when the entry was last used; :meth:`prune`
+uses that to evict the least recently used entries once the cache
+grows beyond its size limit.
+"""
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import six
+from six.moves import cPickle as pickle
+
+
+logger = logging.getLogger("blogofile.blog.diskcache")
+
+
+def make_key(*parts):
+    """Return a hex digest identifying the sequence of `parts`.
+
+    Text parts are encoded as utf-8; anything else is hashed by its
+    ``repr``.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, six.text_type):
+            part = part.encode("utf-8")
+        elif not isinstance(part, six.binary_type):
+            part = repr(part).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+_plain_types = six.string_types + six.integer_types + (
+    six.binary_type, float, type(None))
+
+
+def fingerprint(value):
+    """Return a stable text representation of a configuration value,
+    suitable for hashing into a cache key.
+
+    Dictionaries (including HierarchicalCache objects) are rendered with
+    sorted keys, skipping the module and logger references that
+    Blogofile attaches to them; callables are represented by their
+    qualified name and compiled regular expressions by their pattern.
+    """
+    if isinstance(value, _plain_types):
+        # By far the most common case, so it's checked first
+        return repr(value)
+    elif isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: str(item[0]))
+        return "{" + ",".join(
+            "{0}:{1}".format(k, fingerprint(v)) for k, v in items
+            if k not in ("mod", "logger")) + "}"
+    elif isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(fingerprint(v) for v in value)) + "}"
+    elif isinstance(value, (list, tuple)):
+        return "[" + ",".join(fingerprint(v) for v in value) + "]"
+    elif hasattr(value, "pattern"):
+        # A compiled regular expression
+        return repr(value.pattern)
+    elif callable(value):
+        return "{0}.{1}".format(getattr(value, "__module__", None),
+                                getattr(value, "__name__", type(value)))
+    return repr(value)
+
+
+class DiskCache(object):
+    """A directory of pickled values addressed by key.
+
+    :arg directory: Where to keep the cache entries. It is created on
+                    first write.
+    :arg max_size: Total size in bytes the entries may take up before
+                   :meth:`prune` starts evicting the least recently
+                   used ones. ``None`` disables eviction.
+    """
+    def __init__(self, directory, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return ("<DiskCache dir='{0.directory}' hits={0.hits} "
+                "misses={0.misses} evictions={0.evictions}>".format(self))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key, default=None):
+        """Return the value stored under `key`, or `default`.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (IOError, OSError):
+            self.misses += 1
+            return default
+        except Exception:
+            # A truncated or stale entry; drop it and treat as a miss.
+            logger.debug("Discarding unreadable cache entry: " + path)
+            self._remove(path)
+            self.misses += 1
+            return default
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Store `value` under `key`.
+
+        The entry is written to a temporary file first and then renamed
+        into place, so a concurrent or interrupted build never sees a
+        partial entry.
+        """
+        path = self._path(key)
+        entry_dir = os.path.dirname(path)
+        try:
+            os.makedirs(entry_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Windows won't rename over an existing file.
+                self._remove(path)
+                os.rename(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        for root, dirs, files in os.walk(self.directory):
+            for fn in files:
+                if fn.startswith(".tmp"):
+                    continue
+                path = os.path.join(root, fn)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def size(self):
+        """Return the total size in bytes of all the cache entries.
+        """
+        return sum(size for mtime, size, path in self._entries())
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits within
+        `max_size`. Returns the number of entries evicted.
+        """
+        if self.max_size is None or not os.path.isdir(self.directory):
+            return 0
+        entries = sorted(self._entries())
+        total = sum(size for mtime, size, path in entries)
+        evicted = 0
+        for mtime, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Keep a manifest of the built site, and tell what changed in a build.
+
+Blogofile writes every file of the ``_site`` directory on every build,
+so to tools that look at modification times (rsync, HTTP caches) the
+whole site looks new each time. Once a build is done, :func:`update`
+hashes each file of the site and compares it with the manifest of the
+last build: files whose bytes are the same get their old modification
+time back, files with the same contents are hard linked together, and
+the URLs of the files that were added, changed or removed are listed
+for targeted cache invalidation.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+
+logger = logging.getLogger("blogofile.blog.manifest")
+
+MANIFEST_FILE = "manifest.json"
+CHANGES_FILE = "changes.json"
+
+
+def file_digest(path, chunk_size=65536):
+    """Return the sha1 hex digest of the file at `path`.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan(output_dir):
+    """Return a dictionary of the files below `output_dir`, by their
+    "/" separated path relative to it, with their (sha1, size).
+    """
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            rel_path = os.path.relpath(path, output_dir).replace(os.sep, "/")
+            files[rel_path] = (file_digest(path), os.path.getsize(path))
+    return files
+
+
+def path_urls(site_url, path):
+    """Return the URLs a file of the site is served at: an index.html
+    is also served at its directory's URL.
+    """
+    url = site_url.rstrip("/") + "/" + path
+    if path == "index.html" or path.endswith("/index.html"):
+        return [url[:-len("index.html")], url]
+    return [url]
+
+
+def link_duplicates(output_dir, files):
+    """Hard link the files with the same contents to the first of them.
+
+    Returns the groups of paths that are now one file, each sorted.
+    """
+    by_contents = {}
+    for path, contents in files.items():
+        by_contents.setdefault(contents, []).append(path)
+    groups = []
+    for paths in by_contents.values():
+        if len(paths) < 2:
+            continue
+        paths.sort()
+        source = os.path.join(output_dir, paths[0])
+        for path in paths[1:]:
+            target = os.path.join(output_dir, path)
+            if os.path.samefile(source, target):
+                continue
+            # Link to a temporary name, then move it over the copy, so
+            # the target is always there:
+            temp_path = target + ".bf-link"
+            os.link(source, temp_path)
+            os.rename(temp_path, target)
+        groups.append(paths)
+    return groups
+
+
+def unlink_duplicates(output_dir):
+    """Give each file below `output_dir` that is hard linked to others
+    in it a copy of its own, undoing :func:`link_duplicates`, so that a
+    file written in place changes only itself. Files only linked from
+    outside the site are left alone.
+
+    Returns the number of files copied.
+    """
+    by_inode = {}
+    for dirpath, dirnames, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path):
+                continue
+            stat = os.stat(path)
+            if stat.st_nlink > 1:
+                by_inode.setdefault(
+                    (stat.st_dev, stat.st_ino), []).append(path)
+    copied = 0
+    for paths in by_inode.values():
+        paths.sort()
+        for path in paths[1:]:
+            # Copy to a temporary name, then move it over the link:
+            temp_path = path + ".bf-link"
+            shutil.copy2(path, temp_path)
+            os.rename(temp_path, path)
+            copied += 1
+    return copied
+
+
+def update(output_dir, directory, site_url, hard_links=True, files=None):
+    """Update the manifest of the site built in `output_dir`.
+
+    The manifest (path -> sha1, size and modification time) and the
+    changes since the last build (the URLs of the added, changed and
+    removed files) are written as JSON to `directory`. `files` are the
+    files of the site as from :func:`scan`, if the caller already has
+    them.
+
+    Returns the changes.
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)["files"]
+    except (IOError, OSError, ValueError, KeyError):
+        previous = {}
+    if files is None:
+        files = scan(output_dir)
+    if hard_links and hasattr(os, "link"):
+        groups = link_duplicates(output_dir, files)
+    else:
+        groups = []
+    # Files that are hard linked together have one modification time;
+    # every path is its own group otherwise:
+    group_of = dict((path, [path]) for path in files)
+    for paths in groups:
+        for path in paths:
+            group_of[path] = paths
+    manifest = {}
+    changes = {"added": [], "changed": [], "removed": []}
+    for path, (sha1, size) in sorted(files.items()):
+        entry = previous.get(path)
+        if entry is None:
+            changes["added"].extend(path_urls(site_url, path))
+        elif (entry["sha1"], entry["size"]) != (sha1, size):
+            changes["changed"].extend(path_urls(site_url, path))
+    for path in sorted(previous):
+        if path not in files:
+            changes["removed"].extend(path_urls(site_url, path))
+    for path in sorted(files):
+        if path in manifest:
+            continue
+        paths = group_of[path]
+        unchanged_mtimes = [
+            previous[p]["mtime"] for p in paths
+            if p in previous and
+            (previous[p]["sha1"], previous[p]["size"]) == files[p]]
+        full_path = os.path.join(output_dir, path)
+        if os.stat(full_path).st_nlink > len(paths):
+            # Hard linked from outside the site (site.use_hard_links);
+            # leave the source file alone:
+            unchanged_mtimes = []
+        if unchanged_mtimes:
+            # Put back the time the contents last really changed:
+            mtime = max(unchanged_mtimes)
+            os.utime(full_path, (mtime, mtime))
+        else:
+            mtime = os.path.getmtime(full_path)
+        for p in paths:
+            sha1, size = files[p]
+            manifest[p] = {"sha1": sha1, "size": size, "mtime": mtime}
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    _write_json(manifest_path, {"files": manifest})
+    _write_json(os.path.join(directory, CHANGES_FILE), changes)
+    logger.info(
+        "Site changes: {0} URLs added, {1} changed, {2} removed; {3} "
+        "files hard linked".format(
+            len(changes["added"]), len(changes["changed"]),
+            len(changes["removed"]),
+            sum(len(paths) - 1 for paths in groups)))
+    return changes
+
+
+def _write_json(path, value):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(value, f, indent=1, sort_keys=True)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Windows won't rename over an existing file.
+        os.remove(path)
+        os.rename(temp_path, path)
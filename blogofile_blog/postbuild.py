@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""The blog's stages that run once the whole site is written: the site
+manifest and the pre-compressed files.
+
+Blogofile calls its config module's ``post_build`` function after
+writing the site; :func:`install` wraps it so that these stages run
+first, and the site's own ``post_build`` (which may deploy the site)
+sees their results.
+"""
+import blogofile.config
+from blogofile.cache import bf
+from . import compress, manifest
+
+
+def enabled():
+    blog = bf.config.plugins.blog
+    return bool(blog.manifest.enabled or blog.compress.enabled)
+
+
+def run():
+    """Run the enabled post-build stages on the site just written.
+    """
+    blog = bf.config.plugins.blog
+    output_dir = bf.writer.output_dir
+    files = manifest.scan(output_dir)
+    if blog.manifest.enabled:
+        manifest.update(output_dir, blog.manifest.directory,
+                        bf.config.site.url, blog.manifest.hard_links,
+                        files=files)
+    if blog.compress.enabled:
+        settings = blog.compress
+        compress.compress_site(
+            output_dir, settings.directory, settings.extensions,
+            settings.min_size, settings.encodings, settings.workers,
+            files=files)
+
+
+def install():
+    """Run the post-build stages before the site's post_build, if any
+    of them are enabled.
+    """
+    post_build = blogofile.config.post_build
+    if not enabled() or getattr(post_build, "runs_blog_stages", False):
+        return
+
+    def blog_post_build():
+        run()
+        post_build()
+    blog_post_build.runs_blog_stages = True
+    blogofile.config.post_build = blog_post_build
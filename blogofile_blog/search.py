@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Build a search index of the blog's posts for searching in the browser.
+
+A static site has no server to answer a search, so the build writes an
+inverted index (each term, and the ids of the posts it's in) for
+``search.js`` to look terms up in. The index is sharded by the first
+characters of the terms, so a search only downloads the shards of the
+terms it looks for, plus ``index.json``: the settings of the index, the
+names of its shards and a table of the (path, title, date) of each post
+by its id.
+
+The terms of each post are kept in a cache by a key of what they were
+made from, so only new and changed posts are read and tokenized again.
+"""
+import io
+import json
+import logging
+import os
+import re
+
+
+logger = logging.getLogger("blogofile.blog.search")
+
+INDEX_FILE = "index.json"
+CACHE_FILE = "terms.json"
+
+#: Bump when tokenize() changes, so that cached terms aren't reused.
+TOKENIZER_VERSION = 1
+
+#: Terms shorter than this aren't indexed.
+MIN_LENGTH = 2
+
+#: Words too common to be worth indexing.
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into
+is it its not of on or our she so than that the their them then there
+these they this to was we were what when which who will with you your
+""".split())
+
+_term_re = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text):
+    """Return the terms of `text`: its runs of letters and digits, in
+    lower case, leaving out stop words and terms that are too short.
+    """
+    return [term for term in _term_re.findall(text.lower())
+            if len(term) >= MIN_LENGTH and term not in STOP_WORDS]
+
+
+def shard_name(term, prefix_length):
+    """Return the name of the shard that `term` is in: the hex code
+    points of its first `prefix_length` characters.
+    """
+    return "-".join("{0:x}".format(ord(c)) for c in term[:prefix_length])
+
+
+def delta_encode(ids):
+    """Return ascending `ids` as the first id and the differences
+    between the ids after it, which are smaller numbers to write.
+    """
+    previous = 0
+    deltas = []
+    for post_id in ids:
+        deltas.append(post_id - previous)
+        previous = post_id
+    return deltas
+
+
+class SearchIndexBuilder(object):
+    """Build the search index of a site's posts.
+
+    :arg directory: Where the terms of each post are cached between
+                    builds.
+    :arg prefix_length: How many characters of a term pick its shard.
+
+    Posts are given ids in the order they're added; adding the oldest
+    first keeps the ids of posts, and so the shards, the same when
+    newer posts are added.
+    """
+    def __init__(self, directory, prefix_length=2):
+        self.directory = directory
+        self.prefix_length = prefix_length
+        self.posts = []
+        self.reindexed = 0
+        self._cached = self._load()
+        self._terms = {}   # key -> the post's terms, space separated
+        self._shards = {}  # shard name -> {term: [post id, ...]}
+
+    def _load(self):
+        try:
+            with io.open(os.path.join(self.directory, CACHE_FILE),
+                         encoding="utf-8") as f:
+                cache = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if cache.get("version") != TOKENIZER_VERSION:
+            return {}
+        return cache.get("terms", {})
+
+    def add(self, key, metadata, get_text):
+        """Add a post to the index.
+
+        :arg key: Identifies what the post's terms are made from; they
+                  are taken from the cache if it has them under `key`.
+        :arg metadata: The post's row in the table of posts.
+        :arg get_text: A function that returns the text of the post to
+                       tokenize, only called if its terms aren't cached.
+        """
+        terms = self._cached.get(key)
+        if terms is None:
+            terms = " ".join(sorted(set(tokenize(get_text()))))
+            self.reindexed += 1
+        self._terms[key] = terms
+        post_id = len(self.posts)
+        self.posts.append(metadata)
+        shards = self._shards
+        for term in terms.split():
+            name = shard_name(term, self.prefix_length)
+            try:
+                shard = shards[name]
+            except KeyError:
+                shard = shards[name] = {}
+            try:
+                shard[term].append(post_id)
+            except KeyError:
+                shard[term] = [post_id]
+
+    def write(self, output_dir):
+        """Write the index to `output_dir`, removing any shards of an
+        earlier index that are no longer used, and save the cache.
+
+        Returns the number of terms, of shards and of bytes written.
+        """
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        index = {
+            "version": TOKENIZER_VERSION,
+            "prefix_length": self.prefix_length,
+            "min_length": MIN_LENGTH,
+            "stop_words": sorted(STOP_WORDS),
+            "fields": ["path", "title", "date"],
+            "posts": self.posts,
+            "shards": sorted(self._shards),
+            }
+        size = _write_json(os.path.join(output_dir, INDEX_FILE), index)
+        terms = 0
+        written = set([INDEX_FILE])
+        for name, shard in self._shards.items():
+            terms += len(shard)
+            filename = name + ".json"
+            size += _write_json(
+                os.path.join(output_dir, filename),
+                dict((term, delta_encode(ids))
+                     for term, ids in shard.items()))
+            written.add(filename)
+        for filename in os.listdir(output_dir):
+            if filename.endswith(".json") and filename not in written:
+                os.remove(os.path.join(output_dir, filename))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        _write_json(os.path.join(self.directory, CACHE_FILE),
+                    {"version": TOKENIZER_VERSION, "terms": self._terms})
+        return terms, len(self._shards), size
+
+
+def _write_json(path, value):
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+    temp_path = path + ".tmp"
+    with io.open(temp_path, "wb") as f:
+        f.write(data)
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Windows won't rename over an existing file.
+        os.remove(path)
+        os.rename(temp_path, path)
+    return len(data)
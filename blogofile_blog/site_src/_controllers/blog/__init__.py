@@ -9,6 +9,7 @@ import six
 from blogofile.cache import bf
 from blogofile.cache import HierarchicalCache as HC
 import blogofile_blog
+from blogofile_blog import timings
 
 
 meta = {
@@ -23,6 +24,8 @@ tools = blogofile_blog.tools
 
 def iter_posts(conditional, limit=None):
     """Iterate over all the posts for which conditional(post) == True.
+
+    Kept for existing templates; blog.collection has indexed queries.
     """
     num_yielded = 0
     for post in blog.posts:
@@ -34,15 +37,26 @@ def iter_posts(conditional, limit=None):
 
 
 def iter_posts_published(limit=None):
-    """Iterate over all the posts to be published"""
-    def is_publishable(post):
-        if post.draft is False and post.permalink is not None:
-            return True
-    return iter_posts(is_publishable, limit)
+    """Iterate over all the posts to be published.
+
+    Kept for existing templates; this is blog.collection.published.
+    """
+    posts = blog.collection.published
+    if limit:
+        posts = posts[:limit]
+    return iter(posts)
 
 
 def init():
+    from . import post
     config["url"] = bf.config.site.url + config["path"]
+    # Compile the permalink and post filename templates now, so that a
+    # typo in either stops the build before anything is written:
+    if config.auto_permalink.enabled:
+        post.path_template(config.auto_permalink.path,
+                           post.permalink_placeholders)
+    post.path_template(config.auto_post_filename,
+                       post.post_filename_placeholders)
     if config.template_path:
         #Add the user's custom template paths first
         if isinstance(config.template_path, six.string_types):
@@ -61,19 +75,26 @@ def run():
     from . import archives
     from . import categories
     from . import chronological
+    from . import collection
     from . import feed
     from . import permapage
+    from . import render
+    from . import search
     blog.logger = logging.getLogger(config['name'])
     #Parse the posts
-    blog.posts = post.parse_posts(blog.post.source_dir)
+    with timings.phase("parse"):
+        blog.posts = post.parse_posts(blog.post.source_dir)
     if blog.post.post_process:
         #The user may define their own callback to process posts after
         #they have been parsed but before we've done any actual work.
-        blog.post.post_process()
+        with timings.phase("post_process"):
+            blog.post.post_process()
+    blog.collection = collection.PostCollection(blog.posts)
     blog.iter_posts = iter_posts
     blog.iter_posts_published = iter_posts_published
     blog.dir = bf.util.fs_site_path_helper(bf.writer.output_dir, blog.path)
     # Find all the categories and archives before we write any pages
+    blog.archive_years = []   # [Archive of a year, ...] (newest first)
     blog.archived_posts = {}  # "/archive/Year/Month" -> [post, post, ... ]
     blog.archive_links = []   # [("/archive/2009/12", name,
                               #   num_in_archive1), ...]
@@ -81,10 +102,24 @@ def run():
     blog.categorized_posts = {}  # "Category Name" -> [post, post, ... ]
     blog.all_categories = []  # [("Category 1",num_in_category_1), ...]
                               # (sorted alphabetically)
-    archives.sort_into_archives()
-    categories.sort_into_categories()
-    permapage.run()
-    chronological.run()
-    archives.run()
-    categories.run()
-    feed.run()
+    blog.tagged_posts = {}  # Tag -> [post, post, ... ]
+    blog.all_tags = []      # [(Tag, num_with_tag), ...] (sorted)
+    with timings.phase("sort_into_archives"):
+        archives.sort_into_archives()
+    with timings.phase("sort_into_categories"):
+        categories.sort_into_categories()
+    render.begin()
+    for controller in (permapage, chronological, archives, categories,
+                       feed):
+        with timings.phase(controller.__name__.rsplit(".", 1)[-1]):
+            controller.run()
+    # Renders the pages queued for the render workers, if any
+    with timings.phase("render"):
+        render.finish()
+    if blog.search.enabled and not blog.incremental.dry_run:
+        with timings.phase("search"):
+            search.run()
+    with timings.phase("finish"):
+        if not blog.incremental.dry_run:
+            post.write_rendered_post_assets(blog.posts)
+        post.save_rendered_posts()
@@ -12,39 +12,176 @@ from blogofile.cache import bf
 from . import (
     chronological,
     blog,
-    tools,
+    render,
 )
 
 
+class Archive(object):
+    """The published posts of a year, month or day.
+
+    `older` and `newer` are the archives of the same kind just before
+    and after this one that have posts, or None; `archives` are the
+    months of a year or the days of a month, newest first.
+    """
+    __slots__ = ("link", "name", "posts", "archives", "older", "newer")
+
+    def __init__(self, link, name):
+        self.link = link
+        self.name = name
+        self.posts = []
+        self.archives = []
+        self.older = None
+        self.newer = None
+
+    def __repr__(self):
+        return "<Archive {0} of {1} posts>".format(self.link, len(self.posts))
+
+    @property
+    def url(self):
+        """The path of the first page of the archive's posts.
+        """
+        return bf.util.site_path_helper(
+            blog.path, self.link, "1", trailing_slash=True)
+
+    @property
+    def index_url(self):
+        """The path of a year's index (with blog.archives.index_by_year).
+        """
+        return bf.util.site_path_helper(
+            blog.path, self.link, trailing_slash=True)
+
+    def nav(self, index=False):
+        """Return the name of the archive, and the (url, name) of the
+        older and newer archives (of their indexes, if `index`), for a
+        template environment.
+        """
+        def link(archive):
+            if archive is None:
+                return None
+            return (archive.index_url if index else archive.url, archive.name)
+        return {"archive_name": self.name,
+                "older_archive": link(self.older),
+                "newer_archive": link(self.newer)}
+
+
 def run():
     write_monthly_archives()
+    if blog.archives.yearly:
+        write_yearly_archives()
+    if blog.archives.daily:
+        write_daily_archives()
     write_index()
 
 
+def _link(newest_first):
+    for older, newer in zip(newest_first[1:], newest_first):
+        older.newer = newer
+        newer.older = older
+
+
 def sort_into_archives():
-    #This is run in 0.initial.py
-    for post in blog.iter_posts_published():
-        link = post.date.strftime("archive/%Y/%m")
+    """Build the tree of year, month and day archives.
+
+    This is a single pass over the published posts; a post's archives
+    are looked up by its (year, month, day), so the date is only
+    formatted for the first post of each archive. blog.archive_years
+    are the years, newest first; blog.archived_posts and
+    blog.archive_links index the months.
+    """
+    years = {}   # year -> Archive
+    months = {}  # (year, month) -> Archive
+    days = {}    # (year, month, day) -> Archive
+    for post in blog.collection.published:
+        date = post.date
+        key = (date.year, date.month, date.day)
         try:
-            blog.archived_posts[link].append(post)
+            day = days[key]
         except KeyError:
-            blog.archived_posts[link] = [post]
-    for archive, posts in sorted(
-        list(blog.archived_posts.items()), key=operator.itemgetter(0),
-        reverse=True):
-        name = posts[0].date.strftime("%B %Y")
-        blog.archive_links.append((archive, name, len(posts)))
+            day = days[key] = Archive(
+                date.strftime("archive/%Y/%m/%d"), date.strftime("%B %d, %Y"))
+        day.posts.append(post)
+        try:
+            month = months[key[:2]]
+        except KeyError:
+            month = months[key[:2]] = Archive(
+                date.strftime("archive/%Y/%m"), date.strftime("%B %Y"))
+        month.posts.append(post)
+        try:
+            year = years[key[0]]
+        except KeyError:
+            year = years[key[0]] = Archive(
+                date.strftime("archive/%Y"), date.strftime("%Y"))
+        year.posts.append(post)
+    newest_first = operator.itemgetter(0)
+    all_months = []
+    all_days = []
+    for key, month in sorted(months.items(), key=newest_first, reverse=True):
+        years[key[0]].archives.append(month)
+        blog.archived_posts[month.link] = month.posts
+        blog.archive_links.append((month.link, month.name, len(month.posts)))
+        all_months.append(month)
+    for key, day in sorted(days.items(), key=newest_first, reverse=True):
+        months[key[:2]].archives.append(day)
+        all_days.append(day)
+    blog.archive_years.extend(year for key, year in sorted(
+        years.items(), key=newest_first, reverse=True))
+    # Months and days link to their neighbours in other years and months:
+    _link(blog.archive_years)
+    _link(all_months)
+    _link(all_days)
+
+
+def _write_archives(archives, paginated=True):
+    """Write the pages of `archives`. The pages after the first of a
+    `paginated` archive go below blog.pagination_dir, so the tenth page
+    of a year (archive/2012/10) can't be written over October, nor the
+    tenth page of a month over its tenth day.
+    """
+    pagination_dir = blog.pagination_dir.strip("/") if paginated else None
+    for archive in archives:
+        chronological.write_blog_chron(
+            archive.posts, root=archive.link, extra_env=archive.nav(),
+            pagination_dir=pagination_dir)
 
 
 def write_monthly_archives():
-    for link, posts in list(blog.archived_posts.items()):
-        chronological.write_blog_chron(posts, root=link)
+    # Only days can clash with the pages of a month, so months keep
+    # their archive/2012/11/2 pages unless there are daily archives:
+    for year in blog.archive_years:
+        _write_archives(year.archives, paginated=blog.archives.daily)
+
+
+def write_yearly_archives():
+    _write_archives(blog.archive_years)
+
+
+def write_daily_archives():
+    for year in blog.archive_years:
+        for month in year.archives:
+            _write_archives(month.archives)
 
 
 def write_index():
-    month_posts = list(
-        map(operator.itemgetter(1),
-            sorted(blog.archived_posts.items(), reverse=True)))
-    env = {"month_posts": month_posts}
-    tools.materialize_template("archive_index.mako", bf.util.path_join(
-            blog.path, "archive/index.html"), env)
+    """Write the archive index. It lists every post by month, unless
+    blog.archives.index_by_year is set: then it lists the months of each
+    year, and each year has its own index of posts by month.
+    """
+    index = bf.util.path_join(blog.path, "archive/index.html")
+    if not blog.archives.index_by_year:
+        month_posts = [month.posts for year in blog.archive_years
+                       for month in year.archives]
+        env = {"month_posts": month_posts}
+        render.materialize_template("archive_index.mako", index, env)
+        return
+    # (url, name, number of posts, [(url, name, number of posts), ...])
+    # of each year and its months:
+    years = [(year.index_url, year.name, len(year.posts),
+              [(month.url, month.name, len(month.posts))
+               for month in year.archives])
+             for year in blog.archive_years]
+    render.materialize_template("archive_years.mako", index, {"years": years})
+    for year in blog.archive_years:
+        env = year.nav(index=True)
+        env["month_posts"] = [month.posts for month in year.archives]
+        render.materialize_template("archive_index.mako", bf.util.path_join(
+            blog.path, year.link, "index.html"), env)
@@ -1,82 +1,126 @@
 # -*- coding: utf-8 -*-
-import shutil
-import operator
 from blogofile.cache import bf
 
-from . import blog, tools
+from . import blog, render
 from . import feed
+from .post import Tag, intern_category
 
 
 def run():
     write_categories()
+    if blog.tag_dir:
+        write_tags()
 
 
 def sort_into_categories():
-    categories = set()
-    for post in blog.iter_posts_published():
-        categories.update(post.categories)
-    for category in categories:
-        category_posts = [post for post in blog.iter_posts_published()
-                            if category in post.categories]
-        blog.categorized_posts[category] = category_posts
-    for category, posts in sorted(
-        list(blog.categorized_posts.items()), key=operator.itemgetter(0)):
-        blog.all_categories.append((category, len(posts)))
+    """Index the published posts by category and, unless tag pages are
+    turned off (blog.tag_dir is None), by tag.
+
+    This is a single pass over the posts, which are already sorted by
+    date, so the list of posts for each category and tag comes out
+    sorted too. There is one Category (or Tag) object per name, so each
+    slug and path is only worked out once; the categories of the posts
+    are replaced by those objects.
+    """
+    categories = {}  # name -> Category
+    tags = {}        # name -> Tag
+    index_tags = bool(blog.tag_dir)
+    for post in blog.collection.published:
+        post_categories = set()
+        shared = True
+        for category in post.categories:
+            try:
+                known = categories[category.name]
+            except KeyError:
+                known = categories[category.name] = category
+                blog.categorized_posts[category] = []
+            blog.categorized_posts[known].append(post)
+            post_categories.add(known)
+            shared = shared and known is category
+        if not shared:
+            # A post kept from the last build (blog.post.keep_parsed)
+            # keeps its set, so its categories stay in the same order.
+            post.categories = post_categories
+        if not index_tags:
+            continue
+        for name in post.tags:
+            try:
+                tag = tags[name]
+            except KeyError:
+                tag = tags[name] = intern_category(Tag, name)
+                blog.tagged_posts[tag] = []
+            blog.tagged_posts[tag].append(post)
+    for category in sorted(blog.categorized_posts):
+        blog.all_categories.append(
+            (category, len(blog.categorized_posts[category])))
+    for tag in sorted(blog.tagged_posts):
+        blog.all_tags.append((tag, len(blog.tagged_posts[tag])))
 
 
 def write_categories():
     """Write all the blog posts in categories.
     """
-    root = bf.util.path_join(blog.path, blog.category_dir)
-    #Find all the categories:
-    categories = set()
-    for post in blog.iter_posts_published():
-        categories.update(post.categories)
-    for category, category_posts in list(blog.categorized_posts.items()):
-        #Write category RSS feed
+    write_listings(blog.categorized_posts, blog.category_dir, "category")
+
+
+def write_tags():
+    """Write all the blog posts by tag.
+    """
+    write_listings(blog.tagged_posts, blog.tag_dir, "tag")
+
+
+def write_listings(listed_posts, listing_dir, env_name):
+    """Write the feeds and paginated pages of each category or tag in
+    `listed_posts`.
+
+    :arg listed_posts: Maps each Category or Tag to its posts.
+    :arg listing_dir: The directory below the blog for these pages.
+    :arg env_name: The name the Category or Tag is given in the
+                   template environment.
+    """
+    root = bf.util.path_join(blog.path, listing_dir)
+    # In order, so the sitemap lists them the same way every build:
+    for term in sorted(listed_posts):
+        term_posts = listed_posts[term]
+        #Write RSS and Atom feeds
         rss_path = bf.util.fs_site_path_helper(
-            blog.path, blog.category_dir,
-            category.url_name, "feed")
-        feed.write_feed(category_posts, rss_path, "rss.mako")
+            blog.path, listing_dir, term.url_name, "feed")
+        feed.write_feed(term_posts, rss_path, "rss.mako")
         atom_path = bf.util.fs_site_path_helper(
-            blog.path, blog.category_dir,
-            category.url_name, "feed", "atom")
-        feed.write_feed(category_posts, atom_path, "atom.mako")
+            blog.path, listing_dir, term.url_name, "feed", "atom")
+        feed.write_feed(term_posts, atom_path, "atom.mako")
         page_num = 1
         while True:
-            path = bf.util.path_join(root, category.url_name,
+            path = bf.util.path_join(root, term.url_name,
                                 str(page_num), "index.html")
-            page_posts = category_posts[:blog.posts_per_page]
-            category_posts = category_posts[blog.posts_per_page:]
+            page_posts = term_posts[:blog.posts_per_page]
+            term_posts = term_posts[blog.posts_per_page:]
             #Forward and back links
             if page_num > 1:
                 prev_link = bf.util.site_path_helper(
-                    blog.path, blog.category_dir, category.url_name,
+                    blog.path, listing_dir, term.url_name,
                                            str(page_num - 1))
             else:
                 prev_link = None
-            if len(category_posts) > 0:
+            if len(term_posts) > 0:
                 next_link = bf.util.site_path_helper(
-                    blog.path, blog.category_dir, category.url_name,
+                    blog.path, listing_dir, term.url_name,
                                            str(page_num + 1))
             else:
                 next_link = None
             env = {
-                "category": category,
+                env_name: term,
                 "posts": page_posts,
                 "prev_link": prev_link,
                 "next_link": next_link,
                 "page_num": page_num
             }
-            tools.materialize_template("chronological.mako", path, env)
-            #Copy category/1 to category/index.html
+            render.materialize_template("chronological.mako", path, env)
+            #Copy the first page to index.html
             if page_num == 1:
-                shutil.copyfile(
-                        bf.util.path_join(bf.writer.output_dir, path),
-                        bf.util.path_join(
-                                bf.writer.output_dir, root, category.url_name,
-                                "index.html"))
+                render.copy_page(path, bf.util.path_join(
+                        root, term.url_name, "index.html"))
             #Prepare next iteration
             page_num += 1
-            if len(category_posts) == 0:
+            if len(term_posts) == 0:
                 break
@@ -4,33 +4,48 @@
 from blogofile.cache import bf
 from . import (
     blog,
-    tools,
+    render,
 )
 
 
 def run():
-    posts = list(blog.iter_posts_published())
+    posts = blog.collection.published
     write_blog_chron(posts=posts, root=blog.pagination_dir.lstrip("/"))
     write_blog_first_page(posts)
 
 
-def write_blog_chron(posts, root):
+def write_blog_chron(posts, root, extra_env=None, pagination_dir=None):
     """Write the pages, num_per_page posts per page.
+
+    `extra_env` is added to the template environment of each page, such
+    as the navigation between archives. With `pagination_dir`, the
+    pages after the first are written below it (root/1, then
+    root/pagination_dir/2, ...), so they can't clash with other
+    directories of `root`.
     """
+    def page_path(num):
+        if pagination_dir is None or num == 1:
+            return str(num)
+        return pagination_dir + "/" + str(num)
+
+    def page_link(from_num, to_num):
+        return "../" * page_path(from_num).count("/") + "../" + \
+            page_path(to_num)
+
     page_num = 1
     post_num = 0
     while len(posts) > post_num:
         page_posts = posts[post_num:post_num + blog.posts_per_page]
         post_num += blog.posts_per_page
         if page_num > 1:
-            prev_link = "../" + str(page_num - 1)
+            prev_link = page_link(page_num, page_num - 1)
         else:
             prev_link = None
         if len(posts) > post_num:
-            next_link = "../" + str(page_num + 1)
+            next_link = page_link(page_num, page_num + 1)
         else:
             next_link = None
-        page_dir = bf.util.path_join(blog.path, root, str(page_num))
+        page_dir = bf.util.path_join(blog.path, root, page_path(page_num))
         fn = bf.util.path_join(page_dir, "index.html")
         env = {
             "posts": page_posts,
@@ -38,7 +53,9 @@ def write_blog_chron(posts, root):
             "prev_link": prev_link,
             "page_num": page_num
         }
-        tools.materialize_template("chronological.mako", fn, env)
+        if extra_env:
+            env.update(extra_env)
+        render.materialize_template("chronological.mako", fn, env)
         page_num += 1
 
 
@@ -57,4 +74,4 @@ def write_blog_first_page(posts):
             "next_link": next_link,
             "prev_link": None
         }
-        tools.materialize_template("chronological.mako", path, env)
+        render.materialize_template("chronological.mako", path, env)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Indexed queries over the posts of a build.
+
+The blog's controllers and templates used to find posts by walking all
+of ``blog.posts`` with a predicate, on every call. A
+:class:`PostCollection` is built once, after the posts are parsed and
+post processed, as ``blog.collection``: it keeps the published posts,
+looks posts up by permalink, slug, filename and guid in a dictionary,
+and answers date queries (the posts between two dates, the latest
+posts, the neighbours of a post) by bisecting a sorted index.
+"""
+import bisect
+import datetime
+import operator
+from . import blog
+from .post import get_timezone, is_published
+
+
+class PostCollection(object):
+    """The posts of a build, in the order of `posts` (newest first, as
+    parse_posts sorts them), with indexes for looking them up.
+
+    Iterating over, indexing and taking the length of a collection work
+    on all the posts, drafts included; `published` is the list of the
+    published ones, and the date queries only return published posts.
+    The dates passed to the date queries may be naive, in which case
+    they're taken to be in the blog's timezone.
+    """
+    def __init__(self, posts):
+        self.posts = list(posts)
+        self.published = [post for post in self.posts if is_published(post)]
+        self._by_permalink = {}
+        self._by_slug = {}
+        self._by_filename = {}
+        self._by_guid = {}
+        for post in self.posts:
+            # The first (newest) post wins where a value isn't unique:
+            for index, value in ((self._by_permalink, post.permalink),
+                                 (self._by_slug, post.slug),
+                                 (self._by_filename, post.filename),
+                                 (self._by_guid, post.guid)):
+                if value is not None and value not in index:
+                    index[value] = post
+        # The published posts newest first, with posts of the same date
+        # in their order in `posts`, and their dates oldest first for
+        # bisecting; the post at index i of _dates is at -1 - i.
+        self._newest = sorted(self.published,
+                              key=operator.attrgetter("date"), reverse=True)
+        self._dates = [post.date for post in reversed(self._newest)]
+        self._positions = dict(
+            (id(post), i) for i, post in enumerate(self._newest))
+
+    def __repr__(self):
+        return "<PostCollection of {0} posts, {1} published>".format(
+            len(self.posts), len(self.published))
+
+    def __len__(self):
+        return len(self.posts)
+
+    def __iter__(self):
+        return iter(self.posts)
+
+    def __getitem__(self, index):
+        return self.posts[index]
+
+    def by_permalink(self, permalink, default=None):
+        return self._by_permalink.get(permalink, default)
+
+    def by_slug(self, slug, default=None):
+        return self._by_slug.get(slug, default)
+
+    def by_filename(self, filename, default=None):
+        return self._by_filename.get(filename, default)
+
+    def by_guid(self, guid, default=None):
+        return self._by_guid.get(guid, default)
+
+    def latest(self, count=None):
+        """Return the `count` newest published posts, or all of them.
+        """
+        if count is None:
+            return list(self._newest)
+        return self._newest[:count]
+
+    def between(self, start=None, end=None):
+        """Return the published posts dated from `start` up to, but not
+        including, `end`, newest first. Either end may be None to leave
+        the range open.
+        """
+        count = len(self._dates)
+        first = 0 if start is None else bisect.bisect_left(
+            self._dates, self._aware(start))
+        last = count if end is None else bisect.bisect_left(
+            self._dates, self._aware(end))
+        if first >= last:
+            return []
+        return self._newest[count - last:count - first]
+
+    def neighbours(self, post):
+        """Return the published posts just (older, newer) than `post`,
+        either of which may be None; also None for both if `post` isn't
+        published.
+        """
+        try:
+            i = self._positions[id(post)]
+        except KeyError:
+            return None, None
+        older = self._newest[i + 1] if i + 1 < len(self._newest) else None
+        newer = self._newest[i - 1] if i > 0 else None
+        return older, newer
+
+    def _aware(self, date):
+        if isinstance(date, datetime.datetime):
+            if date.tzinfo is None:
+                return get_timezone(blog.timezone).localize(date)
+            return date
+        # A date is the start of its day:
+        return get_timezone(blog.timezone).localize(
+            datetime.datetime(date.year, date.month, date.day))
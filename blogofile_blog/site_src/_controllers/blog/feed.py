@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 from blogofile.cache import bf
-from . import blog, tools
+from . import blog, render
 
 
 def run():
-    posts = list(blog.iter_posts_published())
+    posts = blog.collection.published[:blog.posts_per_feed]
     write_feed(posts, bf.util.path_join(blog.path, "feed"), "rss.mako")
     write_feed(
         posts, bf.util.path_join(blog.path, "feed", "atom"), "atom.mako")
 
 
 def write_feed(posts, root, template):
+    """Write a feed of the first `blog.posts_per_feed` of `posts`.
+
+    The feed templates put together the entries of each post from
+    blog.fragments, so a post in several feeds is only rendered once
+    for each feed format.
+    """
     root = root.lstrip("/")
     path = bf.util.path_join(root, "index.xml")
     blog.logger.info("Writing RSS/Atom feed: " + path)
-    env = {"posts": posts, "root": root}
-    tools.materialize_template(template, path, env)
+    env = {"posts": posts[:blog.posts_per_feed], "root": root}
+    render.materialize_template(template, path, env)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""Incremental builds.
+
+Record, for every page the blog writes, what it was made from:
+
+ * the posts passed to its template,
+ * the template files it could have used (all of the templates in the
+   plugin's template lookup directories),
+ * the site, blog and filter configuration keys,
+ * the source code of the filters and of the post module, which the
+   post cache is also keyed by, and
+ * the titles, dates, permalinks and categories of all of the posts,
+   which show up in the navigation of every page.
+
+The record is kept in ``blog.incremental.directory`` between builds,
+along with a copy of each rendered page. When a page's inputs are the
+same as in the last build, the copy is put back in place instead of
+rendering the template again. Blogofile empties the _site directory at
+the start of every build, so reused pages are always copied back, except
+in place builds (``blogofile blog watch``), which write into the
+_site directory of the last build and leave reused pages where they
+are.
+"""
+import hashlib
+import json
+import logging
+import operator
+import os
+import shutil
+import tempfile
+from blogofile.cache import bf
+from blogofile_blog.compress import remove_siblings
+from blogofile_blog.diskcache import fingerprint, make_key
+from . import blog, tools
+from .post import Post, post_cache_fingerprint, write_assets
+
+
+logger = logging.getLogger("blogofile.blog.incremental")
+
+# Blog config entries that hold the state of a build, or settings that
+# don't change what the pages look like:
+runtime_config_keys = frozenset([
+    "mod", "controllers", "filters", "logger", "posts", "iter_posts",
+    "iter_posts_published", "dir", "archived_posts", "archive_links",
+    "categorized_posts", "all_categories", "tagged_posts", "all_tags",
+    "incremental", "fragments", "render_workers", "manifest", "compress",
+    "collection", "archive_years", "sitemap", "search",
+    "fragment_cache_size",
+])
+
+# The record directory and page entries saved by the last build of this
+# process, which an in place build reads instead of the saved record:
+_last_outputs = (None, None)
+
+
+class DependencyGraph(object):
+    """The pages written by the blog and the inputs of each one.
+
+    :arg directory: Where the record of the last build and the copies
+                    of its pages are kept.
+    :arg dry_run: Only work out which pages would be rendered, reused
+                  or removed; don't render, copy or record anything.
+    :arg in_place: The _site directory still holds the pages of the
+                   last build, rather than having been emptied.
+    """
+    version = 1
+
+    def __init__(self, directory, dry_run=False, in_place=False):
+        self.directory = directory
+        self.dry_run = dry_run
+        self.in_place = in_place
+        self.record_path = os.path.join(directory, "graph.json")
+        self.previous = {}  # location -> entry recorded by the last build
+        self.outputs = {}   # location -> entry for this build
+        self.plan = []      # [(action, location, reason), ...]
+        self.templates = {}
+        self.config = {}
+        self.base_key = None
+        self._post_keys = {}
+
+    def load(self):
+        """Load the record of the last build, if there is one.
+        """
+        directory, outputs = _last_outputs
+        if self.in_place and directory == self.directory:
+            self.previous = outputs
+            return
+        try:
+            with open(self.record_path) as f:
+                record = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if record.get("version") == self.version:
+            self.previous = record.get("outputs", {})
+
+    def begin(self, posts):
+        """Fingerprint the inputs that every page depends on.
+        """
+        self.templates = self._template_keys()
+        self.config = self._config_keys()
+        navigation = [
+            (p.filename, p.permalink, p.title, p.draft, p.date,
+             sorted(c.name for c in p.categories), sorted(p.tags))
+            for p in posts]
+        self.base_key = make_key(
+            fingerprint(self.templates), fingerprint(self.config),
+            fingerprint(navigation), post_cache_fingerprint())
+
+    def _template_keys(self):
+        temp_dir = getattr(bf.writer, "temp_proc_dir", None)
+        keys = {}
+        for directory in tools.template_lookup.directories:
+            if directory == temp_dir or not os.path.isdir(directory):
+                continue
+            for root, dirs, files in os.walk(directory):
+                for fn in files:
+                    path = os.path.join(root, fn)
+                    with open(path, "rb") as f:
+                        keys[path] = hashlib.sha1(f.read()).hexdigest()
+        return keys
+
+    def _config_keys(self):
+        keys = {}
+        namespaces = (("site", bf.config.site), ("blog", blog),
+                      ("filters", bf.config.filters))
+        for prefix, namespace in namespaces:
+            for name, value in namespace.items():
+                if prefix == "blog" and name in runtime_config_keys:
+                    continue
+                if isinstance(value, dict) and not value:
+                    # Looking up an unset name in a HierarchicalCache
+                    # creates an empty one; treat it as still unset.
+                    continue
+                keys["{0}.{1}".format(prefix, name)] = make_key(
+                    fingerprint(value))
+        return keys
+
+    def _post_key(self, post):
+        try:
+            return self._post_keys[id(post)]
+        except KeyError:
+            key = self._post_keys[id(post)] = make_key(
+                post.filename, post.source_digest)
+            return key
+
+    def _env_fingerprint(self, value, posts):
+        """Return the fingerprint of a template environment value, with
+        each post in it standing for its key, and add the posts to
+        `posts`.
+
+        This is fingerprint() with posts handled on the way, rather
+        than a second walk over a copy of the value.
+        """
+        if isinstance(value, Post):
+            posts.append(value)
+            return repr(self._post_key(value))
+        elif value is blog.posts:
+            # Covered by the navigation fingerprint
+            return repr("<all posts>")
+        elif isinstance(value, (list, tuple)):
+            return "[" + ",".join(
+                [self._env_fingerprint(v, posts) for v in value]) + "]"
+        elif isinstance(value, dict):
+            items = sorted(value.items(), key=lambda item: str(item[0]))
+            return "{" + ",".join(
+                ["{0}:{1}".format(k, self._env_fingerprint(v, posts))
+                 for k, v in items if k not in ("mod", "logger")]) + "}"
+        return fingerprint(value)
+
+    def _page_path(self, signature):
+        return os.path.join(self.directory, "pages", signature[:2], signature)
+
+    def _output_path(self, location):
+        return bf.util.path_join(bf.writer.output_dir, location)
+
+    def plan_page(self, template_name, location, env):
+        """Decide whether the page at `location` has to be rendered.
+
+        Returns True if it does. Otherwise the copy from the last build
+        is put in place, unless this is a dry run.
+        """
+        posts = []
+        items = sorted(env.items(), key=operator.itemgetter(0))
+        env_key = "[" + ",".join([
+            "[{0!r},{1}]".format(name, self._env_fingerprint(value, posts))
+            for name, value in items]) + "]"
+        signature = make_key(self.base_key, template_name, location, env_key)
+        previous = self.previous.get(location)
+        entry = self.outputs[location] = {
+            "signature": signature,
+            "template": template_name,
+            "posts": sorted(set(p.filename for p in posts)),
+            "assets": [],
+            }
+        entry["_posts"] = posts
+        if previous is None:
+            self.plan.append(("render", location, "new"))
+            return self._render(location)
+        if (previous["signature"] != signature
+                or not os.path.exists(self._page_path(signature))):
+            self.plan.append(("render", location, "changed"))
+            return self._render(location)
+        self.plan.append(("reuse", location, None))
+        entry["assets"] = previous.get("assets", [])
+        output_path = self._output_path(location)
+        if self.in_place and os.path.exists(output_path):
+            return False
+        if not self.dry_run:
+            bf.util.mkdir(os.path.dirname(output_path))
+            shutil.copyfile(self._page_path(signature), output_path)
+            write_assets(entry["assets"])
+        return False
+
+    def _render(self, location):
+        if self.dry_run:
+            return False
+        if self.in_place:
+            # The page may be hard linked to others (blog.manifest), so
+            # write a new file rather than over the old one:
+            self._remove(self._output_path(location))
+        return True
+
+    def rendered_page(self, location):
+        """Keep a copy of the page just rendered at `location`.
+        """
+        entry = self.outputs[location]
+        assets = set()
+        for post in entry["_posts"]:
+            if post.rendered:
+                assets.update(post.assets)
+        entry["assets"] = sorted(list(asset) for asset in assets)
+        page_path = self._page_path(entry["signature"])
+        bf.util.mkdir(os.path.dirname(page_path))
+        shutil.copyfile(self._output_path(location), page_path)
+
+    def finish(self):
+        """Remove the pages that are no longer written, and save the
+        record of this build.
+        """
+        global _last_outputs
+        current_signatures = set(
+            entry["signature"] for entry in self.outputs.values())
+        for location, entry in sorted(self.previous.items()):
+            if location not in self.outputs:
+                self.plan.append(("remove", location, None))
+            if self.dry_run or entry["signature"] in current_signatures:
+                continue
+            self._remove(self._page_path(entry["signature"]))
+            if location not in self.outputs:
+                # Only still there if _site wasn't emptied first, as
+                # are its compressed siblings (blog.compress):
+                self._remove(self._output_path(location))
+                remove_siblings(self._output_path(location))
+                if self.in_place:
+                    self._remove_empty_dirs(location)
+        if self.dry_run:
+            return
+        for entry in self.outputs.values():
+            del entry["_posts"]
+        record = {
+            "version": self.version,
+            "templates": self.templates,
+            "config": self.config,
+            "outputs": self.outputs,
+            }
+        bf.util.mkdir(self.directory)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            # dumps, not dump, and compact, so the C encoder is used:
+            f.write(json.dumps(record, sort_keys=True, separators=(",", ":")))
+        self._remove(self.record_path)
+        os.rename(tmp_path, self.record_path)
+        _last_outputs = (self.directory, self.outputs)
+        counts = self.counts()
+        logger.info("Incremental build: {render} pages rendered, "
+                    "{reuse} reused, {remove} removed".format(**counts))
+
+    def counts(self):
+        counts = {"render": 0, "reuse": 0, "remove": 0}
+        for action, location, reason in self.plan:
+            counts[action] += 1
+        return counts
+
+    def _remove_empty_dirs(self, location):
+        """Remove the directories of the page at `location` that are
+        left empty, up to the _site directory.
+        """
+        directory = os.path.dirname(location.strip("/"))
+        while directory:
+            try:
+                os.rmdir(bf.util.path_join(bf.writer.output_dir, directory))
+            except OSError:
+                # Not empty
+                return
+            directory = os.path.dirname(directory)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
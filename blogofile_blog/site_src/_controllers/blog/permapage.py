@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
-import re
 try:
     from urllib.parse import urlparse
 except ImportError:
     from urlparse import urlparse
 from blogofile.cache import bf
-from . import blog, tools
+from . import blog, render
 
 
 def run():
@@ -14,12 +13,11 @@ def run():
 
 def write_permapages():
     "Write blog posts to their permalink locations"
-    site_re = re.compile(bf.config.site.url, re.IGNORECASE)
     num_posts = len(blog.posts)
     #Iterate over all the blog posts, even posts set to Draft:
     for i, post in enumerate(blog.posts):
         if post.permalink:
-            path = site_re.sub("", post.permalink)
+            path = post.permalink_path
             blog.logger.info("Writing permapage for post: {0}".format(path))
         else:
             #Permalinks MUST be specified. No permalink, no page.
@@ -34,5 +32,5 @@ def write_permapages():
             env['prev_post'] = blog.posts[i + 1]
         if i > 0:
             env['next_post'] = blog.posts[i - 1]
-        tools.materialize_template(
+        render.materialize_template(
             "permapage.mako", bf.util.path_join(path, "index.html"), env)
@@ -5,10 +5,14 @@ from __future__ import print_function
 
 __author__ = "Ryan McGuire (ryan@enigmacurry.com)"
 
+import atexit
 import base64
+import copy
 from datetime import datetime
 import hashlib
+import inspect
 import logging
+import multiprocessing
 import operator
 import os
 import re
@@ -27,11 +31,22 @@ except ImportError:
     from urlparse import urlparse        # Python 2
 import pytz
 import six
+from six.moves import intern
 import yaml
+try:
+    from yaml import CSafeLoader as YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as YAMLLoader   # PyYAML without libyaml
 from blogofile import util
 from blogofile.util import create_slug
 # TODO: Why not `blogofile.cache import bf`
 import blogofile_bf as bf
+import blogofile_blog
+from blogofile_blog import timings
+from blogofile_blog.blocks import replace_blocks
+from blogofile_blog.contentstore import ContentStore, StoredText
+from blogofile_blog.diskcache import DiskCache, fingerprint, make_key
+from blogofile_blog.text import html_excerpt, html_text_stats
 from . import config as blog_config
 
 
@@ -53,6 +68,8 @@ reserved_field_names = {
     "permalink": ("The full permanent URL for this post. "
                   "Automatically created if not provided"),
     "path": "The path from the permalink of the post",
+    "permalink_path": ("The path of the permalink below the site URL, "
+                       "reserved internally"),
     "guid": ("A unique hash for the post, if not provided it "
              "is assumed that the permalink is the guid"),
     "slug": ("The title part of the URL for the post, if not "
@@ -66,14 +83,66 @@ reserved_field_names = {
     "filter": "synonym for filters",
     "draft": ("If 'true' or 'True', the post is considered to be only a "
               "draft and not to be published."),
-    "source": "Reserved internally",
+    "source_digest": "A hash of the post source, reserved internally",
+    "extras": "Reserved internally",
     "yaml": "Reserved internally",
     "content": "Reserved internally",
     "filename": "Reserved internally",
+    "word_count": "The number of words in the rendered post",
+    "reading_time": "Roughly how many minutes it takes to read the post",
+    "text_digest": ("A hash of the text of the rendered post, for "
+                    "noticing when it changes"),
+    "assets": "Reserved internally",
     "encoding": "The file encoding format",
 }
 
 
+# The line between the YAML header and the body of a post:
+yaml_separator = re.compile("^---$", re.MULTILINE)
+
+# The default date_format, which is parsed without strptime:
+default_date_format = "%Y/%m/%d %H:%M:%S"
+_default_date_re = re.compile(
+    r"(\d{4})/(\d\d)/(\d\d) (\d\d):(\d\d):(\d\d)\Z")
+
+_timezones = {}
+
+
+def load_front_matter(yaml_src):
+    """Load the YAML header of a post.
+
+    Only plain YAML is allowed (no python/ tags), and it's loaded with
+    libyaml when PyYAML has it.
+    """
+    return yaml.load(yaml_src, Loader=YAMLLoader)
+
+
+def parse_date(text, date_format):
+    """Return datetime.strptime(text, date_format), without strptime
+    for the common case of the default date_format.
+    """
+    if date_format == default_date_format:
+        # Raises TypeError for a date that isn't text, as strptime does
+        match = _default_date_re.match(text)
+        if match is not None:
+            try:
+                return datetime(*[int(part) for part in match.groups()])
+            except ValueError:
+                # Such as a 13th month; let strptime raise its error
+                pass
+    return datetime.strptime(text, date_format)
+
+
+def get_timezone(name):
+    """Return pytz.timezone(name), looked up once per name.
+    """
+    try:
+        return _timezones[name]
+    except KeyError:
+        timezone = _timezones[name] = pytz.timezone(name)
+        return timezone
+
+
 class PostParseException(Exception):
     def __init__(self, value):
         self.value = value
@@ -84,9 +153,29 @@ class PostParseException(Exception):
 
 class Post(object):
     """Class to describe a blog post and associated metadata.
+
+    Only the YAML header is parsed when a post is created. The post
+    body is run through its filter chain the first time `content` (or
+    `excerpt`) is used, so listing or sorting posts by their metadata
+    doesn't pay for rendering them.
+
+    Posts are slotted, to keep the memory held by large blogs down:
+    the reserved fields have slots, and any other field from the YAML
+    header (or attribute set on a post) is kept in the `extras`
+    dictionary. The raw source isn't kept; `source_digest` identifies
+    it instead. With ``blog.post.content_store`` enabled, the rendered
+    content and excerpt are kept in the build's content store rather
+    than in memory.
     """
+    __slots__ = ("yaml", "title", "date", "updated", "categories", "tags",
+                 "permalink", "filename", "author", "guid", "slug", "draft",
+                 "filters", "assets", "extras", "source_digest",
+                 "__timezone", "__post_src", "__content", "__post_excerpt",
+                 "__text_stats", "__permalink_path")
+
     def __init__(self, source, filename="Untitled"):
-        self.source = source
+        self.extras = {}
+        self.source_digest = make_key(source)
         self.yaml = None
         self.title = None
         self.__timezone = blog_config.timezone
@@ -95,42 +184,120 @@ class Post(object):
         self.categories = set()
         self.tags = set()
         self.permalink = None
-        self.content = ""
-        self.excerpt = ""
+        self.__permalink_path = None
+        self.__post_src = None
+        self.__content = None
+        self.__post_excerpt = None
+        self.__text_stats = None
         self.filename = filename
         self.author = ""
         self.guid = None
         self.slug = None
         self.draft = False
         self.filters = None
-        self.__parse()
+        self.assets = set()
+        self.__parse(source)
         self.__post_process()
 
     def __repr__(self):
         return ("<Post title='{0.title}' date='{0.date:%Y/%m/%d %H:%M:%S}'>"
                 .format(self))
 
-    def __parse(self):
+    @property
+    def content(self):
+        """The post body rendered through its filter chain.
+        """
+        content = self.__content
+        if content is None:
+            content = self.__apply_filters(self.__post_src or "")
+            self.__content = store_text(content)
+            self.__post_src = None
+            _save_rendered_content(self)
+        elif isinstance(content, StoredText):
+            content = content.read()
+        return content
+
+    @content.setter
+    def content(self, value):
+        self.__content = store_text(value)
+        self.__post_src = None
+        self.__text_stats = None
+
+    @property
+    def excerpt(self):
+        """The excerpt given in the post YAML, or else one created from
+        the rendered content if post excerpts are enabled.
+        """
+        excerpt = self.__post_excerpt
+        if not excerpt:
+            excerpt = self.__parse_post_excerpting()
+            self.__post_excerpt = store_text(excerpt)
+        elif isinstance(excerpt, StoredText):
+            excerpt = excerpt.read()
+        return excerpt
+
+    @excerpt.setter
+    def excerpt(self, value):
+        self.__post_excerpt = value
+
+    @property
+    def word_count(self):
+        """The number of words in the text of the rendered content.
+        """
+        return self.__get_text_stats().word_count
+
+    @property
+    def reading_time(self):
+        """Roughly how many minutes it takes to read the post; at least 1.
+        """
+        words_per_minute = blog_config.reading_words_per_minute
+        return max(1, int(round(float(self.word_count) / words_per_minute)))
+
+    @property
+    def text_digest(self):
+        """A sha1 hex digest of the words of the rendered content, which
+        only changes when the text does, not the markup around it.
+        """
+        return self.__get_text_stats().digest
+
+    def __get_text_stats(self):
+        if self.__text_stats is None:
+            self.__text_stats = html_text_stats(self.content)
+        return self.__text_stats
+
+    @property
+    def rendered(self):
+        """True once the post body has been run through its filters.
+        """
+        return self.__content is not None
+
+    def render(self):
+        """Render the post content and excerpt now, rather than when they
+        are first used.
+        """
+        return self.content, self.excerpt
+
+    def store_content(self):
+        """Move the rendered content and excerpt into the content store,
+        if it's enabled; for posts rendered elsewhere, such as those
+        from the post cache.
+        """
+        if isinstance(self.__content, six.string_types):
+            self.__content = store_text(self.__content)
+        if isinstance(self.__post_excerpt, six.string_types):
+            self.__post_excerpt = store_text(self.__post_excerpt)
+
+    def __parse(self, source):
         """Parse the YAML and fill fields.
         """
-        yaml_sep = re.compile("^---$", re.MULTILINE)
-        content_parts = yaml_sep.split(self.source, maxsplit=2)
+        content_parts = yaml_separator.split(source, maxsplit=2)
         if len(content_parts) < 2:
             raise PostParseException("Post has no YAML section: {0.filename}"
                                      .format(self))
         else:
             #Extract the yaml at the top
             self.__parse_yaml(content_parts[1])
-            post_src = content_parts[2]
-        self.__apply_filters(post_src)
-        #Do post excerpting
-        self.__parse_post_excerpting()
-
-    def __apply_filters(self, post_src):
-        """Apply filters to the post"""
-        #Apply block level filters (filters on only part of the post)
-        # TODO: block level filters on posts
-        #Apply post level filters (filters on the entire post)
+            self.__post_src = content_parts[2]
         #If filter is unspecified, use the default filter based on
         #the file extension:
         if self.filters is None:
@@ -140,33 +307,29 @@ class Post(object):
                     file_extension]
             except KeyError:
                 self.filters = []
-        self.content = bf.filter.run_chain(self.filters, post_src, context=self)
+
+    def __apply_filters(self, post_src):
+        """Apply filters to the post"""
+        #Apply block level filters (filters on only part of the post)
+        for name, chain in sorted(config.block_filters.items()):
+            post_src = replace_blocks(
+                post_src, name,
+                lambda block: run_block_chain(chain, block, self))
+        #Apply post level filters (filters on the entire post)
+        return run_filter_chain(self.filters, post_src, context=self)
 
     def __parse_post_excerpting(self):
         if blog_config.post_excerpts.enabled:
             length = blog_config.post_excerpts.word_length
-            if len(self.excerpt) > 0:
-                 # The user has defined their own excerpt in the post YAML
-                pass
-            elif callable(blog_config.post_excerpts.method):
-                self.excerpt = blog_config.post_excerpts.method(
+            if callable(blog_config.post_excerpts.method):
+                return blog_config.post_excerpts.method(
                     self.content, length)
             else:
-                self.excerpt = self.__excerpt(length)
+                return self.__excerpt(length)
+        return ""
 
     def __excerpt(self, num_words=50):
-        try:
-            import lxml.html
-        except ImportError:
-            print("\nlxml is required in order to create post excerpts.")
-            print("See http://lxml.de/installation.html for installation "
-                  "instructions.")
-            print("You can also turn off post excerpts in your _config.py:")
-            print("\n    plugins.blog.post_excerpts = False\n")
-            sys.exit(1)
-        post_text = lxml.html.fromstring(self.content).text_content()
-        post_words = post_text.split(None, num_words)
-        return " ".join(post_words[:num_words])
+        return html_excerpt(self.content, num_words)
 
     def __post_process(self):
         if not self.title:
@@ -174,7 +337,8 @@ class Post(object):
         if not self.slug:
             self.slug = create_slug(self.title)
         if not self.categories or len(self.categories) == 0:
-            self.categories = set([Category('uncategorized')])
+            self.categories = set([intern_category(Category,
+                                                   'uncategorized')])
         if self.guid:
             # Used for expanding :uuid in permalink template code below
             uuid = urllib_parse_quote(self.guid)
@@ -186,10 +350,14 @@ class Post(object):
                 blog_config.auto_permalink.path, bf.config.site.url,
                 blog_config.path, self.title, self.date, uuid, self.filename)
         logger.debug("Permalink: {0}".format(self.permalink))
+        if self.permalink:
+            # Work out where the permapage goes while parsing, so it's
+            # kept (and cached) with the post:
+            self.permalink_path
 
     def __parse_yaml(self, yaml_src):
         try:
-            y = yaml.load(yaml_src)
+            y = load_front_matter(yaml_src)
         except yaml.YAMLError as e:
             linenum = 1
             if getattr(e, 'context_mark', None):
@@ -200,6 +368,7 @@ class Post(object):
         if not isinstance(y, dict):
             raise PostParseException(
                 "Post has bad YAML section: {0}".format(self.filename))
+        self.yaml = y
         # Load all the fields that require special processing first:
         fields_need_processing = ('permalink', 'guid', 'date', 'updated',
                                   'categories', 'tags', 'draft')
@@ -225,38 +394,39 @@ class Post(object):
             self.date = datetime.now()
         else:
             try:
-                self.date = datetime.strptime(self.date, config.date_format)
+                self.date = parse_date(self.date, config.date_format)
             except TypeError:
                 pass
         finally:
-            self.date = pytz.timezone(self.__timezone).localize(self.date)
+            self.date = get_timezone(self.__timezone).localize(self.date)
         try:
             self.updated = y['updated']
         except KeyError:
             self.updated = self.date
         else:
             try:
-                self.updated = datetime.strptime(
-                    self.updated, config.date_format)
+                self.updated = parse_date(self.updated, config.date_format)
             except TypeError:
                 pass
         finally:
             try:
-                self.updated = pytz.timezone(self.__timezone).localize(
+                self.updated = get_timezone(self.__timezone).localize(
                     self.updated)
             except ValueError:
                 pass
         try:
             if config.categories.case_sensitive:
-                self.categories = set([Category(x.strip()) for x in \
-                                           y['categories'].split(",")])
+                self.categories = set([intern_category(Category, x.strip())
+                                       for x in y['categories'].split(",")])
             else:
-                self.categories = set([Category(x.strip().lower()) for x in \
-                                           y['categories'].split(",")])
+                self.categories = set([
+                    intern_category(Category, x.strip().lower())
+                    for x in y['categories'].split(",")])
         except:
             pass
         try:
-            self.tags = set([x.strip() for x in y['tags'].split(",")])
+            self.tags = set([intern(x.strip())
+                             for x in y['tags'].split(",")])
         except:
             pass
         try:
@@ -274,8 +444,36 @@ class Post(object):
             self.draft = False
         # Load the rest of the fields that don't need processing:
         for field, value in list(y.items()):
-            if field not in fields_need_processing:
+            if field in ("content", "word_count", "reading_time",
+                         "text_digest"):
+                # Always worked out from the post body
+                continue
+            if field in ("extras", "source_digest", "permalink_path"):
+                continue
+            if field in fields_need_processing:
+                continue
+            if field in _header_attributes or not hasattr(Post, field):
                 setattr(self, field, value)
+            else:
+                # It would replace a method or a read-only property
+                logger.warning(
+                    "{0}: header field {1!r} is the name of a Post method "
+                    "or property; it's only kept as post.extras[{1!r}]"
+                    .format(self.filename, field))
+                self.extras[field] = value
+
+    @property
+    def permalink_path(self):
+        """The path of the permalink below the site URL, where the
+        permapage is written in _site. It's worked out when the post is
+        parsed, and again only if the permalink is changed.
+        """
+        permalink = self.permalink
+        cached = self.__permalink_path
+        if cached is None or cached[0] != permalink:
+            cached = self.__permalink_path = (
+                permalink, site_path(permalink, bf.config.site.url))
+        return cached[1]
 
     def permapath(self):
         """Get just the path portion of a permalink"""
@@ -289,27 +487,139 @@ class Post(object):
         return self is other_post
 
     def __getattr__(self, name):
+        # Only called for names that aren't slots (or are unset ones)
+        if name == "extras":
+            raise AttributeError(name)
+        try:
+            return self.extras[name]
+        except KeyError:
+            pass
         if name == "path":
             #Always generate the path from the permalink
             return self.permapath()
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if hasattr(type(self), name):
+            # A slot or a property
+            object.__setattr__(self, name, value)
         else:
-            raise AttributeError(name)
+            self.extras[name] = value
+
+    def __delattr__(self, name):
+        if hasattr(type(self), name):
+            object.__delattr__(self, name)
+        else:
+            try:
+                del self.extras[name]
+            except KeyError:
+                raise AttributeError(name)
+
+    def __getstate__(self):
+        state = dict((name, getattr(self, name)) for name in _post_state)
+        for name in ("_Post__content", "_Post__post_excerpt"):
+            if isinstance(state[name], StoredText):
+                state[name] = state[name].read()
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+# The slots of Post, with the private ones' names mangled:
+_post_state = tuple(
+    "_Post" + name if name.startswith("__") else name
+    for name in Post.__slots__)
+
+
+# The parts of a post's state that are text, and never changed in place:
+_text_state = ("_Post__post_src", "_Post__content", "_Post__post_excerpt")
+
+
+def _copy_state(state):
+    """Copy the state of a post (see Post.__getstate__), so that
+    changes to the fields of one post don't show in the other.
+    """
+    return dict((name, value if name in _text_state
+                 else copy.deepcopy(value))
+                for name, value in state.items())
+
+
+def _snapshot(post):
+    """Return a copy of the state of `post`, with its text left in the
+    content store if it's there.
+    """
+    return _copy_state(dict((name, getattr(post, name))
+                            for name in _post_state))
+
+
+def _restore_post(state):
+    """Return a new Post with a copy of `state`.
+    """
+    post = object.__new__(Post)
+    post.__setstate__(_copy_state(state))
+    return post
+
+
+def _save_rendered_content(post):
+    """Add the content just rendered for `post` to the copy of it that
+    was taken when it was parsed, if there is one.
+    """
+    state = _parsed_states.get(id(post))
+    if state is not None:
+        state["_Post__content"] = post._Post__content
+        state["_Post__post_src"] = None
+        state["assets"] = set(post.assets)
+
+
+# The Post attributes a header field can set: its public slots, and its
+# properties that have a setter:
+_header_attributes = frozenset(
+    [name for name in Post.__slots__ if not name.startswith("__")] +
+    [name for name, value in vars(Post).items()
+     if isinstance(value, property) and value.fset is not None])
+
+
+# The Category and Tag objects of the current build, by (class, name):
+_interned_categories = {}
+
+
+def intern_category(cls, name):
+    """Return the one `cls` (Category or Tag) object named `name`, so
+    that posts share them rather than each having their own.
+    """
+    try:
+        return _interned_categories[cls, name]
+    except KeyError:
+        category = _interned_categories[cls, name] = cls(name)
+        return category
 
 
 class Category(object):
+    __slots__ = ("name", "url_name", "path")
+
+    # The blog setting naming the directory this kind of page goes in:
+    dir_setting = "category_dir"
+
     def __init__(self, name):
-        self.name = str(name)
+        self.name = intern(str(name))
         # TODO: consider making url_name and path read-only properties?
         self.url_name = create_slug(self.name)
         self.path = bf.util.site_path_helper(
                 blog_config.path,
-                blog_config.category_dir,
+                blog_config[self.dir_setting],
                 self.url_name,
                 trailing_slash=True)
 
     def __hash__(self):
         return hash(self.name)
 
+    def __reduce__(self):
+        # Unpickled posts (from the post cache or a parse worker) share
+        # the categories of this build:
+        return intern_category, (type(self), self.name)
+
     def __repr__(self):
         return self.name
 
@@ -332,6 +642,15 @@ class Category(object):
         return not other < self
 
 
+class Tag(Category):
+    """A post tag. Tags have their own pages, like categories, but
+    ``post.tags`` holds their names rather than Tag objects.
+    """
+    __slots__ = ()
+
+    dir_setting = "tag_dir"
+
+
 def create_guid(title, date):
     to_hash = (bytes(date.isoformat() + title, 'utf-8') if six.PY3
                else date.isoformat() + title.encode('utf-8'))
@@ -339,26 +658,429 @@ def create_guid(title, date):
     return base64.urlsafe_b64encode(hash).decode('ascii')
 
 
+class PathTemplate(object):
+    """A permalink or post filename template, such as
+    ``:blog_path/:year/:month/:day/:title``, compiled once into a format
+    string that's filled in with a single pass.
+
+    Placeholders are matched longest name first, and may be followed
+    directly by letters or underscores, as in ``:year_:month_:day``.
+
+    :arg names: The placeholders the template may use; a ValueError is
+                raised for any other.
+    """
+    # Something that looks like a placeholder, in the text between the
+    # known ones:
+    unknown_re = re.compile(r":[A-Za-z_]+")
+    date_formats = {"year": "%Y", "month": "%m", "day": "%d",
+                    "hour": "%H", "minute": "%M", "second": "%S"}
+
+    def __init__(self, template, names):
+        self.template = template
+        #: The values fill() needs; the date fields all need "date".
+        self.names = set()
+        placeholder_re = re.compile(":({0})".format("|".join(
+            re.escape(name) for name in sorted(names, key=len, reverse=True))))
+        parts = []
+        position = 0
+        for match in placeholder_re.finditer(template):
+            name = match.group(1)
+            parts.append(self._literal(template[position:match.start()],
+                                       names))
+            if name in self.date_formats:
+                parts.append("{date:" + self.date_formats[name] + "}")
+                self.names.add("date")
+            else:
+                parts.append("{" + name + "}")
+                self.names.add(name)
+            position = match.end()
+        parts.append(self._literal(template[position:], names))
+        self.format_string = "".join(parts)
+
+    def _literal(self, text, names):
+        unknown = self.unknown_re.search(text)
+        if unknown is not None:
+            raise ValueError(
+                "Unknown placeholder {0} in {1!r}; use one of: {2}"
+                .format(unknown.group(), self.template,
+                        ", ".join(":" + n for n in names)))
+        return _escape_format(text)
+
+    def __repr__(self):
+        return "<PathTemplate {0!r}>".format(self.template)
+
+    def fill(self, **values):
+        return self.format_string.format(**values)
+
+
+def _escape_format(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+#: The placeholders of blog.auto_permalink.path:
+permalink_placeholders = (
+    "blog_path", "year", "month", "day", "hour", "minute", "second",
+    "title", "filename", "uuid")
+#: The placeholders of blog.auto_post_filename:
+post_filename_placeholders = (
+    "year", "month", "day", "hour", "minute", "second", "title", "markup")
+
+_path_templates = {}
+
+
+def path_template(template, names):
+    """Return the PathTemplate for `template`, compiling it the first
+    time it's asked for.
+    """
+    try:
+        return _path_templates[template, names]
+    except KeyError:
+        compiled = _path_templates[template, names] = PathTemplate(
+            template, names)
+        return compiled
+
+
 def create_permalink(auto_permalink_path, site_url,
                      blog_path, title, date, uuid, filename):
-    permalink = site_url.rstrip("/") + auto_permalink_path
-    permalink = re.sub(":blog_path", blog_path, permalink)
-    permalink = re.sub(":year", date.strftime("%Y"), permalink)
-    permalink = re.sub(":month", date.strftime("%m"), permalink)
-    permalink = re.sub(":day", date.strftime("%d"), permalink)
-    permalink = re.sub(":hour", date.strftime("%H"), permalink)
-    permalink = re.sub(":minute", date.strftime("%M"), permalink)
-    permalink = re.sub(":second", date.strftime("%S"), permalink)
-    permalink = re.sub(":title", create_slug(title), permalink)
-    permalink = re.sub(":filename", create_slug(filename), permalink)
-    permalink = re.sub(":uuid", uuid, permalink)
-    return permalink
+    template = path_template(auto_permalink_path, permalink_placeholders)
+    values = {"blog_path": blog_path, "date": date, "uuid": uuid}
+    if "title" in template.names:
+        values["title"] = create_slug(title)
+    if "filename" in template.names:
+        values["filename"] = create_slug(filename)
+    return site_url.rstrip("/") + template.fill(**values)
+
+
+def site_path(url, site_url):
+    """Return the path of `url` below `site_url`; where the page at
+    `url` is written in _site.
+    """
+    if url[:len(site_url)].lower() == site_url.lower():
+        return url[len(site_url):]
+    return url
+
+
+def post_cache_fingerprint():
+    """Fingerprint everything besides the post source that affects how
+    a post is parsed: the blog settings, the configuration and source
+    code of the loaded filters, and the source code of this module,
+    which defines what a cached post looks like.
+    """
+    filters = []
+    for name, filter_config in sorted(bf.config.filters.items()):
+        filters.append((name, fingerprint(filter_config),
+                        _source_digest(filter_config.get("mod"))))
+    settings = (
+        blogofile_blog.__version__,
+        bf.config.site.url,
+        bf.config.site.slugify,
+        bf.config.site.slug_unicode,
+        blog_config.path,
+        blog_config.category_dir,
+        blog_config.timezone,
+        blog_config.auto_permalink,
+        blog_config.post_excerpts,
+        blog_config.slugify,
+        config.date_format,
+        config.default_filters,
+        config.block_filters,
+        config.categories,
+        config.slugify,
+        )
+    return make_key(fingerprint(settings), fingerprint(filters),
+                    _source_digest(sys.modules[__name__]))
+
+
+def _source_digest(module):
+    source = b""
+    try:
+        with open(module.__file__, "rb") as f:
+            source = f.read()
+    except (AttributeError, IOError, OSError):
+        pass
+    return hashlib.sha1(source).hexdigest()
+
+
+# Filter chains resolved to the run functions of their filters, by
+# chain, and block filter chains by chain string. Filters are loaded
+# again for each build, so parse_posts empties these.
+_compiled_chains = {}
+_compiled_block_chains = {}
+
+
+def compile_filter_chain(chain):
+    """Resolve a filter chain, either a string like
+    "syntax_highlight, markdown" or a list of filter names, to a list of
+    (filter name, run function, whether it takes a context) tuples.
+
+    Each distinct chain is only parsed and looked up once per build.
+    """
+    if chain is None:
+        return []
+    if isinstance(chain, six.string_types):
+        key = chain
+    else:
+        key = tuple(chain)
+    try:
+        return _compiled_chains[key]
+    except KeyError:
+        pass
+    if isinstance(chain, six.string_types):
+        chain = bf.filter.parse_chain(chain)
+    compiled = []
+    for name in chain:
+        run = bf.filter.get_filter(name).run
+        takes_context = "context" in inspect.getargs(run.__code__).args
+        compiled.append((name, run, takes_context))
+    _compiled_chains[key] = compiled
+    return compiled
+
+
+def compile_block_chain(chain):
+    """Resolve a block filter chain string to a list of (filter name,
+    run_block function or None, compiled chain of just that filter)
+    tuples, once per build.
+    """
+    try:
+        return _compiled_block_chains[chain]
+    except KeyError:
+        pass
+    compiled = []
+    for name in bf.filter.parse_chain(chain):
+        f = bf.filter.get_filter(name)
+        compiled.append((name, getattr(f, "run_block", None),
+                         compile_filter_chain([name])))
+    _compiled_block_chains[chain] = compiled
+    return compiled
+
+
+def run_filter_chain(chain, content, context=None):
+    """Run content through a filter chain, like bf.filter.run_chain, but
+    with the chain compiled by compile_filter_chain.
+    """
+    return _run_compiled_chain(compile_filter_chain(chain), content, context)
+
+
+def _run_compiled_chain(compiled, content, context):
+    for name, run, takes_context in compiled:
+        bf.filter.logger.debug("Applying filter: " + name)
+        with timings.post_filter(name, context):
+            if takes_context:
+                content = run(content, context)
+            else:
+                content = run(content)
+    return content
+
+
+def run_block_chain(chain, block, context=None):
+    """Run the body of a post block through a block filter chain.
+
+    Filters that define ``run_block(body, args, context)`` are also
+    given the block's arguments; other filters are run on the body as
+    they would be on a whole post.
+    """
+    body = block.body
+    for name, run_block, compiled in compile_block_chain(chain):
+        if run_block is not None:
+            body = run_block(body, block.args, context)
+        else:
+            body = _run_compiled_chain(compiled, body, context)
+    return body
+
+
+def write_assets(assets):
+    """Write the side files, such as stylesheets, that filters recorded
+    as (filter name, asset) pairs while rendering posts.
+    """
+    for filter_name, asset in assets:
+        bf.filter.get_filter(filter_name).write_asset(asset)
+
+
+def write_post_assets(post):
+    """Write the assets that filters recorded while rendering `post`.
+    """
+    write_assets(post.assets)
+
+
+def write_rendered_post_assets(posts):
+    """Write the assets of each of `posts` that has been rendered.
+
+    Filters only record the assets they need while a post is rendered,
+    which keeps file I/O out of them; this is called once the pages are
+    written. Posts restored from the cache or parsed by workers were
+    rendered before this build's pages, and count as rendered too.
+    """
+    for post in posts:
+        if post.rendered:
+            write_post_assets(post)
+
+
+class _RecordingHandler(logging.Handler):
+    """Collect log records in a parse_posts worker process so that the
+    parent can replay them in order.
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        # Make the record picklable:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+_worker_log_handler = None
+
+
+def _init_parse_worker():
+    """Route all logging in a parse_posts worker to a recording handler.
+
+    Workers don't use the content store; the posts they send back are
+    stored by the parent.
+    """
+    global _worker_log_handler, _content_store
+    _content_store = None
+    _worker_log_handler = _RecordingHandler()
+    for name in list(logging.Logger.manager.loggerDict):
+        logging.getLogger(name).handlers = []
+    root = logging.getLogger()
+    root.handlers = [_worker_log_handler]
+
+
+def _parse_post(post_fn, src):
+    """Parse a post, returning the post and the reason it was skipped,
+    if it was.
+    """
+    try:
+        return Post(src, filename=post_fn), None
+    except PostParseException as e:
+        return None, e.value
+
+
+def is_published(post):
+    """Return whether `post` is to be published: it isn't a draft, and
+    it has a permalink to be published at.
+    """
+    return post.draft is False and post.permalink is not None
+
+
+def _parse_post_in_worker(job):
+    _worker_log_handler.records = []
+    post, skipped = _parse_post(*job)
+    if post is not None and is_published(post):
+        # Rendering is the expensive part, so do it in the worker
+        # rather than lazily in the main process. Drafts are left to be
+        # rendered if they're ever used, as they are without workers.
+        post.render()
+    return post, skipped, _worker_log_handler.records
+
+
+def _parse_posts_in_pool(jobs, workers):
+    """Parse (post_fn, src) jobs with a pool of worker processes.
+
+    Yields (post, skip reason, log records) in the order of `jobs`.
+    The workers are forked so that they inherit the loaded
+    configuration, filters and the controller modules.
+    """
+    try:
+        context = multiprocessing.get_context("fork")
+    except AttributeError:
+        # Python 2 forks on every platform that has os.fork
+        context = multiprocessing
+    chunksize = max(1, len(jobs) // (workers * 4))
+    pool = context.Pool(workers, initializer=_init_parse_worker)
+    try:
+        for result in pool.imap(_parse_post_in_worker, jobs, chunksize):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# The post cache of the current build, and the posts parsed in this
+# build that are to be stored in it once they are rendered:
+_post_cache = None
+_uncached_posts = []
+
+# The content store of the current build. Templates and controllers
+# that run after the blog's may still read the posts, so it's kept
+# until the next build, or the end of the process.
+_content_store = None
+
+# Copies of the state of the posts parsed in this build, by id(post),
+# taken before blog.post.post_process could change them; a post's
+# content is added to its copy when it's rendered. These are what the
+# post cache and keep_parsed keep, so post_process is only ever run on
+# a post once.
+_parsed_states = {}
+
+# When config.keep_parsed is on, the states of the posts of the last
+# build by the absolute path of their file, with the (modification
+# time, size) of the file; and the parsing fingerprint they were
+# parsed with:
+_kept_posts = {}
+_kept_fingerprint = None
+
+
+def store_text(text):
+    """Put rendered text in the content store if it's enabled, and
+    return what the post should keep: the StoredText, or else the text.
+    """
+    if _content_store is None or not text:
+        return text
+    return _content_store.add(text)
+
+
+def flush_content_store():
+    if _content_store is not None:
+        _content_store.flush()
+
+
+def close_content_store():
+    global _content_store
+    if _content_store is not None:
+        _content_store.close()
+        _content_store = None
+
+atexit.register(close_content_store)
+
+
+def save_rendered_posts():
+    """Store the posts that have been rendered since they were parsed
+    in the post cache.
+
+    Posts are only rendered when their content is first used, so
+    parse_posts can't store them itself; this is called at the end of
+    the build. What's stored is the post as it was parsed, with its
+    rendered content, not as blog.post.post_process left it. Posts
+    that were never rendered are left for a later build to cache.
+    """
+    global _uncached_posts
+    if _post_cache is None:
+        return
+    for cache_key, post in _uncached_posts:
+        state = _parsed_states[id(post)]
+        if state["_Post__content"] is not None:
+            _post_cache.set(cache_key, _restore_post(state))
+    _uncached_posts = []
+    if not config.keep_parsed:
+        _parsed_states.clear()
+    _post_cache.prune()
+    if _post_cache.evictions:
+        logger.info("Post cache: {0.evictions} evicted".format(_post_cache))
 
 
 def parse_posts(directory):
     """Retrieve all the posts from the directory specified.
 
     Returns a list of the posts sorted in reverse by date."""
+    global _post_cache, _uncached_posts, _content_store
+    global _kept_posts, _kept_fingerprint
     posts = []
     post_filename_re = re.compile(config.file_regex)
     if not os.path.isdir(directory):
@@ -366,10 +1088,47 @@ def parse_posts(directory):
         return []
     post_paths = [f for f in bf.util.recursive_file_list(
             directory, post_filename_re) if post_filename_re.match(f)]
+    post_cache = _post_cache = None
+    _uncached_posts = []
+    _parsed_states.clear()
+    _compiled_chains.clear()
+    _compiled_block_chains.clear()
+    cache_fingerprint = None
+    if config.cache.enabled or config.keep_parsed:
+        cache_fingerprint = post_cache_fingerprint()
+    kept_posts = {}
+    if config.keep_parsed and _kept_fingerprint == (
+            cache_fingerprint, bool(config.content_store.enabled)):
+        # The kept posts' content may be in the store, so keep it too
+        kept_posts = _kept_posts
+    else:
+        _interned_categories.clear()
+        close_content_store()
+        if config.content_store.enabled:
+            _content_store = ContentStore(config.content_store.directory)
+    _kept_posts = {}
+    _kept_fingerprint = None
+    if config.keep_parsed:
+        _kept_fingerprint = (
+            cache_fingerprint, bool(config.content_store.enabled))
+    if config.cache.enabled:
+        post_cache = _post_cache = DiskCache(
+            config.cache.directory, config.cache.max_size)
 
+    # Read the posts and look them up in the cache first, so that
+    # only the posts that really need parsing go to the workers:
+    sources = []
     for post_path in post_paths:
         post_fn = os.path.split(post_path)[1]
-        logger.debug("Parsing post: {0}".format(post_path))
+        file_key = None
+        if config.keep_parsed:
+            stat = os.stat(post_path)
+            file_key = (stat.st_mtime, stat.st_size)
+            kept = kept_posts.get(os.path.abspath(post_path))
+            if kept is not None and kept[0] == file_key:
+                sources.append(
+                    (post_path, post_fn, None, None, file_key, None, kept[1]))
+                continue
         #IMO codecs.open is broken on Win32.
         #It refuses to open files without replacing newlines with CR+LF
         #reverting to regular open and decode:
@@ -381,26 +1140,75 @@ def parse_posts(directory):
         except:
             logger.exception("Error reading post: {0}".format(post_path))
             raise
-        try:
-            p = Post(src, filename=post_fn)
-        except PostParseException as e:
-            logger.warning("{0} : Skipping this post.".format(e.value))
-            continue
+        cache_key = cached = None
+        if post_cache is not None:
+            cache_key = make_key(src, post_fn, cache_fingerprint)
+            cached = post_cache.get(cache_key)
+        sources.append(
+            (post_path, post_fn, src, cache_key, file_key, cached, None))
+    jobs = [(post_fn, src)
+            for post_path, post_fn, src, cache_key, file_key, cached, state
+            in sources if cached is None and state is None]
+    workers = config.parse_workers or 1
+    if workers > 1 and not hasattr(os, "fork"):
+        logger.warning("Parallel post parsing needs os.fork; "
+                       "parsing posts serially.")
+        workers = 1
+    if workers > 1 and len(jobs) > 1:
+        results = _parse_posts_in_pool(jobs, workers)
+    else:
+        results = None
+
+    for (post_path, post_fn, src, cache_key, file_key, p,
+         state) in sources:
+        if state is not None:
+            # Kept from the last build, as it was before post_process
+            p = _restore_post(state)
+        if p is not None:
+            logger.debug("Using cached post: {0}".format(post_path))
+            if p.draft:
+                logger.info("Ignoring Draft Post: {0}".format(post_fn))
+            p.store_content()
+        else:
+            logger.debug("Parsing post: {0}".format(post_path))
+            if results is None:
+                p, skipped = _parse_post(post_fn, src)
+            else:
+                p, skipped, records = next(results)
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+            if skipped is not None:
+                logger.warning("{0} : Skipping this post.".format(skipped))
+                continue
+            if results is not None:
+                p.store_content()
+            # Posts without a date get the time they were parsed, which
+            # must not be frozen into the cache:
+            if post_cache is not None and "date" in p.yaml:
+                _uncached_posts.append((cache_key, p))
+                state = _snapshot(p)
+        if config.keep_parsed:
+            if state is None:
+                state = _snapshot(p)
+            _kept_posts[os.path.abspath(post_path)] = (file_key, state)
+        if state is not None:
+            _parsed_states[id(p)] = state
         posts.append(p)
+    if results is not None:
+        results.close()
+    if post_cache is not None:
+        logger.info(
+            "Post cache: {0.hits} hits, {0.misses} misses".format(post_cache))
     posts.sort(key=operator.attrgetter('date'), reverse=True)
     return posts
 
 
-def create_post_filename(spec, title, date):
-    filename = spec
-    filename = re.sub(":title", create_slug(title), filename)
-    filename = re.sub(":year", date.strftime("%Y"), filename)
-    filename = re.sub(":month", date.strftime("%m"), filename)
-    filename = re.sub(":day", date.strftime("%d"), filename)
-    filename = re.sub(":hour", date.strftime("%H"), filename)
-    filename = re.sub(":minute", date.strftime("%M"), filename)
-    filename = re.sub(":second", date.strftime("%S"), filename)
-    return filename
+def create_post_filename(spec, title, date, markup="markdown"):
+    template = path_template(spec, post_filename_placeholders)
+    values = {"date": date, "markup": markup}
+    if "title" in template.names:
+        values["title"] = create_slug(title)
+    return template.fill(**values)
 
 
 def create_post_template(title, **params):
@@ -431,7 +1239,7 @@ guid: {uuid}
         util.mkdir(config.source_dir)
     markup = blog_config.post.default_markup or "markdown"
     post_filename = os.path.join(config.source_dir, create_post_filename(
-        ":year-:month-:day - :title.{0}".format(markup), title, date))
+        blog_config.auto_post_filename, title, date, markup))
     if os.path.exists(post_filename):
         logger.error("A file already exists called {0}, I won't overwrite it."
                      .format(post_filename))
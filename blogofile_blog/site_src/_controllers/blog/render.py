@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Write the blog's pages.
+
+The blog controllers write every page through materialize_template
+here, rather than calling tools.materialize_template directly, so that
+incremental builds can skip the pages whose inputs haven't changed, so
+that the pages can be rendered by a pool of worker processes, and so
+that each page is listed in the sitemap.
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import shutil
+from blogofile.cache import bf
+from blogofile_blog import timings
+from blogofile_blog.contentstore import StoredText
+from blogofile_blog.sitemap import SitemapWriter
+from . import blog, tools
+from .incremental import DependencyGraph
+from .post import Post, flush_content_store, store_text
+
+
+logger = logging.getLogger("blogofile.blog.render")
+
+# The dependency graph of the current build, if it is incremental:
+graph = None
+
+# The pages waiting for the render workers, as (template name,
+# location, env) tuples, and the page copies to make once they are
+# written; None when pages are rendered as they come.
+_jobs = None
+_copies = None
+
+# The sitemap of the current build, if one is written, and the
+# (location, last update, whether it's listed) of the last page:
+sitemap = None
+_sitemap_page = (None, None, False)
+
+
+class FragmentCache(object):
+    """The HTML of each post, rendered once per build.
+
+    Templates call :meth:`render` in place of including post.mako (or
+    post_excerpt.mako), so a post shown on several pages (its permapage,
+    the chronological, archive and category pages) is only rendered the
+    first time. The cache of a build is kept until the next build
+    begins, so that the site's own templates, which are rendered after
+    the controllers, can use it too.
+
+    :arg max_bytes: The most bytes of HTML kept in memory; past that the
+                    least recently used fragments are dropped, and
+                    rendered again if they're needed again.
+    :arg store: A function that puts text in the build's content store
+                and returns its StoredText, if the content store is
+                enabled; the fragments are then kept there instead,
+                and only their StoredText is held in memory.
+    """
+    def __init__(self, lookup, max_bytes=16 * 1024 * 1024, store=None):
+        self.lookup = lookup
+        self.max_bytes = max_bytes
+        self.store = store
+        # (post filename, source digest, template name) -> StoredText,
+        # or (html, size in bytes), least recently used first:
+        self.fragments = collections.OrderedDict()
+        self.size = 0
+        self.renders = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def render(self, post, template_name="post.mako"):
+        """Return the HTML of `post` rendered with `template_name`.
+        """
+        key = (post.filename, post.source_digest, template_name)
+        try:
+            fragment = self.fragments.pop(key)
+        except KeyError:
+            pass
+        else:
+            self.fragments[key] = fragment
+            self.reuses += 1
+            if isinstance(fragment, StoredText):
+                return fragment.read()
+            return fragment[0]
+        env = dict(bf.config.site.template_vars.items())
+        env.update(post=post, bf=bf)
+        html = self.lookup.get_template(template_name).render_unicode(**env)
+        self.renders += 1
+        if self.store is not None:
+            stored = self.store(html)
+            if isinstance(stored, StoredText):
+                self.fragments[key] = stored
+                return html
+        size = len(html.encode("utf-8"))
+        if size <= self.max_bytes:
+            self.fragments[key] = (html, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                fragment = self.fragments.popitem(last=False)[1]
+                self.size -= fragment[1]
+                self.evictions += 1
+        return html
+
+
+def begin():
+    """Set up the build of the blog's pages.
+
+    Called once the posts have been parsed and sorted.
+    """
+    global graph, _jobs, _copies, sitemap
+    blog.fragments = FragmentCache(
+        tools.template_lookup, blog.fragment_cache_size,
+        store_text if blog.post.content_store.enabled else None)
+    graph = None
+    _jobs = _copies = None
+    sitemap = None
+    if blog.sitemap.enabled and not blog.incremental.dry_run:
+        sitemap = SitemapWriter(
+            bf.writer.output_dir, bf.config.site.url, blog.sitemap.filename,
+            blog.sitemap.max_urls, blog.sitemap.max_bytes)
+    workers = blog.render_workers or 1
+    if workers > 1 and not hasattr(os, "fork"):
+        logger.warning("Parallel page rendering needs os.fork; "
+                       "rendering pages serially.")
+    elif workers > 1:
+        _jobs = []
+        _copies = []
+    if blog.incremental.enabled or blog.incremental.dry_run:
+        graph = DependencyGraph(blog.incremental.directory,
+                                dry_run=bool(blog.incremental.dry_run),
+                                in_place=bool(blog.incremental.in_place))
+        graph.load()
+        graph.begin(blog.posts)
+
+
+def materialize_template(template_name, location, env):
+    """Render `template_name` with `env` to `location` in the _site
+    directory, unless an incremental build can reuse the page from the
+    last build.
+    """
+    if sitemap is not None:
+        # A draft's permapage is written, but not made known:
+        post = env.get("post")
+        _add_to_sitemap(location, page_updated(env),
+                        post is None or not post.draft)
+    if graph is not None and not graph.plan_page(
+            template_name, location, env):
+        return
+    if _jobs is not None:
+        _jobs.append((template_name, location, env))
+        return
+    with timings.page(template_name, location):
+        tools.materialize_template(template_name, location, env)
+    if graph is not None:
+        graph.rendered_page(location)
+
+
+def copy_page(location, copy_location):
+    """Write a copy of the page already written at `location` to
+    `copy_location`.
+    """
+    if sitemap is not None:
+        last_location, updated, listed = _sitemap_page
+        if last_location == location:
+            _add_to_sitemap(copy_location, updated, listed)
+        else:
+            _add_to_sitemap(copy_location, None)
+    if graph is not None and graph.dry_run:
+        return
+    if _copies is not None:
+        _copies.append((location, copy_location))
+        return
+    _write_copy(location, copy_location)
+
+
+def _write_copy(location, copy_location):
+    copy_path = bf.util.path_join(bf.writer.output_dir, copy_location)
+    if graph is not None and graph.in_place and os.path.exists(copy_path):
+        # Don't write through a hard link to another page
+        os.remove(copy_path)
+    shutil.copyfile(
+        bf.util.path_join(bf.writer.output_dir, location), copy_path)
+
+
+def page_updated(env):
+    """Return when the newest post on a page was last updated, or None
+    if there are no posts on it.
+    """
+    post = env.get("post")
+    if post is not None:
+        return post.updated
+    posts = env.get("posts")
+    if posts and posts is not blog.posts:
+        return max(post.updated for post in posts)
+    month_posts = env.get("month_posts")
+    if month_posts:
+        return max(post.updated for posts in month_posts for post in posts)
+    return None
+
+
+def _add_to_sitemap(location, updated, listed=True):
+    global _sitemap_page
+    _sitemap_page = (location, updated, listed)
+    if listed and location.endswith(".html"):
+        sitemap.add(location, updated)
+
+
+def _env_posts(value, posts):
+    """Add the posts in a template environment value to `posts`.
+    """
+    if isinstance(value, Post):
+        posts[id(value)] = value
+    elif value is blog.posts:
+        # Every page of a permapage has all the posts, for navigation
+        pass
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _env_posts(v, posts)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _env_posts(v, posts)
+
+
+def _render_job(index):
+    """Render the page of _jobs[index] in a render worker.
+
+    The jobs, posts and everything else the pages need are inherited
+    from the parent when the worker is forked, so only the index is
+    sent to the worker, and the times back.
+    """
+    template_name, location, env = _jobs[index]
+    fragments = blog.fragments
+    # A worker mustn't append to the parent's content store file:
+    fragments.store = None
+    counts = fragments.renders, fragments.reuses, fragments.evictions
+    wall, cpu = timings.wall_time(), timings.cpu_time()
+    tools.materialize_template(template_name, location, env)
+    return (index, timings.wall_time() - wall, timings.cpu_time() - cpu,
+            fragments.renders - counts[0], fragments.reuses - counts[1],
+            fragments.evictions - counts[2])
+
+
+def render_queued_pages():
+    """Render the pages queued by materialize_template with a pool of
+    blog.render_workers processes, then make the queued page copies.
+    """
+    global _jobs, _copies
+    jobs, copies = _jobs, _copies
+    _jobs = _copies = None
+    if jobs is None:
+        return
+    # Render the posts on the pages first, so that the workers share
+    # them, and the post cache and assets of the build see them:
+    posts = {}
+    for template_name, location, env in jobs:
+        _env_posts(env, posts)
+    for post in posts.values():
+        post.render()
+    flush_content_store()
+    # Make the directories up front so that workers don't race to:
+    for directory in set(os.path.dirname(location)
+                         for template_name, location, env in jobs):
+        bf.util.mkdir(bf.util.path_join(bf.writer.output_dir, directory))
+    if len(jobs) > 1:
+        try:
+            context = multiprocessing.get_context("fork")
+        except AttributeError:
+            # Python 2 forks on every platform that has os.fork
+            context = multiprocessing
+        workers = min(blog.render_workers, len(jobs))
+        chunksize = max(1, len(jobs) // (workers * 4))
+        _jobs = jobs
+        pool = context.Pool(workers)
+        try:
+            results = list(pool.imap(
+                _render_job, range(len(jobs)), chunksize))
+        finally:
+            pool.terminate()
+            pool.join()
+            _jobs = None
+        for index, wall, cpu, renders, reuses, evictions in results:
+            template_name, location = jobs[index][:2]
+            timings.record_page(template_name, location, wall, cpu)
+            blog.fragments.renders += renders
+            blog.fragments.reuses += reuses
+            blog.fragments.evictions += evictions
+    else:
+        for template_name, location, env in jobs:
+            with timings.page(template_name, location):
+                tools.materialize_template(template_name, location, env)
+    if graph is not None:
+        for template_name, location, env in jobs:
+            graph.rendered_page(location)
+    for location, copy_location in copies:
+        _write_copy(location, copy_location)
+
+
+def finish():
+    """Finish the build of the blog's pages.
+    """
+    global sitemap
+    render_queued_pages()
+    logger.info(
+        "Post fragments: {0.renders} rendered, {0.reuses} reused, "
+        "{0.evictions} evicted".format(blog.fragments))
+    if sitemap is not None:
+        sitemap.close()
+        sitemap = None
+    if graph is not None:
+        graph.finish()
@@ -0,0 +1,217 @@
+/*
+ * Search the blog in the browser, with the index that the build writes
+ * when blog.search.enabled is set, next to this script (to
+ * /blog/search/ by default):
+ *
+ *   <script src="/blog/search/search.js"></script>
+ *   var search = new BlogSearch("/blog/search/");
+ *   search.search("python mako", function (error, posts) {
+ *     // posts: [{path: ..., title: ..., date: "2012-11-11"}, ...]
+ *   });
+ *
+ * A post matches if it has every word of the query; the last word also
+ * matches the words it's the start of, so results come up while typing.
+ * Only index.json and the shards of the query's words are loaded, and
+ * each is loaded once. A last word shorter than the shards' prefixes
+ * loads every shard whose prefix it starts.
+ */
+var BlogSearch = (function () {
+  // Runs of letters and digits, as the index was tokenized:
+  var termRe = /[\p{L}\p{N}]+/gu;
+
+  function BlogSearch(url) {
+    this.url = url.charAt(url.length - 1) === "/" ? url : url + "/";
+    this.index = null;
+    this.shards = {};
+    this.waiting = {};
+  }
+
+  function getJSON(url, callback) {
+    var request = new XMLHttpRequest();
+    request.open("GET", url);
+    request.onload = function () {
+      if (request.status === 200) {
+        callback(null, JSON.parse(request.responseText));
+      } else if (request.status === 404) {
+        // No term in the index starts this way
+        callback(null, {});
+      } else {
+        callback(new Error(url + ": " + request.status));
+      }
+    };
+    request.onerror = function () {
+      callback(new Error(url + ": request failed"));
+    };
+    request.send();
+  }
+
+  BlogSearch.prototype.load = function (name, callback) {
+    var self = this;
+    if (name in this.shards) {
+      callback(null, this.shards[name]);
+      return;
+    }
+    if (name in this.waiting) {
+      this.waiting[name].push(callback);
+      return;
+    }
+    this.waiting[name] = [callback];
+    getJSON(this.url + name + ".json", function (error, data) {
+      var callbacks = self.waiting[name];
+      delete self.waiting[name];
+      if (!error) {
+        self.shards[name] = data;
+      }
+      for (var i = 0; i < callbacks.length; i++) {
+        callbacks[i](error, data);
+      }
+    });
+  };
+
+  BlogSearch.prototype.terms = function (query) {
+    var index = this.index, terms = [];
+    var words = query.toLowerCase().match(termRe) || [];
+    for (var i = 0; i < words.length; i++) {
+      var word = words[i], last = i === words.length - 1;
+      if (index.stop_words.indexOf(word) !== -1 && !last) {
+        continue;
+      }
+      if (word.length >= index.min_length || last) {
+        terms.push({word: word, prefix: last});
+      }
+    }
+    return terms;
+  };
+
+  BlogSearch.prototype.shardName = function (word) {
+    var chars = Array.from(word).slice(0, this.index.prefix_length);
+    return chars.map(function (c) {
+      return c.codePointAt(0).toString(16);
+    }).join("-");
+  };
+
+  // The names of the shards that `term` may be in:
+  BlogSearch.prototype.shardNames = function (term) {
+    var name = this.shardName(term.word);
+    if (!term.prefix ||
+        Array.from(term.word).length >= this.index.prefix_length) {
+      return [name];
+    }
+    return this.index.shards.filter(function (shard) {
+      return shard === name || shard.lastIndexOf(name + "-", 0) === 0;
+    });
+  };
+
+  // The ids of the posts with `term`, from the shards it may be in:
+  function postIds(shards, term) {
+    var ids = {}, found = false;
+    function add(deltas) {
+      var id = 0;
+      for (var i = 0; i < deltas.length; i++) {
+        id += deltas[i];
+        ids[id] = true;
+      }
+      found = true;
+    }
+    shards.forEach(function (shard) {
+      if (term.prefix) {
+        for (var indexed in shard) {
+          if (indexed.lastIndexOf(term.word, 0) === 0) {
+            add(shard[indexed]);
+          }
+        }
+      } else if (shard.hasOwnProperty(term.word)) {
+        add(shard[term.word]);
+      }
+    });
+    return found ? ids : null;
+  }
+
+  BlogSearch.prototype.search = function (query, callback) {
+    var self = this;
+    if (this.index === null) {
+      this.load("index", function (error, index) {
+        if (error) {
+          callback(error);
+          return;
+        }
+        self.index = index;
+        self.search(query, callback);
+      });
+      return;
+    }
+    var terms = this.terms(query);
+    if (terms.length === 0) {
+      callback(null, []);
+      return;
+    }
+    var names = [];
+    terms.forEach(function (term) {
+      names = names.concat(self.shardNames(term));
+    });
+    var remaining = names.length, failed = false;
+    if (remaining === 0) {
+      callback(null, self.match(terms));
+      return;
+    }
+    names.forEach(function (name) {
+      self.load(name, function (error) {
+        if (failed) {
+          return;
+        }
+        if (error) {
+          failed = true;
+          callback(error);
+          return;
+        }
+        remaining -= 1;
+        if (remaining === 0) {
+          callback(null, self.match(terms));
+        }
+      });
+    });
+  };
+
+  BlogSearch.prototype.match = function (terms) {
+    var index = this.index, matched = null;
+    for (var i = 0; i < terms.length; i++) {
+      var shards = this.shardNames(terms[i]).map(function (name) {
+        return this.shards[name];
+      }, this);
+      var ids = postIds(shards, terms[i]);
+      if (ids === null) {
+        if (terms[i].prefix && (terms[i].word.length < index.min_length ||
+            index.stop_words.indexOf(terms[i].word) !== -1)) {
+          // Not indexed on its own, and not the start of a word
+          // that is; ignore it
+          continue;
+        }
+        return [];
+      }
+      if (matched === null) {
+        matched = ids;
+      } else {
+        for (var id in matched) {
+          if (!(id in ids)) {
+            delete matched[id];
+          }
+        }
+      }
+    }
+    var posts = [];
+    for (var id in matched) {
+      var row = index.posts[id], post = {};
+      for (var j = 0; j < index.fields.length; j++) {
+        post[index.fields[j]] = row[j];
+      }
+      posts.push(post);
+    }
+    // Newest first:
+    posts.sort(function (a, b) {
+      return a.date < b.date ? 1 : a.date > b.date ? -1 : 0;
+    });
+    return posts;
+  };
+
+  return BlogSearch;
+})();
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Write the search index of the published posts, and search.js to
+search it with.
+"""
+import logging
+import operator
+import os
+import shutil
+from blogofile.cache import bf
+from blogofile_blog import timings
+from blogofile_blog.diskcache import make_key
+from blogofile_blog.search import SearchIndexBuilder, TOKENIZER_VERSION
+from blogofile_blog.text import html_words
+from . import blog
+from .post import post_cache_fingerprint
+
+
+logger = logging.getLogger("blogofile.blog.search")
+
+
+def post_text(post):
+    """Return the text of `post` to index: its title, categories, tags
+    and the words of its content.
+    """
+    return " ".join(
+        [post.title] + [category.name for category in post.categories] +
+        list(post.tags) + html_words(post.content))
+
+
+def post_key(post, settings_key):
+    """Return the key of what the indexed text of `post` is made from:
+    its source, the settings it was parsed with (`settings_key`), and
+    its title, categories and tags. Unlike its text, these are known
+    without rendering the post.
+    """
+    return make_key(
+        TOKENIZER_VERSION, settings_key, post.filename, post.source_digest,
+        post.title, sorted(category.name for category in post.categories),
+        sorted(post.tags))
+
+
+def run():
+    settings = blog.search
+    output_dir = bf.util.fs_site_path_helper(
+        bf.writer.output_dir, blog.path, settings.path)
+    wall = timings.wall_time()
+    builder = SearchIndexBuilder(settings.directory, settings.prefix_length)
+    settings_key = post_cache_fingerprint()
+    # Oldest first, so that post ids stay the same as posts are added:
+    for post in sorted(blog.collection.published,
+                       key=operator.attrgetter("date")):
+        builder.add(post_key(post, settings_key),
+                    [post.path, post.title, post.date.strftime("%Y-%m-%d")],
+                    lambda: post_text(post))
+    terms, shards, size = builder.write(output_dir)
+    # Only sites that write the index get the script:
+    shutil.copyfile(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     "search.js"),
+        os.path.join(output_dir, "search.js"))
+    logger.info(
+        "Search index: {0} posts ({1} indexed again), {2} terms in {3} "
+        "shards, {4} bytes, in {5:.2f}s".format(
+            len(builder.posts), builder.reindexed, terms, shards, size,
+            timings.wall_time() - wall))
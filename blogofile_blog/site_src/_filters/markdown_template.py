@@ -39,6 +39,17 @@ logging.getLogger("MARKDOWN").setLevel(logging.ERROR)
 
 extensions = []
 
+#A Markdown instance is reused, through reset(), for every post parsed
+#in a process (parse_posts workers each get their own copy), rather than
+#loading the extensions again for each one:
+renderer = None
+
+def get_renderer():
+    global renderer
+    if renderer is None:
+        renderer = markdown.Markdown(extensions=extensions)
+    return renderer
+
 def init():
     #Create the list of enabled extensions with their arguments
     for name, ext in list(config["extensions"].items()):
@@ -54,4 +65,8 @@ def init():
             extensions.append(name+"("+",".join(params)+")")
 
 def run(content):
-    return markdown.markdown(content, extensions)
+    md = get_renderer()
+    try:
+        return md.convert(content)
+    finally:
+        md.reset()
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import copy
 import docutils.core
 
 from blogofile.cache import HierarchicalCache as HC
@@ -12,7 +13,19 @@ config = HC(
     aliases = ['rst']
     )
 
+#The docutils settings are worked out once (reading any docutils.conf
+#files) and a copy is given to each post, since docutils changes them
+#as it goes:
+settings = None
 
+def get_settings():
+    global settings
+    if settings is None:
+        publisher = docutils.core.Publisher()
+        publisher.set_components('standalone', 'restructuredtext', 'html')
+        settings = publisher.get_settings()
+    return copy.copy(settings)
 
 def run(content):
-    return docutils.core.publish_parts(content, writer_name='html')['html_body']
+    return docutils.core.publish_parts(
+        content, writer_name='html', settings=get_settings())['html_body']
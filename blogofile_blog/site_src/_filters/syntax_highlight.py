@@ -8,6 +8,8 @@ from pygments import formatters, util, lexers
 import six
 from blogofile.cache import HierarchicalCache as HC
 import blogofile_bf as bf
+from blogofile_blog.blocks import replace_blocks
+from blogofile_blog.diskcache import DiskCache, make_key
 
 #Example usage:
 """
@@ -63,27 +65,34 @@ meta = {"name": "Syntax Highlighter",
 config = HC(
         css_dir = "/css",
         preload_styles = [],
-        style = "murphy")
+        style = "murphy",
+        #Keep highlighted code blocks on disk between builds, so that
+        #pygments only has to highlight new or changed blocks. The least
+        #recently used blocks are evicted beyond cache_max_size bytes.
+        #(These aren't in a nested HC, which a setting in _config.py
+        #would replace rather than update.)
+        cache_enabled = False,
+        cache_dir = "_cache/syntax_highlight",
+        cache_max_size = 64 * 1024 * 1024)
 
 def init():
+    global highlight_cache
+    if config.cache_enabled:
+        highlight_cache = DiskCache(
+            config.cache_dir, max_size=config.cache_max_size)
+        highlight_cache.prune()
     #This filter normally only loads pygments styles when needed.
     #This will force a particular style to get loaded at startup.
     for style in config.preload_styles:
-        css_class = "pygments_{0}".format(style)
-        formatter = pygments.formatters.HtmlFormatter(
-            linenos=False, cssclass=css_class, style=style)
-        write_pygments_css(style, formatter)
+        write_asset(style)
 
 
 css_files_written = set()
-
-code_block_re = re.compile(
-    r"(?:^|\s)"                 # $$code Must start as a new word
-    r"\$\$code"                 # $$code is the start of the block
-    r"(?P<args>\([^\r\n]*\))?"  # optional arguments are passed in brackets
-    r"[^\r\n]*\r?\n"            # ignore everything else on the 1st line
-    r"(?P<code>.*?)\s\$\$/code" # code block continues until $$/code
-    , re.DOTALL)
+#The on-disk cache of highlighted code, if it's enabled:
+highlight_cache = None
+#Lexers and formatters are reused for every block with the same options:
+lexers_by_name = {}
+formatters_by_options = {}
 
 argument_re = re.compile(
     r"[ ]*" # eat spaces at the beginning
@@ -97,11 +106,30 @@ argument_re = re.compile(
     "[,\r\n]" # ends in a comma or newline
     )
 
-def highlight_code(code, language, formatter):
+def get_lexer(language):
+    try:
+        return lexers_by_name[language]
+    except KeyError:
+        pass
     try:
         lexer = pygments.lexers.get_lexer_by_name(language)
     except pygments.util.ClassNotFound:
-        lexer = pygments.lexers.get_lexer_by_name("text")
+        lexer = get_lexer("text")
+    lexers_by_name[language] = lexer
+    return lexer
+
+def get_formatter(linenos, cssclass, style):
+    options = (linenos, cssclass, style)
+    try:
+        return formatters_by_options[options]
+    except KeyError:
+        formatter = formatters_by_options[options] = \
+            pygments.formatters.HtmlFormatter(
+                linenos=linenos, cssclass=cssclass, style=style)
+        return formatter
+
+def highlight_code(code, language, formatter):
+    lexer = get_lexer(language)
     #Highlight with pygments
     highlighted = pygments.highlight(code, lexer, formatter)
     #Convert line endings to <br> tags:
@@ -142,45 +170,72 @@ def write_pygments_css(style, formatter,
     css_files_written.add(css_site_path)
 
 
-def run(src):
-    substitutions = {}
-    for m in code_block_re.finditer(src):
-        args = parse_args(m.group('args'))
-        #Make default args
-        if 'lang' in args:
-            lang = args['lang']
-        elif 'language' in args:
-            lang = args['language']
+def write_asset(style):
+    """Write the stylesheet for a style recorded in a post's assets.
+    """
+    formatter = get_formatter(False, "pygments_{0}".format(style), style)
+    write_pygments_css(style, formatter)
+
+
+def cached_highlight_code(code, language, formatter, style):
+    """highlight_code, through the on-disk cache if it's enabled.
+    """
+    if highlight_cache is None:
+        return highlight_code(code, language, formatter)
+    key = make_key(code, language, style, formatter.linenos,
+                   formatter.cssclass, pygments.__version__)
+    highlighted = highlight_cache.get(key)
+    if highlighted is None:
+        highlighted = highlight_code(code, language, formatter)
+        highlight_cache.set(key, highlighted)
+    return highlighted
+
+
+def run_block(code, args, context=None):
+    """Highlight the code of a single $$code block.
+
+    `args` is the bracketed text after $$code, or None. This also lets
+    the filter be used as a block filter, through
+    blog.post.block_filters.
+    """
+    args = parse_args(args)
+    #Make default args
+    if 'lang' in args:
+        lang = args['lang']
+    elif 'language' in args:
+        lang = args['language']
+    else:
+        lang = 'text'
+    try:
+        if 'linenums' in args:
+            linenums = args['linenums']
+        elif "linenos" in args:
+            linenums = args['linenos']
+        if linenums.lower().strip() == "true":
+            linenums = True
         else:
-            lang = 'text'
-        try:
-            if 'linenums' in args:
-                linenums = args['linenums']
-            elif "linenos" in args:
-                linenums = args['linenos']
-            if linenums.lower().strip() == "true":
-                linenums = True
-            else:
-                linenums = False
-        except:
             linenums = False
-        try:
-            style = args['style']
-        except KeyError:
-            style = config.style
-        try:
-            css_class = args['cssclass']
-        except KeyError:
-            css_class = "pygments_{0}".format(style)
-        css_class += " syntax_highlight"
-        formatter = pygments.formatters.HtmlFormatter(
-            linenos=linenums, cssclass=css_class, style=style)
-        write_pygments_css(style, formatter)
-        substitutions[m.group()] = highlight_code(
-                m.group('code'), lang, formatter)
-    if len(substitutions) > 0:
-        p = re.compile('|'.join(map(re.escape, substitutions)))
-        src = p.sub(lambda x: substitutions[x.group(0)], src)
-        return src
+    except:
+        linenums = False
+    try:
+        style = args['style']
+    except KeyError:
+        style = config.style
+    try:
+        css_class = args['cssclass']
+    except KeyError:
+        css_class = "pygments_{0}".format(style)
+    css_class += " syntax_highlight"
+    formatter = get_formatter(linenums, css_class, style)
+    if hasattr(context, "assets"):
+        #Leave the stylesheet for the blog to write once the
+        #post is rendered
+        context.assets.add(("syntax_highlight", style))
     else:
-        return src
+        write_asset(style)
+    return cached_highlight_code(code, lang, formatter, style)
+
+
+def run(src, context=None):
+    return replace_blocks(
+        src, "code", lambda block: run_block(block.body, block.args, context))
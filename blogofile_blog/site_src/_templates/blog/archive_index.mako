@@ -7,3 +7,4 @@
   %endfor
 </ul>
 %endfor
+<%include file="archive_nav.mako" />\
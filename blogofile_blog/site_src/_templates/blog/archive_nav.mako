@@ -0,0 +1,19 @@
+## The links to the newer and older archives, for the archive pages
+## that chronological.mako and archive_index.mako render:
+% if context.get("older_archive") or context.get("newer_archive"):
+<%
+  older_archive = context.get("older_archive")
+  newer_archive = context.get("newer_archive")
+%>\
+<p class="archive_nav">
+% if newer_archive:
+ <a href="${newer_archive[0]}">« ${newer_archive[1]}</a>
+% endif
+% if older_archive and newer_archive:
+  --  
+% endif
+% if older_archive:
+ <a href="${older_archive[0]}">${older_archive[1]} »</a>
+% endif
+</p>
+% endif
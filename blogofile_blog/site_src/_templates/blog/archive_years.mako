@@ -0,0 +1,9 @@
+<%inherit file="bf_base_template" />
+%for year_url, year_name, year_count, months in years:
+<h1><a href="${year_url}">${year_name}</a> (${year_count})</h1>
+<ul>
+  %for month_url, month_name, month_count in months:
+  <li><a href="${month_url}">${month_name}</a> (${month_count})</li>
+  %endfor
+</ul>
+%endfor
@@ -0,0 +1,16 @@
+  <entry>
+    <author>
+      <name>${post.author}</name>
+      <uri>${bf.config.blog.url}</uri>
+    </author>
+    <title type="html"><![CDATA[${post.title}]]></title>
+    <link rel="alternate" type="text/html" href="${post.permalink}" />
+    <id>${post.permalink}</id>
+    <updated>${post.updated.strftime("%Y-%m-%dT%H:%M:%SZ")}</updated>
+    <published>${post.date.strftime("%Y-%m-%dT%H:%M:%SZ")}</published>
+% for category in post.categories:
+    <category scheme="${bf.config.blog.url}" term="${category}" />
+% endfor
+    <summary type="html"><![CDATA[${post.title}]]></summary>
+    <content type="html" xml:base="${post.permalink}"><![CDATA[${post.content}]]></content>
+  </entry>
@@ -1,6 +1,6 @@
 <%inherit file="bf_base_template" />
 % for post in posts:
-  <%include file="post.mako" args="post=post" />
+  ${bf.config.blog.fragments.render(post, "post.mako")}
 % if bf.config.blog.disqus.enabled:
   <div class="after_post"><a href="${post.permalink}#disqus_thread">Read and Post Comments</a></div>
 % endif
@@ -15,3 +15,4 @@
 % if next_link:
  <a href="${next_link}">Next Page »</a>
 % endif
+<%include file="archive_nav.mako" />\
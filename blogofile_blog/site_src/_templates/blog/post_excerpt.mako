@@ -1,3 +1,6 @@
+## Listing pages render this through the build's fragment cache, so
+## that each post's excerpt is rendered once:
+##   ${bf.config.blog.fragments.render(post, "post_excerpt.mako")}
 <%inherit file="post.mako" />
 <%def name="post_prose(post)">
   ${post.excerpt}
@@ -14,22 +14,8 @@
     <generator>Blogofile</generator>
     <sy:updatePeriod>hourly</sy:updatePeriod>
     <sy:updateFrequency>1</sy:updateFrequency>
-% for post in posts[:10]:
-    <item>
-      <title>${post.title}</title>
-      <link>${post.permalink}</link>
-      <pubDate>${post.date.strftime("%a, %d %b %Y %H:%M:%S %Z")}</pubDate>
-% for category in post.categories:
-      <category><![CDATA[${category}]]></category>
-% endfor
-% if post.guid:
-      <guid isPermaLink="false">${post.guid}</guid>
-% else:
-      <guid isPermaLink="true">${post.permalink}</guid>
-% endif
-      <description>${post.title}</description>
-      <content:encoded><![CDATA[${post.content}]]></content:encoded>
-    </item>
+% for post in posts:
+${bf.config.blog.fragments.render(post, "rss_item.mako")}\
 % endfor
   </channel>
 </rss>
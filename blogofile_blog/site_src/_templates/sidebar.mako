@@ -2,7 +2,7 @@
   <section>
     <h1 class="post_header_gradient theme_font">Latest Posts</h1>
     <ul>
-      % for post in bf.config.blog.iter_posts_published(5):
+      % for post in bf.config.blog.collection.latest(5):
       <li><a href="${post.path}">${post.title}</a></li>
       % endfor
     </ul>
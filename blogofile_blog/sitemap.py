@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Write a sitemap of the blog's pages for search engines.
+
+The ``<url>`` entries are written to disk as the pages are, so the
+memory a sitemap takes doesn't depend on how many pages there are.
+Past the limits of the sitemap protocol (50,000 URLs or 50MB in one
+file) the entries go on in another file, and the sitemap is then a
+sitemap index that lists the files.
+"""
+import io
+import logging
+import os
+from xml.sax.saxutils import escape
+from six.moves.urllib.parse import quote
+from .manifest import path_urls
+
+
+logger = logging.getLogger("blogofile.blog.sitemap")
+
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+_header = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+           b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+_footer = b'</urlset>\n'
+_index_header = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+_index_footer = b'</sitemapindex>\n'
+
+
+def page_url(site_url, location):
+    """Return the URL of the page written to `location` in _site: the
+    URL of its directory for an index.html.
+    """
+    path = location.replace(os.sep, "/").lstrip("/")
+    return path_urls(site_url, quote(path.encode("utf-8"), safe="/~"))[0]
+
+
+def format_lastmod(date):
+    """Return `date` (a datetime) as a W3C datetime; just the day if it
+    has no timezone.
+    """
+    if date.tzinfo is None or date.utcoffset() is None:
+        return date.strftime("%Y-%m-%d")
+    return date.isoformat()
+
+
+class SitemapWriter(object):
+    """Write the URLs given to :meth:`add` to a sitemap in `output_dir`.
+
+    :arg filename: The name of the sitemap. Once there is more than one
+                   file of URLs, they are named after it (sitemap-1.xml,
+                   sitemap-2.xml, ...) and it is a sitemap index.
+    :arg max_urls: The most URLs in one file.
+    :arg max_bytes: The largest size of one file.
+
+    The files are written under temporary names, and only renamed into
+    place by :meth:`close`.
+    """
+    def __init__(self, output_dir, site_url, filename="sitemap.xml",
+                 max_urls=MAX_URLS, max_bytes=MAX_BYTES):
+        self.output_dir = output_dir
+        self.site_url = site_url
+        self.filename = filename
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.urls = 0
+        self.files = 0
+        self._file = None
+        self._file_urls = 0
+        self._file_bytes = 0
+
+    def _part_name(self, number):
+        base, ext = os.path.splitext(self.filename)
+        return "{0}-{1}{2}".format(base, number, ext)
+
+    def _temp_path(self, number):
+        return os.path.join(self.output_dir,
+                            "." + self._part_name(number) + ".tmp")
+
+    def _next_file(self):
+        if self._file is not None:
+            self._file.write(_footer)
+            self._file.close()
+        self.files += 1
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+        self._file = io.open(self._temp_path(self.files), "wb")
+        self._file.write(_header)
+        self._file_urls = 0
+        self._file_bytes = len(_header) + len(_footer)
+
+    def add(self, location, lastmod=None):
+        """Add the page written to `location` in _site, last modified at
+        `lastmod` (a datetime), if that's known.
+        """
+        entry = u"<url><loc>{0}</loc>".format(
+            escape(page_url(self.site_url, location)))
+        if lastmod is not None:
+            entry += u"<lastmod>{0}</lastmod>".format(format_lastmod(lastmod))
+        entry = (entry + u"</url>\n").encode("utf-8")
+        if self._file is None or self._file_urls >= self.max_urls or \
+                self._file_bytes + len(entry) > self.max_bytes:
+            self._next_file()
+        self._file.write(entry)
+        self._file_urls += 1
+        self._file_bytes += len(entry)
+        self.urls += 1
+
+    def close(self):
+        """Finish the sitemap, and move its files into place.
+
+        Returns the paths written, relative to the output directory.
+        """
+        if self._file is None:
+            # An empty sitemap is still a valid one
+            self._next_file()
+        self._file.write(_footer)
+        self._file.close()
+        self._file = None
+        if self.files == 1:
+            parts = []
+            _replace(self._temp_path(1),
+                     os.path.join(self.output_dir, self.filename))
+        else:
+            parts = [self._part_name(n) for n in range(1, self.files + 1)]
+            for number, name in zip(range(1, self.files + 1), parts):
+                _replace(self._temp_path(number),
+                         os.path.join(self.output_dir, name))
+            self._write_index(parts)
+        # Remove the files of a bigger sitemap written here before:
+        number = 1 if self.files == 1 else self.files + 1
+        while os.path.exists(os.path.join(
+                self.output_dir, self._part_name(number))):
+            os.remove(os.path.join(self.output_dir, self._part_name(number)))
+            number += 1
+        logger.info("Sitemap: {0} URLs in {1} file{2}".format(
+            self.urls, self.files, "" if self.files == 1 else "s"))
+        return [self.filename] + parts
+
+    def _write_index(self, names):
+        temp_path = os.path.join(self.output_dir, "." + self.filename + ".tmp")
+        with io.open(temp_path, "wb") as f:
+            f.write(_index_header)
+            for name in names:
+                f.write(u"<sitemap><loc>{0}</loc></sitemap>\n".format(
+                    escape(page_url(self.site_url, name))).encode("utf-8"))
+            f.write(_index_footer)
+        _replace(temp_path, os.path.join(self.output_dir, self.filename))
+
+
+def _replace(temp_path, path):
+    try:
+        os.rename(temp_path, path)
+    except OSError:
+        # Windows won't rename over an existing file.
+        os.remove(path)
+        os.rename(temp_path, path)
@@ -9,6 +9,8 @@ try:
 except ImportError:
     import unittest                     # flake8 ignore # NOQA
 from blogofile import main
+from mock import patch
+import six
 
 
 class TestBlogofileBlogCommands(unittest.TestCase):
@@ -41,3 +43,269 @@ class TestBlogofileBlogCommands(unittest.TestCase):
         self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
         self._call_entry_point(['blogofile', 'build', '-s', src_dir])
         self.assertIn('_site', os.listdir(src_dir))
+
+    def test_blogofile_build_w_unknown_post_filename_placeholder(self):
+        """`blogofile build` stops on an unknown auto_post_filename placeholder
+        """
+        from blogofile.cache import bf
+        blog = bf.config.plugins.blog
+        self.addCleanup(setattr, blog, 'auto_post_filename',
+                        blog.auto_post_filename)
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        with open(os.path.join(src_dir, '_config.py'), 'a') as f:
+            f.write('\nblog.auto_post_filename = ":yaer - :title.md"\n')
+        with self.assertRaises(ValueError):
+            self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        self.assertFalse(
+            os.path.exists(os.path.join(src_dir, '_site', 'blog')))
+
+    def test_blogofile_blog_build_reuses_unchanged_pages(self):
+        """`blogofile blog build` reuses the pages of an unchanged blog
+        """
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        self._call_entry_point(['blogofile', 'blog', 'build'])
+        with patch('sys.stdout', new_callable=six.StringIO) as stdout:
+            self._call_entry_point(['blogofile', 'blog', 'build', '--dry-run'])
+        self.assertTrue(stdout.getvalue().startswith('0 to render, '))
+
+    def test_blogofile_blog_build_full_w_timings(self):
+        """`blogofile blog build --full --timings` times every page rendered
+        """
+        import json
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        pages = {}
+        for options in ([], [], ['--full']):
+            with patch('sys.stdout', new_callable=six.StringIO):
+                self._call_entry_point(
+                    ['blogofile', 'blog', 'build', '--timings', 't.json'] +
+                    options)
+            with open('t.json') as f:
+                phases = json.load(f)['phases']
+            pages[tuple(options)] = dict(
+                (p['phase'], p['pages']) for p in phases)['permapage']
+        # The second incremental build reuses every permapage:
+        self.assertEqual(pages[()], 0)
+        self.assertTrue(pages[('--full',)])
+
+    def test_blogofile_blog_build_w_changed_filter(self):
+        """`blogofile blog build` renders every page again after a filter edit
+        """
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        os.mkdir('_filters')
+        filter_path = os.path.join('_filters', 'mine.py')
+        with open(filter_path, 'w') as f:
+            f.write('def run(content):\n'
+                    '    return content\n')
+        self._call_entry_point(['blogofile', 'blog', 'build'])
+        with open(filter_path, 'a') as f:
+            f.write('# Changed\n')
+        with patch('sys.stdout', new_callable=six.StringIO) as stdout:
+            self._call_entry_point(['blogofile', 'blog', 'build', '--dry-run'])
+        self.assertTrue(
+            stdout.getvalue().endswith(' 0 to reuse, 0 to remove\n'))
+
+    def test_blogofile_build_w_fragments_in_site_template(self):
+        """`blogofile build` lets site templates use the fragment cache
+        """
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        with open(os.path.join(src_dir, 'latest.html.mako'), 'w') as f:
+            f.write('<% post = bf.config.blog.collection.published[0] %>\n'
+                    '${bf.config.blog.fragments.render('
+                    'post, "post_excerpt.mako")}\n')
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        pages = self._read_pages(os.path.join(src_dir, '_site'))
+        self.assertIn(b'class="blog_post"', pages['latest.html'])
+
+    def _read_pages(self, site_dir):
+        pages = {}
+        for dirpath, dirnames, filenames in os.walk(site_dir):
+            for filename in filenames:
+                if filename.endswith('.html'):
+                    path = os.path.join(dirpath, filename)
+                    with open(path, 'rb') as f:
+                        pages[os.path.relpath(path, site_dir)] = f.read()
+        return pages
+
+    def test_blogofile_build_w_post_cache_and_post_process(self):
+        """`blogofile build` w/ the post cache runs post_process once a build
+        """
+        from blogofile.cache import bf
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        with open(os.path.join(src_dir, '_config.py'), 'a') as f:
+            f.write('\nblog.post.cache.enabled = True\n'
+                    'def prefix_titles():\n'
+                    '    for post in blog.posts:\n'
+                    '        post.title = "[x] " + post.title\n'
+                    'blog.post.post_process = prefix_titles\n')
+        blog = bf.config.plugins.blog
+        self.addCleanup(setattr, blog.post, 'post_process', None)
+        self.addCleanup(setattr, blog.post.cache, 'enabled', False)
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        pages = self._read_pages(os.path.join(src_dir, '_site'))
+        self.assertTrue(any(b'[x] ' in page for page in pages.values()))
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        self.assertEqual(
+            self._read_pages(os.path.join(src_dir, '_site')), pages)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'render workers need os.fork')
+    def test_blogofile_build_w_render_workers(self):
+        """`blogofile build` w/ render_workers writes the same pages
+        """
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        serial_pages = self._read_pages(os.path.join(src_dir, '_site'))
+        with open(os.path.join(src_dir, '_config.py'), 'a') as f:
+            f.write('\nblog.render_workers = 2\n')
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        pages = self._read_pages(os.path.join(src_dir, '_site'))
+        self.assertTrue(serial_pages)
+        self.assertEqual(pages, serial_pages)
+
+    def test_blogofile_blog_watch_rebuilds_in_place(self):
+        """`blogofile blog watch` rebuilds an edited post in place
+        """
+        from argparse import Namespace
+        from blogofile.cache import bf
+        from blogofile_blog import watch
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        blog = bf.config.plugins.blog
+        self.addCleanup(setattr, blog.post, 'keep_parsed', False)
+        watch.full_build(Namespace(src_dir=src_dir))
+        posts_dir = os.path.join(src_dir, '_posts')
+        post_path = os.path.join(posts_dir, sorted(os.listdir(posts_dir))[0])
+        with open(post_path, 'a') as f:
+            f.write('\nAn edited paragraph.\n')
+        os.remove(os.path.join(posts_dir, sorted(os.listdir(posts_dir))[1]))
+        watch.rebuild_in_place(os.path.join('_site'))
+        pages = self._read_pages(os.path.join(src_dir, '_site'))
+        self.assertTrue(any(b'An edited paragraph.' in page
+                            for page in pages.values()))
+        blog.post.keep_parsed = False
+        self._call_entry_point(['blogofile', 'build', '-s', src_dir])
+        self.assertEqual(
+            self._read_pages(os.path.join(src_dir, '_site')), pages)
+
+    def test_blogofile_blog_watch_w_compress_and_post_process(self):
+        """`blogofile blog watch` w/ compress and post_process rebuilds cleanly
+        """
+        from argparse import Namespace
+        from blogofile.cache import bf
+        from blogofile_blog import watch
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        with open('_config.py', 'a') as f:
+            f.write('\nblog.compress.enabled = True\n'
+                    'def prefix_titles():\n'
+                    '    for post in blog.posts:\n'
+                    '        post.title = "[x] " + post.title\n'
+                    'blog.post.post_process = prefix_titles\n')
+        blog = bf.config.plugins.blog
+        self.addCleanup(setattr, blog.post, 'keep_parsed', False)
+        self.addCleanup(setattr, blog.post, 'post_process', None)
+        self.addCleanup(setattr, blog.compress, 'enabled', False)
+        watch.full_build(Namespace(src_dir=src_dir))
+        site_dir = os.path.join(src_dir, '_site')
+        pages = self._read_pages(site_dir)
+        posts_dir = os.path.join(src_dir, '_posts')
+        post_path = os.path.join(posts_dir, sorted(os.listdir(posts_dir))[0])
+        os.remove(os.path.join(posts_dir, sorted(os.listdir(posts_dir))[1]))
+        for n in range(2):
+            with open(post_path, 'a') as f:
+                f.write('\nEdit {0}.\n'.format(n))
+            watch.rebuild_in_place(os.path.join('_site'))
+        new_pages = self._read_pages(site_dir)
+        self.assertTrue(set(pages) - set(new_pages))
+        self.assertTrue(any(b'[x] ' in page for page in new_pages.values()))
+        self.assertFalse(
+            any(b'[x] [x]' in page for page in new_pages.values()))
+        for dirpath, dirnames, filenames in os.walk(site_dir):
+            for filename in filenames:
+                if filename.endswith('.html.gz'):
+                    self.assertIn(filename[:-3], filenames)
+
+    @unittest.skipUnless(hasattr(os, 'link'), 'needs hard links')
+    def test_blogofile_blog_watch_w_manifest_hard_links(self):
+        """`blogofile blog watch` doesn't write through manifest hard links
+        """
+        from argparse import Namespace
+        from blogofile.cache import bf
+        from blogofile_blog import watch
+        self.addCleanup(os.chdir, os.getcwd())
+        src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, src_dir)
+        os.rmdir(src_dir)
+        self._call_entry_point(['blogofile', 'init', src_dir, 'blog'])
+        os.chdir(src_dir)
+        with open('_config.py', 'a') as f:
+            f.write('\nblog.manifest.enabled = True\n'
+                    'blog.manifest.hard_links = True\n')
+        # Two files the manifest links together, and a site controller
+        # that adds to one of them in place in the rebuilds of watch:
+        for name in ('same-1.txt', 'same-2.txt'):
+            with open(name, 'w') as f:
+                f.write('Same\n')
+        os.mkdir('_controllers')
+        with open(os.path.join('_controllers', 'stamp_file.py'), 'w') as f:
+            f.write(
+                'import os\n'
+                'from blogofile.cache import bf\n'
+                'config = {"enabled": True}\n'
+                'def run():\n'
+                '    if not bf.config.plugins.blog.incremental.in_place:\n'
+                '        return\n'
+                '    path = os.path.join(bf.writer.output_dir, "same-1.txt")\n'
+                '    with open(path, "a") as f:\n'
+                '        f.write("Stamped\\n")\n')
+        blog = bf.config.plugins.blog
+        self.addCleanup(setattr, blog.post, 'keep_parsed', False)
+        self.addCleanup(setattr, blog.manifest, 'enabled', False)
+        watch.full_build(Namespace(src_dir=src_dir))
+        site_dir = os.path.join(src_dir, '_site')
+        self.assertTrue(os.path.samefile(
+            os.path.join(site_dir, 'same-1.txt'),
+            os.path.join(site_dir, 'same-2.txt')))
+        watch.rebuild_in_place(os.path.join('_site'))
+        with open(os.path.join(site_dir, 'same-1.txt')) as f:
+            self.assertEqual(f.read(), 'Same\nStamped\n')
+        with open(os.path.join(site_dir, 'same-2.txt')) as f:
+            self.assertEqual(f.read(), 'Same\n')
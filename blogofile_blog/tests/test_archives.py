@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile blog archives module.
+"""
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+from mock import patch
+
+
+class TestSortIntoArchives(unittest.TestCase):
+    """Unit tests for sort_into_archives function."""
+    def _get_fut(self):
+        from blog.archives import sort_into_archives
+        return sort_into_archives
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def _make_post(self, n, date, draft=False):
+        from blog.post import Post
+        return Post(
+            '---\n'
+            'title: Post {0}\n'
+            'date: {1} 19:33:42\n'
+            'draft: {2}\n'
+            '---\n'
+            'Post {0}.\n'
+            .format(n, date, draft))
+
+    def _set_posts(self, posts):
+        from blog import blog
+        from blog.collection import PostCollection
+        for name in ('posts', 'collection', 'archive_years',
+                     'archived_posts', 'archive_links'):
+            self.addCleanup(setattr, blog, name, blog.get(name))
+        blog.posts = posts
+        blog.collection = PostCollection(posts)
+        blog.archive_years = []
+        blog.archived_posts = {}
+        blog.archive_links = []
+        return blog
+
+    def setUp(self):
+        self.posts = [
+            self._make_post(1, '2013/01/02'),
+            self._make_post(2, '2012/11/20'),
+            self._make_post(3, '2012/11/20'),
+            self._make_post(4, '2012/11/10', draft=True),
+            self._make_post(5, '2012/10/05'),
+            ]
+
+    def test_archive_tree(self):
+        """sort_into_archives builds years of months of days of posts
+        """
+        posts = self.posts
+        blog = self._set_posts(posts)
+        self._call_fut()
+        self.assertEqual([y.link for y in blog.archive_years],
+                         ['archive/2013', 'archive/2012'])
+        year = blog.archive_years[1]
+        self.assertEqual(year.name, '2012')
+        self.assertEqual(year.posts, [posts[1], posts[2], posts[4]])
+        self.assertEqual([(m.link, m.name) for m in year.archives],
+                         [('archive/2012/11', 'November 2012'),
+                          ('archive/2012/10', 'October 2012')])
+        days = year.archives[0].archives
+        self.assertEqual([d.link for d in days], ['archive/2012/11/20'])
+        self.assertEqual(days[0].posts, [posts[1], posts[2]])
+
+    def test_month_index(self):
+        """sort_into_archives indexes the months by link
+        """
+        posts = self.posts
+        blog = self._set_posts(posts)
+        self._call_fut()
+        self.assertEqual(
+            blog.archive_links,
+            [('archive/2013/01', 'January 2013', 1),
+             ('archive/2012/11', 'November 2012', 2),
+             ('archive/2012/10', 'October 2012', 1)])
+        self.assertEqual(blog.archived_posts['archive/2012/11'],
+                         [posts[1], posts[2]])
+
+    def test_older_and_newer(self):
+        """archives link to their neighbours, across years and months
+        """
+        blog = self._set_posts(self.posts)
+        self._call_fut()
+        new_year, old_year = blog.archive_years
+        january = new_year.archives[0]
+        november, october = old_year.archives
+        self.assertIs(new_year.older, old_year)
+        self.assertIs(old_year.newer, new_year)
+        self.assertIsNone(new_year.newer)
+        self.assertIs(january.older, november)
+        self.assertIs(november.newer, january)
+        self.assertIs(october.older, None)
+        self.assertIs(january.archives[0].older, november.archives[0])
+        nav = november.nav()
+        self.assertEqual(nav['archive_name'], 'November 2012')
+        self.assertEqual(nav['newer_archive'][1], 'January 2013')
+        self.assertTrue(
+            nav['older_archive'][0].endswith('/archive/2012/10/1/'))
+
+
+class TestWriteArchives(unittest.TestCase):
+    """Unit tests for the write_*_archives functions."""
+    def _make_posts(self):
+        from blog.post import Post
+        # 60 posts in October to December 2010: 12 pages of the year,
+        # and 4 of October 10th
+        posts = []
+        for n in range(60):
+            date = '2010/{0}/{1:02} 19:33:42'.format(
+                10 + n // 20, 10 if n < 20 else 1 + n % 20)
+            posts.append(Post(
+                '---\ntitle: Post {0}\ndate: {1}\n---\nPost.\n'
+                .format(n, date)))
+        posts.sort(key=lambda post: post.date, reverse=True)
+        return posts
+
+    def _write_all(self, daily):
+        from blog import blog, archives, render
+        from blog.collection import PostCollection
+        for name in ('posts', 'collection', 'archive_years',
+                     'archived_posts', 'archive_links'):
+            self.addCleanup(setattr, blog, name, blog.get(name))
+        self.addCleanup(setattr, blog.archives, 'daily', blog.archives.daily)
+        blog.posts = self._make_posts()
+        blog.collection = PostCollection(blog.posts)
+        blog.archive_years = []
+        blog.archived_posts = {}
+        blog.archive_links = []
+        blog.archives.daily = daily
+        archives.sort_into_archives()
+        pages = {}
+
+        def materialize_template(template_name, location, env):
+            self.assertNotIn(location, pages)
+            pages[location] = env
+        with patch.object(render, 'materialize_template',
+                          materialize_template):
+            archives.write_monthly_archives()
+            archives.write_yearly_archives()
+            if daily:
+                archives.write_daily_archives()
+        return blog, pages
+
+    def _page(self, pages, blog, path):
+        from blogofile.cache import bf
+        return pages[bf.util.path_join(blog.path, path, 'index.html')]
+
+    def test_year_pages_dont_clash_with_months(self):
+        """the pages of a year past the first are below pagination_dir
+        """
+        blog, pages = self._write_all(daily=False)
+        october = self._page(pages, blog, 'archive/2010/10/1')
+        self.assertEqual(len(october['posts']), blog.posts_per_page)
+        self.assertTrue(all(post.date.month == 10
+                            for post in october['posts']))
+        self.assertEqual(october['next_link'], '../2')
+        year_page = self._page(pages, blog, 'archive/2010/page/10')
+        self.assertEqual(year_page['prev_link'], '../../page/9')
+        self.assertEqual(year_page['next_link'], '../../page/11')
+        self.assertEqual(
+            self._page(pages, blog, 'archive/2010/1')['next_link'],
+            '../page/2')
+        self.assertEqual(
+            self._page(pages, blog, 'archive/2010/page/2')['prev_link'],
+            '../../1')
+        self.assertIn('posts', self._page(pages, blog,
+                                          'archive/2010/page/12'))
+
+    def test_month_pages_dont_clash_with_days(self):
+        """with daily archives, month pages are below pagination_dir too
+        """
+        blog, pages = self._write_all(daily=True)
+        day = self._page(pages, blog, 'archive/2010/10/10/1')
+        self.assertTrue(all(post.date.day == 10 for post in day['posts']))
+        self.assertIn('posts', self._page(pages, blog,
+                                          'archive/2010/10/page/2'))
+        self.assertIn('posts', self._page(pages, blog,
+                                          'archive/2010/10/10/page/4'))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog bench module.
+"""
+import collections
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestGenerateCorpus(unittest.TestCase):
+    """Unit tests for generate_corpus function."""
+    def _get_fut(self):
+        from blogofile_blog.bench import generate_corpus
+        return generate_corpus
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _read_corpus(self, directory):
+        corpus = {}
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name)) as f:
+                corpus[name] = f.read()
+        return corpus
+
+    def test_generate_corpus_posts(self):
+        """generate_corpus writes posts in each markup with code blocks
+        """
+        posts_dir = os.path.join(self.temp_dir, "_posts")
+        self._call_fut(posts_dir, posts=4, code_blocks=2,
+                       markups=("markdown", "rst"))
+        corpus = self._read_corpus(posts_dir)
+        self.assertEqual(
+            sorted(corpus),
+            ["000000 - synthetic post.markdown",
+             "000001 - synthetic post.rst",
+             "000002 - synthetic post.markdown",
+             "000003 - synthetic post.rst"])
+        for src in corpus.values():
+            self.assertTrue(src.startswith("---\ntitle: Synthetic post "))
+            self.assertEqual(src.count("$$code(lang=python)\n"), 2)
+
+    def test_generate_corpus_deterministic(self):
+        """generate_corpus writes the same posts for the same seed
+        """
+        first = os.path.join(self.temp_dir, "first")
+        second = os.path.join(self.temp_dir, "second")
+        self._call_fut(first, posts=5, seed=3)
+        self._call_fut(second, posts=5, seed=3)
+        self.assertEqual(self._read_corpus(first),
+                         self._read_corpus(second))
+
+
+class TestScaling(unittest.TestCase):
+    """Unit tests for scaling function."""
+    def _call_fut(self, *args, **kwargs):
+        from blogofile_blog.bench import scaling
+        return scaling(*args, **kwargs)
+
+    def test_scaling_exponents(self):
+        """scaling gives the exponent of the growth between each size
+        """
+        runs = {"10": {"parse": 1.0, "feed": 0.5},
+                "100": {"parse": 10.0, "feed": 0.5},
+                "1000": {"parse": 1000.0, "feed": 0.0}}
+        runs = collections.OrderedDict(
+            (size, runs[size]) for size in ("10", "100", "1000"))
+        result = self._call_fut(runs)
+        self.assertEqual([round(k, 6) for k in result["parse"]], [1.0, 2.0])
+        self.assertEqual(result["feed"], [0.0, None])
+
+
+class TestCompareToBaseline(unittest.TestCase):
+    """Unit tests for compare_to_baseline function."""
+    def _call_fut(self, *args, **kwargs):
+        from blogofile_blog.bench import compare_to_baseline
+        return compare_to_baseline(*args, **kwargs)
+
+    def test_compare_to_baseline(self):
+        """compare_to_baseline lists the steps beyond the tolerance
+        """
+        results = {"runs": {"100": {"parse": 1.3, "feed": 1.2},
+                            "1000": {"parse": 5.0}}}
+        baseline = {"runs": {"100": {"parse": 1.0, "feed": 1.0}}}
+        self.assertEqual(self._call_fut(results, baseline, 1.25),
+                         [(100, "parse", 1.0, 1.3)])
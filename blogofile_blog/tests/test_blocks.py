@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog blocks module.
+"""
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestFindBlocks(unittest.TestCase):
+    """Unit tests for find_blocks function."""
+    def _get_fut(self):
+        from blogofile_blog.blocks import find_blocks
+        return find_blocks
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_find_blocks_args_and_body(self):
+        """find_blocks returns the span, args and body of each block
+        """
+        src = ('Some text\n'
+               '$$code(lang=python) ignored\n'
+               'import this\n'
+               '$$/code\n'
+               'More text\n'
+               '$$code\n'
+               'x = 1\n'
+               '$$/code')
+        blocks = self._call_fut(src, 'code')
+        self.assertEqual(
+            [(src[b.start:b.end], b.args, b.body) for b in blocks],
+            [('\n$$code(lang=python) ignored\nimport this\n$$/code',
+              '(lang=python)', 'import this'),
+             ('\n$$code\nx = 1\n$$/code', None, 'x = 1')])
+
+    def test_find_blocks_must_start_a_word(self):
+        """find_blocks ignores an opening that doesn't follow whitespace
+        """
+        self.assertEqual(
+            self._call_fut('cost: US$$code\nx\n$$/code', 'code'), [])
+
+    def test_find_blocks_unclosed(self):
+        """find_blocks leaves an unclosed block, and those after it, as text
+        """
+        src = '$$code\nx\n$$/code\n$$code\ny $$/cod\n$$code\nz\n'
+        blocks = self._call_fut(src, 'code')
+        self.assertEqual([b.body for b in blocks], ['x'])
+
+
+class TestReplaceBlocks(unittest.TestCase):
+    """Unit tests for replace_blocks function."""
+    def _get_fut(self):
+        from blogofile_blog.blocks import replace_blocks
+        return replace_blocks
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_replace_blocks(self):
+        """replace_blocks splices in the replacement for each block
+        """
+        src = 'a\n$$up\nb\n$$/up c\n$$up\nd\n$$/up'
+        self.assertEqual(
+            self._call_fut(src, 'up', lambda block: block.body.upper()),
+            'aB cD')
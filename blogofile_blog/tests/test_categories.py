@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile blog categories module.
+"""
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestSortIntoCategories(unittest.TestCase):
+    """Unit tests for sort_into_categories function."""
+    def _get_fut(self):
+        from blog.categories import sort_into_categories
+        return sort_into_categories
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def _make_post(self, n, categories, tags='', draft=False):
+        from blog.post import Post
+        return Post(
+            '---\n'
+            'title: Post {0}\n'
+            'date: 2012/11/{1:02} 19:33:42\n'
+            'categories: {2}\n'
+            'tags: {3}\n'
+            'draft: {4}\n'
+            '---\n'
+            'Post {0}.\n'
+            .format(n, 20 - n, categories, tags, draft))
+
+    def _set_posts(self, posts):
+        from blog import blog, iter_posts, iter_posts_published
+        from blog.collection import PostCollection
+        for name in ('posts', 'collection', 'iter_posts',
+                     'iter_posts_published', 'categorized_posts',
+                     'all_categories', 'tagged_posts', 'all_tags'):
+            self.addCleanup(setattr, blog, name, blog.get(name))
+        blog.posts = posts
+        blog.collection = PostCollection(posts)
+        blog.iter_posts = iter_posts
+        blog.iter_posts_published = iter_posts_published
+        blog.categorized_posts = {}
+        blog.all_categories = []
+        blog.tagged_posts = {}
+        blog.all_tags = []
+        return blog
+
+    def test_sort_into_categories_and_tags(self):
+        """sort_into_categories indexes published posts by category and tag
+        """
+        posts = [
+            self._make_post(1, 'Stuff, Things', 'python'),
+            self._make_post(2, 'Stuff', 'python, mako', draft=True),
+            self._make_post(3, 'Things, stuff', 'mako'),
+            ]
+        blog = self._set_posts(posts)
+        self._call_fut()
+        self.assertEqual(
+            [(c.name, n) for c, n in blog.all_categories],
+            [('stuff', 2), ('things', 2)])
+        self.assertEqual(
+            [(t.name, t.url_name, n) for t, n in blog.all_tags],
+            [('mako', 'mako', 1), ('python', 'python', 1)])
+        for category, category_posts in blog.categorized_posts.items():
+            self.assertEqual(category_posts, [posts[0], posts[2]])
+        # The published posts share one Category object per name:
+        stuff = [c for c in posts[0].categories if c.name == 'stuff'][0]
+        self.assertTrue(
+            any(c is stuff for c in posts[2].categories))
+
+    def test_sort_into_categories_wo_tag_dir(self):
+        """sort_into_categories doesn't index tags w/ blog.tag_dir None
+        """
+        posts = [
+            self._make_post(1, 'Stuff', 'python'),
+            self._make_post(2, 'Things', 'python, mako'),
+            ]
+        blog = self._set_posts(posts)
+        self.addCleanup(setattr, blog, 'tag_dir', blog.tag_dir)
+        blog.tag_dir = None
+        self._call_fut()
+        self.assertEqual(
+            [(c.name, n) for c, n in blog.all_categories],
+            [('stuff', 1), ('things', 1)])
+        self.assertEqual(blog.tagged_posts, {})
+        self.assertEqual(blog.all_tags, [])
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile blog collection module.
+"""
+from datetime import date, datetime
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestPostCollection(unittest.TestCase):
+    """Unit tests for PostCollection class."""
+    def _get_target_class(self):
+        from blog.collection import PostCollection
+        return PostCollection
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def _make_post(self, n, day, draft=False):
+        from blog.post import Post
+        return Post(
+            '---\n'
+            'title: Post {0}\n'
+            'date: 2012/11/{1:02} 19:33:42\n'
+            'guid: guid-{0}\n'
+            'draft: {2}\n'
+            '---\n'
+            'Post {0}.\n'
+            .format(n, day, draft), filename='{0:03}.markdown'.format(n))
+
+    def setUp(self):
+        # Newest first, as parse_posts sorts them; two on the 20th
+        self.posts = [
+            self._make_post(1, 20),
+            self._make_post(2, 20),
+            self._make_post(3, 15, draft=True),
+            self._make_post(4, 10),
+            self._make_post(5, 5),
+            ]
+
+    def test_published(self):
+        """published has the posts that aren't drafts, in order
+        """
+        collection = self._make_one(self.posts)
+        posts = self.posts
+        self.assertEqual(collection.published,
+                         [posts[0], posts[1], posts[3], posts[4]])
+        self.assertEqual(len(collection), 5)
+        self.assertEqual(list(collection), posts)
+        self.assertIs(collection[2], posts[2])
+
+    def test_lookups(self):
+        """posts are looked up by permalink, slug, filename and guid
+        """
+        collection = self._make_one(self.posts)
+        post = self.posts[2]
+        self.assertIs(collection.by_permalink(post.permalink), post)
+        self.assertIs(collection.by_slug('post-3'), post)
+        self.assertIs(collection.by_filename('003.markdown'), post)
+        self.assertIs(collection.by_guid('guid-3'), post)
+        self.assertIsNone(collection.by_slug('post-6'))
+        self.assertEqual(collection.by_guid('guid-6', 'missing'), 'missing')
+
+    def test_latest(self):
+        """latest has the newest published posts
+        """
+        collection = self._make_one(self.posts)
+        posts = self.posts
+        self.assertEqual(collection.latest(3), [posts[0], posts[1], posts[3]])
+        self.assertEqual(collection.latest(), collection.published)
+
+    def test_between(self):
+        """between has the published posts in a date range, newest first
+        """
+        collection = self._make_one(self.posts)
+        posts = self.posts
+        self.assertEqual(collection.between(date(2012, 11, 10),
+                                            date(2012, 11, 21)),
+                         [posts[0], posts[1], posts[3]])
+        self.assertEqual(collection.between(datetime(2012, 11, 5, 19, 33, 43),
+                                            date(2012, 11, 20)),
+                         [posts[3]])
+        self.assertEqual(collection.between(end=date(2012, 11, 10)),
+                         [posts[4]])
+        self.assertEqual(collection.between(start=date(2012, 11, 11)),
+                         [posts[0], posts[1]])
+        self.assertEqual(collection.between(date(2012, 11, 21),
+                                            date(2012, 11, 1)), [])
+
+    def test_neighbours(self):
+        """neighbours are the published posts just older and newer
+        """
+        collection = self._make_one(self.posts)
+        posts = self.posts
+        self.assertEqual(collection.neighbours(posts[0]), (posts[1], None))
+        self.assertEqual(collection.neighbours(posts[1]), (posts[3], posts[0]))
+        self.assertEqual(collection.neighbours(posts[4]), (None, posts[3]))
+        self.assertEqual(collection.neighbours(posts[2]), (None, None))
+
+
+class TestIterPostsPublished(unittest.TestCase):
+    """Unit tests for iter_posts_published function."""
+    def _get_fut(self):
+        from blog import iter_posts_published
+        return iter_posts_published
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_iter_posts_published_limit(self):
+        """iter_posts_published yields the first published posts
+        """
+        from blog import blog
+        from blog.collection import PostCollection
+
+        class FakePost(object):
+            def __init__(self, draft, permalink='http://example.com/post'):
+                self.draft = draft
+                self.permalink = permalink
+                self.slug = self.filename = self.guid = None
+                self.date = datetime(2012, 11, 11)
+
+        posts = [FakePost(False), FakePost(True), FakePost(False, None),
+                 FakePost(False), FakePost(False)]
+        self.addCleanup(setattr, blog, 'collection', blog.get('collection'))
+        blog.collection = PostCollection(posts)
+        self.assertEqual(list(self._call_fut(2)), [posts[0], posts[3]])
+        self.assertEqual(list(self._call_fut()),
+                         [posts[0], posts[3], posts[4]])
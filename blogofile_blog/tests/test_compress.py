@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog compress module.
+"""
+import gzip
+import os
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestCompressSite(unittest.TestCase):
+    """Unit tests for compress_site function."""
+    def _get_fut(self):
+        from blogofile_blog.compress import compress_site
+        return compress_site
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def setUp(self):
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.site_dir = os.path.join(temp_dir, '_site')
+        self.cache_dir = os.path.join(temp_dir, '_cache')
+        os.makedirs(os.path.join(self.site_dir, 'feed'))
+        self.files = {
+            'index.html': b'<p>page</p>' * 200,
+            'feed/index.xml': b'<item/>' * 200,
+            'small.html': b'<p>small</p>',
+            'image.png': b'\x89PNG' * 500,
+            }
+        for path, contents in self.files.items():
+            with open(os.path.join(self.site_dir, path), 'wb') as f:
+                f.write(contents)
+
+    def _compress(self):
+        return self._call_fut(
+            self.site_dir, self.cache_dir, ['.html', '.xml'], min_size=1024,
+            encodings=['.gz'])
+
+    def test_compress_site_siblings(self):
+        """compress_site writes .gz siblings of large enough text files
+        """
+        self.assertEqual(self._compress(), (2, 2))
+        for path in ('index.html', 'feed/index.xml'):
+            with gzip.open(os.path.join(self.site_dir, path + '.gz')) as f:
+                self.assertEqual(f.read(), self.files[path])
+        for path in ('small.html', 'image.png'):
+            self.assertFalse(
+                os.path.exists(os.path.join(self.site_dir, path + '.gz')))
+
+    def test_compress_site_reuses_unchanged(self):
+        """compress_site only compresses files whose contents changed
+        """
+        self._compress()
+        os.remove(os.path.join(self.site_dir, 'index.html.gz'))
+        with open(os.path.join(self.site_dir, 'feed/index.xml'), 'wb') as f:
+            f.write(b'<entry/>' * 200)
+        self.assertEqual(self._compress(), (1, 2))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.site_dir, 'index.html.gz')))
+        # Only the current files' compressed copies are kept:
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_compress_site_removes_stale_siblings(self):
+        """compress_site removes the siblings of files too small for one
+        """
+        self._compress()
+        with open(os.path.join(self.site_dir, 'index.html'), 'wb') as f:
+            f.write(b'<p>small</p>')
+        # Not a sibling of a file of the site:
+        with open(os.path.join(self.site_dir, 'site.tar.gz'), 'wb') as f:
+            f.write(b'\x1f\x8b')
+        self.assertEqual(self._compress(), (0, 1))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.site_dir, 'index.html.gz')))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.site_dir, 'feed/index.xml.gz')))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.site_dir, 'site.tar.gz')))
+
+
+class TestRemoveSiblings(unittest.TestCase):
+    """Unit tests for remove_siblings function."""
+    def _get_fut(self):
+        from blogofile_blog.compress import remove_siblings
+        return remove_siblings
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_remove_siblings(self):
+        """remove_siblings removes the .gz and .br siblings of a file
+        """
+        site_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, site_dir)
+        for name in ('index.html.gz', 'index.html.br', 'other.html.gz'):
+            open(os.path.join(site_dir, name), 'w').close()
+        self._call_fut(os.path.join(site_dir, 'index.html'))
+        self.assertEqual(os.listdir(site_dir), ['other.html.gz'])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog contentstore module.
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+import six
+
+
+class TestContentStore(unittest.TestCase):
+    """Unit tests for ContentStore class."""
+    def _get_target_class(self):
+        from blogofile_blog.contentstore import ContentStore
+        return ContentStore
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def setUp(self):
+        self.temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def test_add_and_read(self):
+        """text added to the store reads back, also after later additions
+        """
+        store = self._make_one(os.path.join(self.temp_dir, 'store'))
+        self.addCleanup(store.close)
+        first = store.add(six.u('<p>Je suis arrivé</p>'))
+        self.assertEqual(first.read(), six.u('<p>Je suis arrivé</p>'))
+        empty = store.add(six.u(''))
+        second = store.add(six.u('<p>Second</p>'))
+        self.assertEqual(second.read(), six.u('<p>Second</p>'))
+        self.assertEqual(first.read(), six.u('<p>Je suis arrivé</p>'))
+        self.assertEqual(empty.read(), six.u(''))
+
+    def test_close_removes_file(self):
+        """closing the store removes its file and makes reads fail
+        """
+        store = self._make_one(self.temp_dir)
+        text = store.add(six.u('text'))
+        self.assertTrue(os.path.exists(store.path))
+        store.close()
+        self.assertFalse(os.path.exists(store.path))
+        self.assertRaises(ValueError, text.read)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog diskcache module.
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+import time
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+import six
+
+
+class TestMakeKey(unittest.TestCase):
+    """Unit tests for make_key function."""
+    def _get_fut(self):
+        from blogofile_blog.diskcache import make_key
+        return make_key
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_make_key_text_and_bytes_agree(self):
+        """make_key hashes text parts as their utf-8 encoding
+        """
+        self.assertEqual(
+            self._call_fut(six.u('Je suis arrivé')),
+            self._call_fut(six.u('Je suis arrivé').encode('utf-8')))
+
+    def test_make_key_part_boundaries(self):
+        """make_key distinguishes where one part ends and the next begins
+        """
+        self.assertNotEqual(
+            self._call_fut('ab', 'c'), self._call_fut('a', 'bc'))
+
+
+class TestDiskCache(unittest.TestCase):
+    """Unit tests for DiskCache class."""
+    def _get_target_class(self):
+        from blogofile_blog.diskcache import DiskCache
+        return DiskCache
+
+    def _make_one(self, *args, **kwargs):
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        return self._get_target_class()(cache_dir, *args, **kwargs)
+
+    def test_get_missing_key_counts_miss(self):
+        """get returns default for an unknown key and counts a miss
+        """
+        cache = self._make_one()
+        self.assertIsNone(cache.get('0123abcd'))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_set_then_get_counts_hit(self):
+        """get returns the stored value and counts a hit
+        """
+        cache = self._make_one()
+        cache.set('0123abcd', {'title': 'Test Post'})
+        self.assertEqual(cache.get('0123abcd'), {'title': 'Test Post'})
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_unreadable_entry_is_discarded(self):
+        """get treats a corrupt entry as a miss and removes it
+        """
+        cache = self._make_one()
+        cache.set('0123abcd', 'value')
+        with open(cache._path('0123abcd'), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertIsNone(cache.get('0123abcd'))
+        self.assertFalse(os.path.exists(cache._path('0123abcd')))
+
+    def test_prune_evicts_least_recently_used(self):
+        """prune removes the entries that were used longest ago
+        """
+        cache = self._make_one()
+        for n, key in enumerate(('aa01', 'bb02', 'cc03')):
+            cache.set(key, 'x' * 100)
+            then = time.time() - 100 + n
+            os.utime(cache._path(key), (then, then))
+        cache.get('aa01')
+        cache.max_size = cache.size() - 1
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get('bb02'))
+        self.assertEqual(cache.get('aa01'), 'x' * 100)
+        self.assertEqual(cache.get('cc03'), 'x' * 100)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile blog feed module.
+"""
+import os
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+from mako.lookup import TemplateLookup
+from mock import patch
+
+
+class TestWriteFeed(unittest.TestCase):
+    """Unit tests for write_feed function."""
+    def _get_fut(self):
+        from blog.feed import write_feed
+        return write_feed
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def setUp(self):
+        import logging
+        from blog import blog
+        for name in ('fragments', 'logger', 'posts_per_feed'):
+            self.addCleanup(setattr, blog, name, blog.get(name))
+        blog.logger = logging.getLogger('blog')
+        self.blog = blog
+
+    def _make_posts(self, count):
+        from blog.post import Post
+        return [Post(
+            '---\n'
+            'title: Post {0}\n'
+            'date: 2012/11/{1:02} 19:33:42\n'
+            'categories: Stuff, Things\n'
+            '---\n'
+            'Post {0}.\n'
+            .format(n, 20 - n)) for n in range(count)]
+
+    def _write(self, feeds):
+        """Write each (posts, root, template) of `feeds` with the blog's
+        feed templates, and return the feeds by path.
+        """
+        import blogofile_blog
+        from blogofile.cache import bf
+        from blog import render
+        lookup = TemplateLookup(directories=[os.path.join(
+            os.path.dirname(blogofile_blog.__file__),
+            'site_src', '_templates', 'blog')])
+        self.blog.fragments = render.FragmentCache(lookup)
+        written = {}
+
+        def materialize_template(template_name, location, env):
+            self.assertNotIn(location, written)
+            written[location] = lookup.get_template(
+                template_name).render_unicode(bf=bf, **env)
+        with patch.object(render, 'materialize_template',
+                          materialize_template):
+            for posts, root, template in feeds:
+                self._call_fut(posts, root, template)
+        return written
+
+    def test_posts_per_feed(self):
+        """write_feed passes the template only blog.posts_per_feed posts
+        """
+        from blog import render
+        self.blog.posts_per_feed = 3
+        posts = self._make_posts(5)
+        with patch.object(render, 'materialize_template') as materialize:
+            self._call_fut(posts, '/blog/feed', 'rss.mako')
+        (template_name, location, env), kwargs = materialize.call_args
+        self.assertEqual((template_name, location),
+                         ('rss.mako', 'blog/feed/index.xml'))
+        self.assertEqual(env['posts'], posts[:3])
+
+    def test_entries_rendered_once(self):
+        """write_feed renders each post's entry once across feeds
+        """
+        self.blog.posts_per_feed = 10
+        posts = self._make_posts(3)
+        feeds = self._write([
+            (posts, '/blog/feed', 'rss.mako'),
+            (posts, '/blog/category/stuff/feed', 'rss.mako'),
+            (posts[1:], '/blog/category/things/feed', 'rss.mako'),
+            (posts, '/blog/feed/atom', 'atom.mako'),
+            ])
+        fragments = self.blog.fragments
+        # One rss_item.mako and one atom_entry.mako per post, and the
+        # 8 rss items of the 3 rss feeds from 3 renders:
+        self.assertEqual((fragments.renders, fragments.reuses), (6, 5))
+        self.assertEqual(
+            sorted(template for filename, digest, template
+                   in fragments.fragments),
+            ['atom_entry.mako'] * 3 + ['rss_item.mako'] * 3)
+        self.assertEqual(
+            [feeds['blog/category/things/feed/index.xml'].count(
+                '<title>Post {0}</title>'.format(n)) for n in range(3)],
+            [0, 1, 1])
+        self.assertEqual(
+            feeds['blog/feed/index.xml'].count('<item>'), 3)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog manifest module.
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestUpdate(unittest.TestCase):
+    """Unit tests for update function."""
+    def _get_fut(self):
+        from blogofile_blog.manifest import update
+        return update
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def setUp(self):
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.site_dir = os.path.join(temp_dir, '_site')
+        self.cache_dir = os.path.join(temp_dir, '_cache')
+
+    def _write(self, files):
+        """Write `files` to an emptied site directory, like a build.
+        """
+        if os.path.isdir(self.site_dir):
+            shutil.rmtree(self.site_dir)
+        for path, contents in files.items():
+            path = os.path.join(self.site_dir, path)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(contents)
+
+    def _build(self, files):
+        self._write(files)
+        return self._call_fut(
+            self.site_dir, self.cache_dir, 'http://example.com/')
+
+    def test_update_changes(self):
+        """update lists the URLs of added, changed and removed files
+        """
+        changes = self._build({'index.html': 'a', 'css/site.css': 'b'})
+        self.assertEqual(changes, {
+            'added': ['http://example.com/css/site.css',
+                      'http://example.com/',
+                      'http://example.com/index.html'],
+            'changed': [], 'removed': []})
+        changes = self._build({'index.html': 'A', 'new.txt': 'c'})
+        self.assertEqual(changes, {
+            'added': ['http://example.com/new.txt'],
+            'changed': ['http://example.com/',
+                        'http://example.com/index.html'],
+            'removed': ['http://example.com/css/site.css']})
+
+    def test_update_restores_mtime_of_unchanged_files(self):
+        """files rewritten with the same contents keep their old mtime
+        """
+        self._build({'same.html': 'a', 'changed.html': 'b'})
+        built = os.path.getmtime(os.path.join(self.site_dir, 'same.html'))
+        self._write({'same.html': 'a', 'changed.html': 'B'})
+        for name in ('same.html', 'changed.html'):
+            os.utime(os.path.join(self.site_dir, name),
+                     (built + 100, built + 100))
+        self._call_fut(self.site_dir, self.cache_dir, 'http://example.com')
+        self.assertEqual(
+            os.path.getmtime(os.path.join(self.site_dir, 'same.html')), built)
+        self.assertEqual(
+            os.path.getmtime(os.path.join(self.site_dir, 'changed.html')),
+            built + 100)
+
+    @unittest.skipUnless(hasattr(os, 'link'), 'needs hard links')
+    def test_update_hard_links_duplicates(self):
+        """files with the same contents are hard linked together
+        """
+        self._build({'x/index.html': 'page', 'x/1/index.html': 'page',
+                     'y/index.html': 'other'})
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.site_dir, 'x/index.html'),
+            os.path.join(self.site_dir, 'x/1/index.html')))
+        self.assertFalse(os.path.samefile(
+            os.path.join(self.site_dir, 'x/index.html'),
+            os.path.join(self.site_dir, 'y/index.html')))
+
+    @unittest.skipUnless(hasattr(os, 'link'), 'needs hard links')
+    def test_unlink_duplicates(self):
+        """unlink_duplicates gives each hard linked file its own copy
+        """
+        from blogofile_blog.manifest import unlink_duplicates
+        self._build({'x/index.html': 'page', 'x/1/index.html': 'page'})
+        self.assertEqual(unlink_duplicates(self.site_dir), 1)
+        first = os.path.join(self.site_dir, 'x/1/index.html')
+        with open(first, 'a') as f:
+            f.write(' 1')
+        with open(os.path.join(self.site_dir, 'x/index.html')) as f:
+            self.assertEqual(f.read(), 'page')
+        self.assertEqual(unlink_duplicates(self.site_dir), 0)
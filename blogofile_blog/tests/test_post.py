@@ -2,6 +2,10 @@
 """Unit tests for blogofile blog post module.
 """
 from datetime import datetime
+import logging
+import os
+import shutil
+from tempfile import mkdtemp
 try:
     import unittest2 as unittest        # For Python 2.6
 except ImportError:
@@ -77,6 +81,112 @@ class TestCreatePermalink(unittest.TestCase):
             'http://www.example.com/123456789-aaaa-12345/fuzz/'
             '001-post-one-markdown')
 
+    def test_create_permalink_all_placeholders(self):
+        """create_permalink fills in every placeholder, leaving the rest
+        """
+        kwargs = {
+            'site_url': 'http://www.example.com/',
+            'blog_path': '/blog',
+            'title': 'Test Title',
+            'date': datetime(2012, 12, 1, 8, 6, 42),
+            'uuid': '123456789-aaaa-12345',
+            'filename': '001-post-one.markdown',
+            }
+        permalink = self._call_fut(
+            ':blog_path/:year-:month-:day/:hour::minute::second/{:title}'
+            '/:filename.:uuid', **kwargs)
+        self.assertEqual(
+            permalink,
+            'http://www.example.com/blog/2012-12-01/08:06:42/{test-title}'
+            '/001-post-one-markdown.123456789-aaaa-12345')
+
+    def test_create_permalink_placeholders_before_underscores(self):
+        """create_permalink fills in placeholders followed by underscores
+        """
+        kwargs = {
+            'site_url': 'http://www.example.com',
+            'blog_path': '/blog',
+            'title': 'Test Title',
+            'date': datetime(2012, 12, 1),
+            'uuid': '123456789-aaaa-12345',
+            'filename': '001-post-one.markdown',
+            }
+        self.assertEqual(
+            self._call_fut(':blog_path/:year_:month_:day', **kwargs),
+            'http://www.example.com/blog/2012_12_01')
+        self.assertEqual(
+            self._call_fut(':blog_path/:title_:uuid', **kwargs),
+            'http://www.example.com/blog/test-title_123456789-aaaa-12345')
+
+    def test_create_permalink_unknown_placeholder(self):
+        """create_permalink rejects a placeholder it doesn't know
+        """
+        with self.assertRaises(ValueError) as cm:
+            self._call_fut(
+                ':blog_path/:yaer/:title', 'http://www.example.com', '/blog',
+                'Test Title', datetime(2012, 12, 1), 'uuid', 'post.markdown')
+        self.assertIn(':yaer', str(cm.exception))
+
+
+class TestCreatePostFilename(unittest.TestCase):
+    """Unit tests for create_post_filename function."""
+    def _get_fut(self):
+        from blog.post import create_post_filename
+        return create_post_filename
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_create_post_filename(self):
+        """create_post_filename fills in the date, title and markup
+        """
+        filename = self._call_fut(
+            ':year-:month-:day - :title.:markup', 'Test Title',
+            datetime(2012, 12, 1), 'rst')
+        self.assertEqual(filename, '2012-12-01 - test-title.rst')
+
+    def test_create_post_filename_placeholders_before_underscores(self):
+        """create_post_filename fills in placeholders followed by underscores
+        """
+        filename = self._call_fut(
+            ':year_:month_:day_:title.:markup', 'Test Title',
+            datetime(2012, 12, 1), 'rst')
+        self.assertEqual(filename, '2012_12_01_test-title.rst')
+
+    def test_create_post_filename_unknown_placeholder(self):
+        """create_post_filename rejects permalink-only placeholders
+        """
+        self.assertRaises(
+            ValueError, self._call_fut, ':uuid.markdown', 'Test Title',
+            datetime(2012, 12, 1))
+
+
+class TestSitePath(unittest.TestCase):
+    """Unit tests for site_path function."""
+    def _get_fut(self):
+        from blog.post import site_path
+        return site_path
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_site_path_strips_site_url(self):
+        """site_path strips the site URL, whatever its case
+        """
+        self.assertEqual(
+            self._call_fut('http://Example.com/~me/blog/2012/post',
+                           'http://example.com/~me'),
+            '/blog/2012/post')
+
+    def test_site_path_is_literal(self):
+        """site_path doesn't treat the site URL as a regular expression
+        """
+        self.assertEqual(
+            self._call_fut('http://exampleXcom/blog/post',
+                           'http://example.com'),
+            'http://exampleXcom/blog/post')
+
+
 
 class TestCreatePostTemplate(unittest.TestCase):
     """Unit tests for create_post_template function."""
@@ -213,3 +323,388 @@ class TestPost(unittest.TestCase):
         expected = pytz.timezone(blog_config.timezone).localize(
             datetime(2012, 11, 11, 20, 58, 42))
         self.assertEqual(post.updated, expected)
+
+
+    def test_content_rendered_on_first_use(self):
+        """post body is run through its filters only once content is used
+        """
+        from blog import post as post_module
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            '---\n'
+            'Body\n'
+            )
+        with patch.object(post_module, 'run_filter_chain') as mock_run:
+            mock_run.return_value = '<p>Body</p>'
+            post = self._make_one(post_content)
+            self.assertFalse(post.rendered)
+            self.assertFalse(mock_run.called)
+            self.assertEqual(post.content, '<p>Body</p>')
+            self.assertEqual(post.content, '<p>Body</p>')
+        self.assertTrue(post.rendered)
+        self.assertEqual(mock_run.call_count, 1)
+
+    def test_extra_fields_kept_in_extras(self):
+        """YAML fields that aren't reserved are attributes kept in extras
+        """
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            'mood: happy\n'
+            '---\n'
+            'Body\n'
+            )
+        post = self._make_one(post_content)
+        post.score = 5
+        self.assertEqual(post.mood, 'happy')
+        self.assertEqual(post.extras, {'mood': 'happy', 'score': 5})
+        self.assertFalse(hasattr(post, '__dict__'))
+        self.assertFalse(hasattr(post, 'source'))
+        self.assertRaises(AttributeError, getattr, post, 'nonexistent')
+
+    def test_fields_named_like_methods_kept_in_extras(self):
+        """YAML fields named like Post methods or properties don't replace
+        them
+        """
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            'rendered: x\n'
+            'render: y\n'
+            'permapath: z\n'
+            'excerpt: Short.\n'
+            '---\n'
+            'Body\n'
+            )
+        post = self._make_one(post_content)
+        self.assertEqual(post.extras,
+                         {'rendered': 'x', 'render': 'y', 'permapath': 'z'})
+        self.assertFalse(post.rendered)
+        self.assertEqual(post.permapath(), post.path)
+        self.assertEqual(post.excerpt, 'Short.')
+
+    def test_permalink_path_follows_permalink(self):
+        """permalink_path is the permalink below the site URL
+        """
+        from blogofile.cache import bf
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            'permalink: {0}/blog/test-post\n'
+            '---\n'
+            'Body\n'
+            ).format(bf.config.site.url)
+        post = self._make_one(post_content)
+        self.assertEqual(post.permalink_path, '/blog/test-post')
+        post.permalink = bf.config.site.url + '/moved'
+        self.assertEqual(post.permalink_path, '/moved')
+
+    def test_pickled_posts_share_categories(self):
+        """unpickled posts share the Category objects of other posts
+        """
+        from six.moves import cPickle as pickle
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            'categories: Stuff\n'
+            'mood: happy\n'
+            '---\n'
+            'Body\n'
+            )
+        post = self._make_one(post_content)
+        other = self._make_one(post_content.replace('Test', 'Other'))
+        copy = pickle.loads(pickle.dumps(post, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.__getstate__(), post.__getstate__())
+        self.assertIs(list(copy.categories)[0], list(other.categories)[0])
+
+    def test_content_kept_in_content_store(self):
+        """rendered content goes to the content store, and not into pickles
+        """
+        from six.moves import cPickle as pickle
+        from blog import post as post_module
+        from blogofile_blog.contentstore import ContentStore
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.addCleanup(setattr, post_module, '_content_store', None)
+        store = post_module._content_store = ContentStore(temp_dir)
+        self.addCleanup(store.close)
+        post_content = (
+            '---\n'
+            'title: Test Post\n'
+            'date: 2012/11/11 19:33:42\n'
+            '---\n'
+            'Body\n'
+            )
+        with patch.object(post_module, 'run_filter_chain') as mock_run:
+            mock_run.return_value = '<p>Body</p>'
+            post = self._make_one(post_content)
+            self.assertEqual(post.content, '<p>Body</p>')
+        self.assertEqual(store.size, len('<p>Body</p>'))
+        self.assertEqual(post.content, '<p>Body</p>')
+        copy = pickle.loads(pickle.dumps(post, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.__getstate__()['_Post__content'], '<p>Body</p>')
+
+
+class TestCompileBlockChain(unittest.TestCase):
+    """Unit tests for compile_block_chain function."""
+    def _get_fut(self):
+        from blog.post import compile_block_chain
+        return compile_block_chain
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_compiled_once(self):
+        """compile_block_chain resolves each chain once, with run_block
+        """
+        from blogofile.cache import bf
+        compiled = self._call_fut('syntax_highlight, markdown')
+        self.assertIs(self._call_fut('syntax_highlight, markdown'),
+                      compiled)
+        self.assertEqual([name for name, run_block, chain in compiled],
+                         ['syntax_highlight', 'markdown'])
+        self.assertIs(compiled[0][1],
+                      bf.filter.get_filter('syntax_highlight').run_block)
+        self.assertIsNone(compiled[1][1])
+        self.assertEqual(compiled[1][2][0][1],
+                         bf.filter.get_filter('markdown').run)
+
+
+class TestLoadFrontMatter(unittest.TestCase):
+    """Unit tests for load_front_matter function."""
+    def _get_fut(self):
+        from blog.post import load_front_matter
+        return load_front_matter
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_same_as_yaml_load(self):
+        """load_front_matter loads headers as yaml.load did
+        """
+        import yaml
+        headers = [
+            'title: Test Post\ndate: 2012/11/12 10:51:42\n'
+            'categories: Stuff, More Stuff\ntags: a, b\ndraft: true\n',
+            'title: "Quoted: with a colon"\nupdated: 2012-11-12 10:51:42\n'
+            'guid: 42\nratio: 1.5\nempty:\n',
+            six.u('title: Caf\xe9 \u2603\nauthor: Ren\xe9e\n'),
+            'title: Lists\nfilters: [markdown, syntax_highlight]\n'
+            'nested:\n  a: 1\n  b: [x, y]\n',
+            'title: >\n  Folded\n  title\ndraft: no\npublished: 2012-11-12\n',
+            ]
+        for header in headers:
+            self.assertEqual(self._call_fut(header),
+                             yaml.load(header, Loader=yaml.Loader))
+
+    def test_python_tags_rejected(self):
+        """load_front_matter doesn't construct python objects
+        """
+        import yaml
+        with self.assertRaises(yaml.YAMLError):
+            self._call_fut('title: !!python/object/apply:os.getcwd []\n')
+
+
+class TestParseDate(unittest.TestCase):
+    """Unit tests for parse_date function."""
+    def _get_fut(self):
+        from blog.post import parse_date
+        return parse_date
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def _result(self, func, *args):
+        try:
+            return func(*args)
+        except (TypeError, ValueError) as e:
+            return type(e)
+
+    def test_same_as_strptime(self):
+        """parse_date gives what strptime gives, errors included
+        """
+        values = [
+            '2012/11/12 10:51:42', '1999/01/01 00:00:00',
+            '2012/02/29 23:59:59', '2012/1/2 3:04:05', '2012/11/12 10:51',
+            '2012/13/12 10:51:42', '2013/02/29 10:51:42',
+            '2012/11/12 24:00:00', '2012/11/12 10:51:42\n',
+            ' 2012/11/12 10:51:42', '2012/11/12  10:51:42', '',
+            six.u('2012/11/12 10:51:42'), 20121112,
+            datetime(2012, 11, 12, 10, 51, 42), None,
+            ]
+        for date_format in ('%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M'):
+            for value in values:
+                self.assertEqual(
+                    self._result(self._call_fut, value, date_format),
+                    self._result(datetime.strptime, value, date_format),
+                    (value, date_format))
+
+
+class TestParsePosts(unittest.TestCase):
+    """Unit tests for parse_posts function."""
+    def _get_fut(self):
+        from blog.post import parse_posts
+        return parse_posts
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def _make_posts_dir(self):
+        posts_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, posts_dir)
+        for n in range(12):
+            with open(os.path.join(posts_dir, '{0:03} - post.markdown'
+                                   .format(n)), 'w') as f:
+                f.write(
+                    '---\n'
+                    'title: Post {0}\n'
+                    'date: 2012/11/{1:02} 19:33:42\n'
+                    'categories: Category {2}, Stuff\n'
+                    'draft: {3}\n'
+                    '---\n'
+                    'Some *markdown* for post {0}.\n'
+                    .format(n, n + 1, n % 3, n == 4))
+        with open(os.path.join(posts_dir, '100 - bad.markdown'), 'w') as f:
+            f.write('---\ntitle: [unclosed\n---\nBad YAML\n')
+        return posts_dir
+
+    def _parse_and_log(self, posts_dir):
+        from blog import post
+        records = []
+        handler = logging.Handler()
+        handler.emit = lambda record: records.append(
+            (record.name, record.levelname, record.getMessage()))
+        level = post.logger.level
+        post.logger.addHandler(handler)
+        post.logger.setLevel(logging.DEBUG)
+        try:
+            posts = self._call_fut(posts_dir)
+        finally:
+            post.logger.removeHandler(handler)
+            post.logger.setLevel(level)
+        return posts, records
+
+    def test_parse_workers_same_as_serial(self):
+        """parse_posts w/ parse_workers gives the same posts and log records
+        """
+        from blog.post import config
+        posts_dir = self._make_posts_dir()
+        self.addCleanup(
+            setattr, config, 'parse_workers', config.parse_workers)
+        config.parse_workers = None
+        serial_posts, serial_records = self._parse_and_log(posts_dir)
+        config.parse_workers = 3
+        pool_posts, pool_records = self._parse_and_log(posts_dir)
+        self.assertEqual(len(serial_posts), 12)
+        # Workers render the published posts they parse; serially
+        # they're lazy:
+        for post in serial_posts:
+            if not post.draft:
+                post.render()
+        self.assertEqual(
+            [p.__getstate__() for p in pool_posts],
+            [p.__getstate__() for p in serial_posts])
+        self.assertEqual(pool_records, serial_records)
+
+    def test_parse_workers_dont_render_drafts(self):
+        """parse_posts w/ parse_workers leaves drafts unrendered
+        """
+        from blog.post import config
+        posts_dir = self._make_posts_dir()
+        self.addCleanup(
+            setattr, config, 'parse_workers', config.parse_workers)
+        config.parse_workers = 3
+        posts = self._call_fut(posts_dir)
+        drafts = [post for post in posts if post.draft]
+        self.assertEqual([post.title for post in drafts], ['Post 4'])
+        self.assertFalse(drafts[0].rendered)
+        self.assertTrue(all(post.rendered for post in posts
+                            if not post.draft))
+
+    def test_keep_parsed_reuses_unchanged_posts(self):
+        """parse_posts w/ keep_parsed only parses changed post files again
+        """
+        from blog import post as post_module
+        from blog.post import config
+        posts_dir = self._make_posts_dir()
+        self.addCleanup(setattr, config, 'keep_parsed', config.keep_parsed)
+        config.keep_parsed = True
+        posts = self._call_fut(posts_dir)
+        changed_path = os.path.join(posts_dir, '003 - post.markdown')
+        with open(changed_path, 'a') as f:
+            f.write('More *markdown*.\n')
+        os.remove(os.path.join(posts_dir, '005 - post.markdown'))
+        with patch('blog.post._parse_post',
+                   wraps=post_module._parse_post) as parse_post:
+            new_posts = self._call_fut(posts_dir)
+        self.assertEqual(
+            sorted(args[0] for args, kwargs in parse_post.call_args_list),
+            ['003 - post.markdown', '100 - bad.markdown'])
+        self.assertEqual(len(new_posts), len(posts) - 1)
+        by_title = dict((p.title, p) for p in posts)
+        for post in new_posts:
+            if post.title == 'Post 3':
+                self.assertIn('More', post.content)
+            else:
+                # A copy, for post_process to change
+                self.assertIsNot(post, by_title[post.title])
+                self.assertEqual(post.__getstate__(),
+                                 by_title[post.title].__getstate__())
+
+    def _change_posts(self, posts):
+        # What a blog.post.post_process that isn't idempotent might do
+        for post in posts:
+            post.title = '[x] ' + post.title
+            post.categories.clear()
+            if not post.draft:
+                post.render()
+
+    def test_keep_parsed_keeps_posts_as_parsed(self):
+        """parse_posts w/ keep_parsed gives the posts as they were parsed
+        """
+        from blog.post import config
+        posts_dir = self._make_posts_dir()
+        self.addCleanup(setattr, config, 'keep_parsed', config.keep_parsed)
+        config.keep_parsed = True
+        self._change_posts(self._call_fut(posts_dir))
+        posts = self._call_fut(posts_dir)
+        self.assertEqual(sorted(post.title for post in posts),
+                         sorted('Post {0}'.format(n) for n in range(12)))
+        self.assertTrue(all(post.categories for post in posts))
+        # With the content rendered in the last build
+        self.assertTrue(all(post.rendered for post in posts
+                            if not post.draft))
+
+    def test_cache_keeps_posts_as_parsed(self):
+        """parse_posts w/ the post cache caches posts as they were parsed
+        """
+        from blog import post as post_module
+        from blog.post import config
+        posts_dir = self._make_posts_dir()
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.addCleanup(setattr, config.cache, 'enabled',
+                        config.cache.enabled)
+        self.addCleanup(setattr, config.cache, 'directory',
+                        config.cache.directory)
+        config.cache.enabled = True
+        config.cache.directory = cache_dir
+        posts = self._call_fut(posts_dir)
+        contents = dict((post.title, post.content) for post in posts
+                        if not post.draft)
+        self._change_posts(posts)
+        post_module.save_rendered_posts()
+        posts = self._call_fut(posts_dir)
+        self.assertEqual(post_module._post_cache.hits, 11)
+        self.assertEqual(sorted(post.title for post in posts),
+                         sorted('Post {0}'.format(n) for n in range(12)))
+        self.assertTrue(all(post.categories for post in posts))
+        self.assertEqual(dict((post.title, post.content) for post in posts
+                              if post.rendered),
+                         contents)
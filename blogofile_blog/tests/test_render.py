@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile blog render module.
+"""
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+from mako.lookup import TemplateLookup
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Unit tests for FragmentCache class."""
+    def _get_target_class(self):
+        from blog.render import FragmentCache
+        return FragmentCache
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def test_render_once_per_post_and_template(self):
+        """render renders each post once per template and reuses the result
+        """
+        from blog.post import Post
+        lookup = TemplateLookup()
+        lookup.put_string('post.mako', '<h2>${post.title}</h2>')
+        lookup.put_string('title.mako', '${post.title}')
+        cache = self._make_one(lookup)
+        posts = [Post('---\ntitle: Post {0}\n---\nPost.\n'.format(n))
+                 for n in range(2)]
+        for n in range(3):
+            self.assertEqual(
+                [cache.render(post) for post in posts],
+                ['<h2>Post 0</h2>', '<h2>Post 1</h2>'])
+        self.assertEqual(cache.render(posts[0], 'title.mako'), 'Post 0')
+        self.assertEqual((cache.renders, cache.reuses), (3, 4))
+
+    def test_render_excerpt(self):
+        """render caches post_excerpt.mako, which inherits post.mako
+        """
+        from blog.post import Post
+        lookup = TemplateLookup()
+        lookup.put_string(
+            'post.mako',
+            '<h2>${post.title}</h2>${self.post_prose(post)}'
+            '<%def name="post_prose(post)">${post.content}</%def>')
+        lookup.put_string(
+            'post_excerpt.mako',
+            '<%inherit file="post.mako" />'
+            '<%def name="post_prose(post)">${post.excerpt}</%def>')
+        cache = self._make_one(lookup)
+        post = Post('---\ntitle: Post\nexcerpt: Short.\n---\nLonger.\n')
+        for n in range(3):
+            self.assertEqual(cache.render(post, 'post_excerpt.mako'),
+                             '<h2>Post</h2>Short.')
+        self.assertEqual((cache.renders, cache.reuses), (1, 2))
+
+    def _posts(self, count):
+        from blog.post import Post
+        return [Post('---\ntitle: Post {0}\n---\nPost.\n'.format(n),
+                     filename='{0}.markdown'.format(n))
+                for n in range(count)]
+
+    def test_max_bytes(self):
+        """render keeps at most max_bytes of HTML, least recently used out
+        """
+        lookup = TemplateLookup()
+        lookup.put_string('post.mako', '<h2>${post.title}</h2>')
+        # Room for two fragments of 15 bytes:
+        cache = self._make_one(lookup, max_bytes=30)
+        posts = self._posts(3)
+        for post in posts:
+            cache.render(post)
+        self.assertEqual((cache.size, cache.evictions), (30, 1))
+        cache.render(posts[2])
+        cache.render(posts[1])
+        self.assertEqual((cache.renders, cache.reuses), (3, 2))
+        cache.render(posts[0])
+        self.assertEqual((cache.renders, cache.evictions), (4, 2))
+        self.assertEqual(cache.render(posts[1]), '<h2>Post 1</h2>')
+        self.assertEqual(cache.reuses, 3)
+
+    def test_stable_key(self):
+        """a post parsed again from the same source reuses the fragment
+        """
+        lookup = TemplateLookup()
+        lookup.put_string('post.mako', '<h2>${post.title}</h2>')
+        cache = self._make_one(lookup)
+        cache.render(self._posts(1)[0])
+        cache.render(self._posts(1)[0])
+        self.assertEqual((cache.renders, cache.reuses), (1, 1))
+
+    def test_content_store(self):
+        """with a store, fragments are kept in it rather than in memory
+        """
+        from blogofile_blog.contentstore import ContentStore, StoredText
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        store = ContentStore(temp_dir)
+        self.addCleanup(store.close)
+        lookup = TemplateLookup()
+        lookup.put_string('post.mako', '<h2>${post.title}</h2>')
+        cache = self._make_one(lookup, max_bytes=0, store=store.add)
+        posts = self._posts(2)
+        for n in range(2):
+            self.assertEqual([cache.render(post) for post in posts],
+                             ['<h2>Post 0</h2>', '<h2>Post 1</h2>'])
+        self.assertEqual((cache.renders, cache.reuses), (2, 2))
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(store.size, 30)
+        self.assertTrue(all(isinstance(fragment, StoredText)
+                            for fragment in cache.fragments.values()))
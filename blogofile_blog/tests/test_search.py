@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog search module.
+"""
+import io
+import json
+import os
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestTokenize(unittest.TestCase):
+    """Unit tests for tokenize function."""
+    def _call_fut(self, *args, **kwargs):
+        from blogofile_blog.search import tokenize
+        return tokenize(*args, **kwargs)
+
+    def test_words(self):
+        """terms are runs of letters and digits, in lower case
+        """
+        self.assertEqual(self._call_fut(u"Blogofile 0.8: Mako-templates!"),
+                         [u"blogofile", u"mako", u"templates"])
+
+    def test_stop_words_and_short_terms(self):
+        """stop words and one character terms are left out
+        """
+        self.assertEqual(self._call_fut(u"The art of a blog in 2 days"),
+                         [u"art", u"blog", u"days"])
+
+    def test_unicode(self):
+        """letters outside ASCII are part of terms
+        """
+        self.assertEqual(self._call_fut(u"Café über_alles"),
+                         [u"café", u"über", u"alles"])
+
+
+class TestShardName(unittest.TestCase):
+    """Unit tests for shard_name function."""
+    def _call_fut(self, *args, **kwargs):
+        from blogofile_blog.search import shard_name
+        return shard_name(*args, **kwargs)
+
+    def test_prefix(self):
+        """shard name is the hex code points of the term's prefix
+        """
+        self.assertEqual(self._call_fut(u"mako", 2), "6d-61")
+        self.assertEqual(self._call_fut(u"éa", 1), "e9")
+
+    def test_short_term(self):
+        """a term shorter than the prefix is all of its name
+        """
+        self.assertEqual(self._call_fut(u"py", 3), "70-79")
+
+
+class TestDeltaEncode(unittest.TestCase):
+    """Unit tests for delta_encode function."""
+    def _call_fut(self, *args, **kwargs):
+        from blogofile_blog.search import delta_encode
+        return delta_encode(*args, **kwargs)
+
+    def test_delta_encode(self):
+        self.assertEqual(self._call_fut([0, 3, 4, 10]), [0, 3, 1, 6])
+        self.assertEqual(self._call_fut([]), [])
+
+
+class TestSearchIndexBuilder(unittest.TestCase):
+    """Unit tests for SearchIndexBuilder class."""
+    def _get_target_class(self):
+        from blogofile_blog.search import SearchIndexBuilder
+        return SearchIndexBuilder
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.output_dir = os.path.join(self.tmp_dir, "search")
+
+    def _read(self, name):
+        with io.open(os.path.join(self.output_dir, name),
+                     encoding="utf-8") as f:
+            return json.load(f)
+
+    def _build(self, posts):
+        builder = self._make_one(self.cache_dir, prefix_length=1)
+        for key, text in posts:
+            builder.add(key, ["/" + key + "/", key, "2012-11-11"],
+                        lambda text=text: text)
+        builder.write(self.output_dir)
+        return builder
+
+    def test_write(self):
+        """index.json has the posts table, shards the delta encoded ids
+        """
+        builder = self._build([("one", u"Mako templates"),
+                               ("two", u"Markdown"),
+                               ("three", u"mako and markdown")])
+        self.assertEqual(builder.reindexed, 3)
+        index = self._read("index.json")
+        self.assertEqual(index["prefix_length"], 1)
+        self.assertEqual(index["fields"], ["path", "title", "date"])
+        self.assertEqual(index["posts"][1], ["/two/", "two", "2012-11-11"])
+        self.assertEqual(index["shards"], ["6d", "74"])
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ["6d.json", "74.json", "index.json"])
+        self.assertEqual(self._read("6d.json"),
+                         {"mako": [0, 2], "markdown": [1, 1]})
+        self.assertEqual(self._read("74.json"), {"templates": [0]})
+
+    def test_cached_terms(self):
+        """terms cached under a post's key aren't tokenized again
+        """
+        self._build([("one", u"Mako templates"), ("two", u"Markdown")])
+
+        def fail():
+            raise AssertionError("cached post tokenized again")
+        builder = self._make_one(self.cache_dir, prefix_length=1)
+        builder.add("one", ["/one/", "one", "2012-11-11"], fail)
+        builder.add("three", ["/three/", "three", "2012-11-11"],
+                    lambda: u"Python")
+        builder.write(self.output_dir)
+        self.assertEqual(builder.reindexed, 1)
+        self.assertEqual(self._read("74.json"), {"templates": [0]})
+
+    def test_stale_shards_removed(self):
+        """shards no term is in any more are removed
+        """
+        self._build([("one", u"Mako templates")])
+        self._build([("one-changed", u"Mako")])
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ["6d.json", "index.json"])
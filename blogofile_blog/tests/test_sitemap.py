@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog sitemap module.
+"""
+import os
+import re
+import shutil
+from datetime import datetime
+from tempfile import mkdtemp
+import pytz
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestSitemapWriter(unittest.TestCase):
+    """Unit tests for SitemapWriter class."""
+    def _get_target_class(self):
+        from blogofile_blog.sitemap import SitemapWriter
+        return SitemapWriter
+
+    def _make_one(self, *args, **kwargs):
+        return self._get_target_class()(*args, **kwargs)
+
+    def setUp(self):
+        self.site_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.site_dir)
+
+    def _read(self, name):
+        with open(os.path.join(self.site_dir, name), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def _locs(self, name):
+        return re.findall('<loc>(.*?)</loc>', self._read(name))
+
+    def test_one_file(self):
+        """URLs of pages are listed in one sitemap, with their lastmod
+        """
+        writer = self._make_one(self.site_dir, 'http://example.com/')
+        updated = pytz.timezone('US/Eastern').localize(
+            datetime(2012, 11, 11, 19, 33, 42))
+        writer.add('/blog/2012/11/11/post/index.html', updated)
+        writer.add('/blog/category/a&b/1/index.html')
+        writer.add('/blog/archive/2012/index.html', datetime(2012, 12, 1))
+        self.assertEqual(writer.close(), ['sitemap.xml'])
+        sitemap = self._read('sitemap.xml')
+        self.assertTrue(sitemap.startswith('<?xml'))
+        self.assertIn('<urlset', sitemap)
+        self.assertEqual(self._locs('sitemap.xml'), [
+            'http://example.com/blog/2012/11/11/post/',
+            'http://example.com/blog/category/a%26b/1/',
+            'http://example.com/blog/archive/2012/'])
+        self.assertIn('<lastmod>2012-11-11T19:33:42-05:00</lastmod>',
+                      sitemap)
+        self.assertIn('<lastmod>2012-12-01</lastmod>', sitemap)
+        self.assertEqual(os.listdir(self.site_dir), ['sitemap.xml'])
+
+    def test_split_at_max_urls(self):
+        """past max_urls the sitemap is an index of several files
+        """
+        writer = self._make_one(self.site_dir, 'http://example.com',
+                                max_urls=2)
+        for n in range(5):
+            writer.add('blog/{0}/index.html'.format(n))
+        self.assertEqual(
+            writer.close(),
+            ['sitemap.xml', 'sitemap-1.xml', 'sitemap-2.xml',
+             'sitemap-3.xml'])
+        self.assertIn('<sitemapindex', self._read('sitemap.xml'))
+        self.assertEqual(self._locs('sitemap.xml'), [
+            'http://example.com/sitemap-1.xml',
+            'http://example.com/sitemap-2.xml',
+            'http://example.com/sitemap-3.xml'])
+        self.assertEqual(self._locs('sitemap-3.xml'),
+                         ['http://example.com/blog/4/'])
+
+    def test_split_at_max_bytes(self):
+        """no file of the sitemap is bigger than max_bytes
+        """
+        writer = self._make_one(self.site_dir, 'http://example.com',
+                                max_bytes=400)
+        for n in range(10):
+            writer.add('blog/{0}/index.html'.format(n))
+        names = writer.close()
+        self.assertTrue(len(names) > 2)
+        for name in names:
+            self.assertTrue(
+                os.path.getsize(os.path.join(self.site_dir, name)) <= 400)
+        self.assertEqual(sum(len(self._locs(name)) for name in names[1:]), 10)
+
+    def test_old_parts_removed(self):
+        """files of a bigger sitemap written before are removed
+        """
+        writer = self._make_one(self.site_dir, 'http://example.com',
+                                max_urls=1)
+        for n in range(3):
+            writer.add('blog/{0}/index.html'.format(n))
+        writer.close()
+        writer = self._make_one(self.site_dir, 'http://example.com',
+                                max_urls=1)
+        writer.add('blog/0/index.html')
+        writer.close()
+        self.assertEqual(os.listdir(self.site_dir), ['sitemap.xml'])
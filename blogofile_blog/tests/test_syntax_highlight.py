@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the syntax_highlight filter.
+"""
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+from mock import patch
+
+
+def _get_filter():
+    from blogofile.cache import bf
+    return bf.filter.get_filter('syntax_highlight')
+
+
+class TestCachedHighlightCode(unittest.TestCase):
+    """Unit tests for cached_highlight_code function."""
+    def _call_fut(self, *args, **kwargs):
+        return _get_filter().cached_highlight_code(*args, **kwargs)
+
+    def setUp(self):
+        from blogofile_blog.diskcache import DiskCache
+        syntax_highlight = _get_filter()
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.addCleanup(setattr, syntax_highlight, 'highlight_cache',
+                        syntax_highlight.highlight_cache)
+        syntax_highlight.highlight_cache = DiskCache(cache_dir)
+
+    def _highlight(self, linenos=False, cssclass='pygments_murphy',
+                   style='murphy', code='import this\n'):
+        syntax_highlight = _get_filter()
+        formatter = syntax_highlight.get_formatter(linenos, cssclass, style)
+        return self._call_fut(code, 'python', formatter, style)
+
+    def test_cached(self):
+        """cached_highlight_code only highlights the same block once
+        """
+        syntax_highlight = _get_filter()
+        with patch.object(syntax_highlight, 'highlight_code',
+                          wraps=syntax_highlight.highlight_code) as highlight:
+            first = self._highlight()
+            self.assertEqual(self._highlight(), first)
+        self.assertEqual(highlight.call_count, 1)
+        self.assertIn('import', first)
+
+    def test_options_miss(self):
+        """cached_highlight_code highlights again when an option changes
+        """
+        syntax_highlight = _get_filter()
+        with patch.object(syntax_highlight, 'highlight_code',
+                          wraps=syntax_highlight.highlight_code) as highlight:
+            blocks = [
+                self._highlight(),
+                self._highlight(style='native'),
+                self._highlight(linenos=True),
+                self._highlight(cssclass='code'),
+                self._highlight(code='import that\n'),
+                ]
+        self.assertEqual(highlight.call_count, 5)
+        self.assertNotEqual(blocks[2], blocks[0])
+        self.assertNotEqual(blocks[3], blocks[0])
+
+
+class TestGetLexer(unittest.TestCase):
+    """Unit tests for get_lexer function."""
+    def _call_fut(self, *args, **kwargs):
+        return _get_filter().get_lexer(*args, **kwargs)
+
+    def test_reused(self):
+        """get_lexer makes one lexer per language
+        """
+        lexer = self._call_fut('python')
+        self.assertIs(self._call_fut('python'), lexer)
+        self.assertIsNot(self._call_fut('ruby'), lexer)
+
+    def test_unknown_language(self):
+        """get_lexer falls back to the text lexer
+        """
+        self.assertIs(self._call_fut('no-such-language'),
+                      self._call_fut('text'))
+
+
+class TestGetFormatter(unittest.TestCase):
+    """Unit tests for get_formatter function."""
+    def _call_fut(self, *args, **kwargs):
+        return _get_filter().get_formatter(*args, **kwargs)
+
+    def test_reused(self):
+        """get_formatter makes one formatter per set of options
+        """
+        formatter = self._call_fut(False, 'pygments_murphy', 'murphy')
+        self.assertIs(self._call_fut(False, 'pygments_murphy', 'murphy'),
+                      formatter)
+        for options in ((True, 'pygments_murphy', 'murphy'),
+                        (False, 'code', 'murphy'),
+                        (False, 'pygments_murphy', 'native')):
+            self.assertIsNot(self._call_fut(*options), formatter)
+
+
+class TestPostAssets(unittest.TestCase):
+    """Unit tests for the stylesheets recorded in post assets."""
+    def _make_post(self, style):
+        from blog.post import Post
+        return Post(
+            '---\n'
+            'title: Code\n'
+            'filters: syntax_highlight\n'
+            '---\n'
+            '$$code(lang=python, style={0})\n'
+            'import this\n'
+            '$$/code\n'.format(style))
+
+    def test_recorded_and_written_with_rendered_posts(self):
+        """run records a post's stylesheet, which is written once rendered
+        """
+        from blog.post import write_rendered_post_assets
+        syntax_highlight = _get_filter()
+        rendered = self._make_post('native')
+        unrendered = self._make_post('monokai')
+        with patch.object(syntax_highlight, 'write_pygments_css') as write:
+            self.assertIn('import', rendered.content)
+            self.assertEqual(rendered.assets,
+                             set([('syntax_highlight', 'native')]))
+            self.assertFalse(write.called)
+            write_rendered_post_assets([rendered, unrendered])
+        self.assertEqual([args[0] for args, kwargs in write.call_args_list],
+                         ['native'])
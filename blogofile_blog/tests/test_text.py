@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog text module.
+"""
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+import six
+
+
+class TestHtmlExcerpt(unittest.TestCase):
+    """Unit tests for html_excerpt function."""
+    def _get_fut(self):
+        from blogofile_blog.text import html_excerpt
+        return html_excerpt
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_html_excerpt_text_of_tags_and_entities(self):
+        """html_excerpt joins text across tags and decodes entities
+        """
+        self.assertEqual(
+            self._call_fut('<p>Fish <b>&amp;</b> ch<i>ips</i>\n'
+                           '<!-- not text --> for tea</p>', 4),
+            'Fish & chips for')
+
+    def test_html_excerpt_long_post(self):
+        """html_excerpt of a post longer than a chunk has the first words
+        """
+        html = '<p>{0}</p>'.format(' '.join(
+            'word{0}'.format(n) for n in range(10000)))
+        self.assertEqual(self._call_fut(html, 3), 'word0 word1 word2')
+
+
+class TestHtmlTextStats(unittest.TestCase):
+    """Unit tests for html_text_stats function."""
+    def _get_fut(self):
+        from blogofile_blog.text import html_text_stats
+        return html_text_stats
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_html_text_stats(self):
+        """html_text_stats counts words and digests the text, not the markup
+        """
+        stats = self._call_fut(six.u('<p>Je suis <em>arrivé</em>.</p>'))
+        self.assertEqual(stats.word_count, 3)
+        self.assertEqual(
+            stats.digest,
+            self._call_fut(six.u('<div>Je  suis\narrivé.</div>')).digest)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog timings module.
+"""
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestTimings(unittest.TestCase):
+    """Unit tests for timings module functions."""
+    def setUp(self):
+        from blogofile_blog import timings
+        self.addCleanup(timings.stop)
+        self.timings = timings
+
+    def test_off_by_default(self):
+        """phase and page record nothing unless timing was started
+        """
+        with self.timings.phase('permapage'):
+            with self.timings.page('permapage.mako', '/index.html'):
+                pass
+        self.assertIsNone(self.timings.stop())
+
+    def test_report_pages_per_phase(self):
+        """report counts the pages rendered in each phase
+        """
+        self.timings.start()
+        with self.timings.phase('permapage'):
+            for location in ('/a/index.html', '/b/index.html'):
+                with self.timings.page('permapage.mako', location):
+                    pass
+        with self.timings.post_filter('markdown', None):
+            pass
+        report = self.timings.stop().report()
+        self.assertEqual(
+            [(p['phase'], p['pages']) for p in report['phases']],
+            [('permapage', 2)])
+        self.assertEqual(report['slowest_templates'][0]['pages'], 2)
+        self.assertEqual(
+            [(f['filter'], f['runs']) for f in report['filters']],
+            [('markdown', 1)])
+        self.assertEqual(report['slowest_posts'], [])
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for blogofile_blog watch module.
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+try:
+    import unittest2 as unittest        # For Python 2.6
+except ImportError:
+    import unittest                     # flake8 ignore # NOQA
+
+
+class TestSnapshot(unittest.TestCase):
+    """Unit tests for snapshot and changed_files functions."""
+    def _get_fut(self):
+        from blogofile_blog.watch import snapshot
+        return snapshot
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def setUp(self):
+        self.src_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.src_dir)
+
+    def _write(self, path, contents):
+        path = os.path.join(self.src_dir, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def test_snapshot_skips_build_output_and_hidden_files(self):
+        """snapshot leaves out _site, _cache, hidden and backup files
+        """
+        for path in ('_config.py', '_posts/001.markdown', '_site/index.html',
+                     '_cache/blog/graph.json', '_posts/.001.markdown.swp',
+                     '_posts/001.markdown~', '.git/HEAD'):
+            self._write(path, 'x')
+        self.assertEqual(sorted(self._call_fut(self.src_dir)),
+                         ['_config.py', '_posts/001.markdown'])
+
+    def test_changed_files(self):
+        """changed_files lists added, changed and removed files
+        """
+        from blogofile_blog.watch import changed_files
+        self._write('_posts/001.markdown', 'a')
+        self._write('_posts/002.markdown', 'b')
+        before = self._call_fut(self.src_dir)
+        self._write('_posts/001.markdown', 'aa')
+        os.remove(os.path.join(self.src_dir, '_posts/002.markdown'))
+        self._write('_posts/003.markdown', 'c')
+        self.assertEqual(
+            changed_files(before, self._call_fut(self.src_dir)),
+            ['_posts/001.markdown', '_posts/002.markdown',
+             '_posts/003.markdown'])
+
+
+class TestNeedsFullBuild(unittest.TestCase):
+    """Unit tests for needs_full_build function."""
+    def _get_fut(self):
+        from blogofile_blog.watch import needs_full_build
+        return needs_full_build
+
+    def _call_fut(self, *args, **kwargs):
+        return self._get_fut()(*args, **kwargs)
+
+    def test_posts_and_templates_rebuilt_in_place(self):
+        """changes to posts and templates don't need a full build
+        """
+        self.assertFalse(self._call_fut(
+            ['_posts/001.markdown', '_templates/site.mako',
+             'my_templates/post.mako'],
+            '_posts', ['_templates', 'my_templates']))
+
+    def test_other_changes_need_full_build(self):
+        """changes to the config or site files need a full build
+        """
+        self.assertTrue(self._call_fut(
+            ['_posts/001.markdown', '_config.py'], '_posts', ['_templates']))
+        self.assertTrue(self._call_fut(['css/site.css']))
+        self.assertTrue(self._call_fut(['_posts_old/001.markdown']))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Get at the text of rendered posts.
+
+The HTML is parsed as a stream of tags and text, so no document tree is
+built, and making an excerpt stops as soon as it has enough words.
+"""
+import collections
+import hashlib
+from six.moves import html_parser
+
+
+#: Statistics of the text of an HTML fragment: the number of words,
+#: and a sha1 hex digest of the words joined by single spaces.
+TextStats = collections.namedtuple("TextStats", "word_count digest")
+
+# How much of the HTML to parse at a time while making an excerpt:
+chunk_size = 8192
+
+
+class TextExtractor(html_parser.HTMLParser):
+    """Pull the words out of the HTML fed to it.
+
+    Like ``lxml.html.fromstring(html).text_content()``, the text of
+    script and style elements is included, comments are not, and tags
+    don't separate words.
+
+    :arg max_words: Keep no more than this many words in `words`; the
+                    rest are still counted and digested.
+    """
+    def __init__(self, max_words=None):
+        html_parser.HTMLParser.__init__(self)
+        # Python 3 decodes entities in the text itself:
+        self.convert_charrefs = True
+        self.max_words = max_words
+        self.words = []
+        self.word_count = 0
+        self._digest = hashlib.sha1()
+        self._partial = None  # Text of a word that may continue
+
+    def handle_data(self, data):
+        if not data:
+            return
+        words = data.split()
+        if self._partial is not None:
+            if data[0].isspace() or not words:
+                self._add_word(self._partial)
+            else:
+                words[0] = self._partial + words[0]
+            self._partial = None
+        if words and not data[-1].isspace():
+            self._partial = words.pop()
+        for word in words:
+            self._add_word(word)
+
+    def handle_entityref(self, name):
+        # Only called by Python 2's HTMLParser
+        self.handle_data(self.unescape("&{0};".format(name)))
+
+    def handle_charref(self, name):
+        # Only called by Python 2's HTMLParser
+        self.handle_data(self.unescape("&#{0};".format(name)))
+
+    def _add_word(self, word):
+        if self.word_count:
+            self._digest.update(b" ")
+        self._digest.update(word.encode("utf-8"))
+        self.word_count += 1
+        if self.max_words is None or len(self.words) < self.max_words:
+            self.words.append(word)
+
+    def close(self):
+        html_parser.HTMLParser.close(self)
+        if self._partial is not None:
+            self._add_word(self._partial)
+            self._partial = None
+
+    def stats(self):
+        return TextStats(self.word_count, self._digest.hexdigest())
+
+
+def html_excerpt(html, num_words):
+    """Return the first `num_words` words of the text of `html`,
+    separated by single spaces.
+    """
+    extractor = TextExtractor(max_words=num_words)
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start:start + chunk_size])
+        if extractor.word_count > num_words:
+            # The last word kept is known to be complete
+            break
+    else:
+        extractor.close()
+    return " ".join(extractor.words)
+
+
+def html_text_stats(html):
+    """Return the TextStats of the text of `html`.
+    """
+    extractor = TextExtractor(max_words=0)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.stats()
+
+
+def html_words(html):
+    """Return all the words of the text of `html`.
+    """
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.words
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Time where a blog build goes.
+
+Timing is off unless :func:`start` has been called (``blogofile blog
+build --timings`` does). While it's off, :func:`phase`, :func:`page`
+and :func:`post_filter` hand back a context manager that does nothing,
+so the instrumented code only pays for a function call.
+"""
+import collections
+import json
+import time
+import timeit
+
+
+wall_time = timeit.default_timer
+try:
+    cpu_time = time.process_time
+except AttributeError:
+    cpu_time = time.clock               # Python 2
+
+# The TimingRecorder of the build being timed, if any:
+recorder = None
+
+
+class _NoTiming(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_no_timing = _NoTiming()
+
+
+class _Timer(object):
+    """Time a block, then pass the times to a callback.
+    """
+    def __init__(self, done, *args):
+        self.done = done
+        self.args = args
+
+    def __enter__(self):
+        self.wall = wall_time()
+        self.cpu = cpu_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done(wall_time() - self.wall, cpu_time() - self.cpu,
+                  *self.args)
+        return False
+
+
+class TimingRecorder(object):
+    """Wall and CPU times of the phases of a build, of each page
+    rendered, and of each filter run on each post.
+    """
+    def __init__(self):
+        # phase name -> [wall, cpu, pages rendered]
+        self.phases = collections.OrderedDict()
+        self.current_phases = []
+        # template name -> [pages, wall, slowest wall, slowest location]
+        self.templates = {}
+        # filter name -> [runs, wall]
+        self.filters = {}
+        # post filename -> wall spent in filters
+        self.posts = {}
+
+    def phase(self, name):
+        self.current_phases.append(name)
+        self.phases.setdefault(name, [0.0, 0.0, 0])
+        return _Timer(self._phase_done, name)
+
+    def _phase_done(self, wall, cpu, name):
+        self.current_phases.pop()
+        totals = self.phases[name]
+        totals[0] += wall
+        totals[1] += cpu
+
+    def page(self, template_name, location):
+        return _Timer(self._page_done, template_name, location)
+
+    def _page_done(self, wall, cpu, template_name, location):
+        if self.current_phases:
+            self.phases[self.current_phases[-1]][2] += 1
+        totals = self.templates.setdefault(
+            template_name, [0, 0.0, 0.0, None])
+        totals[0] += 1
+        totals[1] += wall
+        if wall >= totals[2]:
+            totals[2] = wall
+            totals[3] = location
+
+    def post_filter(self, filter_name, post):
+        return _Timer(self._filter_done, filter_name, post)
+
+    def _filter_done(self, wall, cpu, filter_name, post):
+        totals = self.filters.setdefault(filter_name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += wall
+        filename = getattr(post, "filename", None)
+        if filename is not None:
+            self.posts[filename] = self.posts.get(filename, 0.0) + wall
+
+    def report(self, top=10):
+        """Return the timings as a dictionary that can be saved as JSON.
+        """
+        phases = []
+        for name, (wall, cpu, pages) in self.phases.items():
+            phases.append({
+                "phase": name,
+                "wall": wall,
+                "cpu": cpu,
+                "pages": pages,
+                "pages_per_second": pages / wall if pages and wall else None,
+                })
+        templates = sorted(
+            ({"template": name, "pages": pages, "wall": wall,
+              "slowest_wall": slowest, "slowest_page": location}
+             for name, (pages, wall, slowest, location)
+             in self.templates.items()),
+            key=lambda t: t["wall"], reverse=True)
+        filters = sorted(
+            ({"filter": name, "runs": runs, "wall": wall}
+             for name, (runs, wall) in self.filters.items()),
+            key=lambda f: f["wall"], reverse=True)
+        posts = sorted(
+            ({"post": filename, "filter_wall": wall}
+             for filename, wall in self.posts.items()),
+            key=lambda p: p["filter_wall"], reverse=True)
+        return {
+            "phases": phases,
+            "slowest_templates": templates[:top],
+            "filters": filters,
+            "slowest_posts": posts[:top],
+            }
+
+
+def start():
+    """Start timing the blog build.
+    """
+    global recorder
+    recorder = TimingRecorder()
+    return recorder
+
+
+def stop():
+    """Stop timing, and return the recorder with the timings.
+    """
+    global recorder
+    finished, recorder = recorder, None
+    return finished
+
+
+def phase(name):
+    """Time a phase of the build, such as a controller.
+    """
+    if recorder is None:
+        return _no_timing
+    return recorder.phase(name)
+
+
+def page(template_name, location):
+    """Time rendering a page.
+    """
+    if recorder is None:
+        return _no_timing
+    return recorder.page(template_name, location)
+
+
+def record_page(template_name, location, wall, cpu):
+    """Record the times of a page rendered elsewhere, such as in a
+    render worker process.
+    """
+    if recorder is not None:
+        recorder._page_done(wall, cpu, template_name, location)
+
+
+def post_filter(filter_name, post):
+    """Time running a filter on a post.
+    """
+    if recorder is None:
+        return _no_timing
+    return recorder.post_filter(filter_name, post)
+
+
+def format_report(report):
+    """Return the lines of a summary table of a report.
+    """
+    lines = ["{0:<24} {1:>9} {2:>9} {3:>7} {4:>9}".format(
+        "Phase", "wall (s)", "cpu (s)", "pages", "pages/s")]
+    for p in report["phases"]:
+        lines.append("{0:<24} {1:>9.3f} {2:>9.3f} {3:>7} {4:>9}".format(
+            p["phase"], p["wall"], p["cpu"], p["pages"] or "",
+            "{0:.1f}".format(p["pages_per_second"])
+            if p["pages_per_second"] else ""))
+    if report["filters"]:
+        lines.append("")
+        lines.append("{0:<24} {1:>9} {2:>7}".format(
+            "Filter", "wall (s)", "runs"))
+        for f in report["filters"]:
+            lines.append("{0:<24} {1:>9.3f} {2:>7}".format(
+                f["filter"], f["wall"], f["runs"]))
+    if report["slowest_templates"]:
+        lines.append("")
+        lines.append("{0:<24} {1:>9} {2:>7} {3:>9}  {4}".format(
+            "Template", "wall (s)", "pages", "max (s)", "slowest page"))
+        for t in report["slowest_templates"]:
+            lines.append("{0:<24} {1:>9.3f} {2:>7} {3:>9.3f}  {4}".format(
+                t["template"], t["wall"], t["pages"], t["slowest_wall"],
+                t["slowest_page"]))
+    if report["slowest_posts"]:
+        lines.append("")
+        lines.append("{0:<48} {1:>9}".format("Slowest posts", "filters (s)"))
+        for p in report["slowest_posts"]:
+            lines.append("{0:<48} {1:>9.3f}".format(
+                p["post"], p["filter_wall"]))
+    return lines
+
+
+def write_report(report, path):
+    """Save a report as JSON.
+    """
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
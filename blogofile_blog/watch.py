@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the site whenever its source changes, run with ``blogofile
+blog watch``.
+
+The source directory is polled for changed files. The first build, and
+any build after a change to _config.py or to the site's other files, is
+a full incremental build. A change to just the posts or templates is
+rebuilt in place instead: the controllers run again and write into the
+_site directory of the last build, which isn't emptied first, and the
+site's other files aren't copied again. The posts are kept in memory
+between builds (blog.post.keep_parsed), so only the changed post files
+are read and parsed, and only the blog pages whose inputs changed are
+written (blog.incremental.in_place).
+"""
+from __future__ import print_function
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import timeit
+import six
+import blogofile.config
+import blogofile.main
+from blogofile import controller, template, util
+from blogofile.cache import bf
+from blogofile.writer import Writer
+from . import manifest
+
+
+logger = logging.getLogger("blogofile.blog.watch")
+
+# Directories of the source directory that builds write to:
+ignored_dirs = frozenset(["_site", "_cache"])
+
+
+def _ignored_name(name):
+    # Hidden files, and the backup files of editors
+    return name.startswith((".", "#")) or name.endswith("~")
+
+
+def snapshot(directory="."):
+    """Return the files below `directory`, by their "/" separated path
+    relative to it, with their (modification time, size).
+    """
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not _ignored_name(d) and not
+                       (dirpath == directory and d in ignored_dirs)]
+        for filename in filenames:
+            if _ignored_name(filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed since it was listed
+                continue
+            rel_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            files[rel_path] = (stat.st_mtime, stat.st_size)
+    return files
+
+
+def changed_files(before, after):
+    """Return the sorted paths that were added, changed or removed
+    between two snapshots.
+    """
+    return sorted(path for path in set(before) | set(after)
+                  if before.get(path) != after.get(path))
+
+
+def _rebuilt_in_place(path, posts_dir, template_dirs):
+    for directory in [posts_dir] + template_dirs:
+        directory = directory.rstrip("/") + "/"
+        if path.startswith(directory):
+            return True
+    return False
+
+
+def needs_full_build(paths, posts_dir="_posts",
+                     template_dirs=("_templates",)):
+    """Return whether a change to `paths` needs a full build, rather than
+    just the blog's pages being rebuilt in place: only changes to posts
+    and templates are rebuilt in place.
+    """
+    template_dirs = list(template_dirs)
+    return not all(_rebuilt_in_place(path, posts_dir, template_dirs)
+                   for path in paths)
+
+
+def watched_dirs():
+    """Return the posts directory and the template directories of the
+    site, relative to the source directory.
+    """
+    blog = bf.config.plugins.blog
+    template_dirs = ["_templates"]
+    template_paths = blog.template_path or []
+    if isinstance(template_paths, six.string_types):
+        template_paths = [template_paths]
+    for path in template_paths:
+        if not os.path.isabs(path):
+            template_dirs.append(os.path.normpath(path).replace(os.sep, "/"))
+    posts_dir = os.path.normpath(blog.post.source_dir).replace(os.sep, "/")
+    return posts_dir, template_dirs
+
+
+def _configure_blog():
+    blog = bf.config.plugins.blog
+    blog.incremental.enabled = True
+    blog.incremental.dry_run = False
+    blog.incremental.in_place = False
+    blog.post.keep_parsed = True
+
+
+def full_build(args):
+    """Load the configuration again and build the whole site.
+    """
+    blogofile.config.init_interactive(args)
+    _configure_blog()
+    blogofile.main.do_build(args, load_config=False)
+
+
+def write_site_templates(output_dir):
+    """Render the site's own template files (such as index.html.mako)
+    again, as a full build does after running the controllers.
+    """
+    endings = "|".join(re.escape("." + ending)
+                       for ending in bf.config.templates.engines.keys())
+    template_file_regex = re.compile("({0})$".format(endings))
+    for root, dirs, files in os.walk("."):
+        if root.startswith("./"):
+            root = root[2:]
+        dirs[:] = [d for d in dirs
+                   if not util.should_ignore_path(util.path_join(root, d))]
+        for t_fn in files:
+            t_fn_path = util.path_join(root, t_fn)
+            if util.should_ignore_path(t_fn_path) or \
+                    not template_file_regex.search(t_fn):
+                continue
+            location = util.path_join(root, template_file_regex.sub("", t_fn))
+            output_path = util.path_join(output_dir, location)
+            if os.path.exists(output_path):
+                # Don't write through a hard link to another file
+                os.remove(output_path)
+            template.materialize_template(t_fn_path, location)
+
+
+def rebuild_in_place(output_dir):
+    """Run the controllers and render the site's templates again, into
+    the _site directory of the last build.
+    """
+    blog = bf.config.plugins.blog
+    writer = Writer(output_dir=output_dir)
+    bf.writer = writer
+    writer.temp_proc_dir = tempfile.mkdtemp(prefix="blogofile_")
+    for engine in bf.config.templates.engines.values():
+        try:
+            engine.add_default_template_path(writer.temp_proc_dir)
+        except AttributeError:
+            pass
+    blogofile.config.pre_build()
+    if blog.manifest.enabled and blog.manifest.hard_links:
+        # The last build's post-build step hard linked the files with
+        # the same contents; this build writes files in place.
+        manifest.unlink_duplicates(output_dir)
+    blog.incremental.in_place = True
+    try:
+        namespaces = [bf.config]
+        for plugin in list(bf.config.plugins.values()):
+            if plugin.enabled:
+                namespaces.append(plugin)
+        controller.run_all(namespaces)
+        write_site_templates(output_dir)
+        blogofile.config.post_build()
+    except:
+        blogofile.config.build_exception()
+        raise
+    finally:
+        blog.incremental.in_place = False
+        shutil.rmtree(writer.temp_proc_dir)
+        blogofile.config.build_finally()
+
+
+def watch(args, interval=1.0, builds=None):
+    """Build the site, then poll its source every `interval` seconds
+    and rebuild it whenever something changes.
+
+    `builds` is the number of rebuilds to do before returning, or None
+    to keep watching until interrupted.
+    """
+    # Builds change to the source directory; make sure it's found
+    # again from there:
+    args.src_dir = os.path.abspath(args.src_dir)
+    os.chdir(args.src_dir)
+    start = timeit.default_timer()
+    full_build(args)
+    print("Built the site in {0:.2f}s; watching for changes".format(
+        timeit.default_timer() - start))
+    files = snapshot()
+    failed = False
+    while builds is None or builds > 0:
+        time.sleep(interval)
+        current = snapshot()
+        paths = changed_files(files, current)
+        if not paths:
+            continue
+        files = current
+        posts_dir, template_dirs = watched_dirs()
+        full = failed or needs_full_build(paths, posts_dir, template_dirs)
+        start = timeit.default_timer()
+        try:
+            if full:
+                full_build(args)
+            else:
+                rebuild_in_place(util.path_join(
+                    "_site", util.fs_site_path_helper()))
+        except Exception:
+            logger.exception("Build failed")
+            # Start over from a clean _site once the source is fixed
+            failed = True
+        else:
+            failed = False
+            print("{0} after {1} changed file{2} in {3:.2f}s".format(
+                "Built the site" if full else "Rebuilt in place",
+                len(paths), "" if len(paths) == 1 else "s",
+                timeit.default_timer() - start))
+        if builds is not None:
+            builds -= 1